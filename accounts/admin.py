@@ -3,6 +3,6 @@ from .models import Profile
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
-    list_display = ("user", "age", "gender", "height_cm", "weight_kg", "goal", "activity_level", "created_at")
+    list_display = ("user", "age", "gender", "height_cm", "weight_kg", "goal", "activity_level", "timezone", "created_at")
     search_fields = ("userusername", "useremail")
     list_filter = ("gender", "goal", "activity_level")
\ No newline at end of file
@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from .models import Profile
+from .models import Profile, validate_timezone
 
 
 class SignupForm(forms.Form):
@@ -16,6 +16,8 @@ class SignupForm(forms.Form):
     weight_kg = forms.FloatField(min_value=20, max_value=400)
     goal = forms.ChoiceField(choices=Profile.GOAL)
     activity_level = forms.ChoiceField(choices=Profile.ACTIVITY)
+    # Filled in by the browser (Intl API); unknown or missing zones fall back to UTC
+    timezone = forms.CharField(max_length=64, required=False)
 
     def clean_username(self):
         username = self.cleaned_data["username"].strip()
@@ -29,6 +31,14 @@ class SignupForm(forms.Form):
             raise forms.ValidationError("An account with this email already exists.")
         return email
 
+    def clean_timezone(self):
+        tz = (self.cleaned_data.get("timezone") or "").strip()
+        try:
+            validate_timezone(tz)
+        except forms.ValidationError:
+            return "UTC"
+        return tz
+
     def create_user_and_profile(self):
         data = self.cleaned_data
         user = User.objects.create_user(
@@ -44,6 +54,7 @@ class SignupForm(forms.Form):
             weight_kg=data["weight_kg"],
             goal=data["goal"],
             activity_level=data["activity_level"],
+            timezone=data["timezone"],
         )
         return user
 
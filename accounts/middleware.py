@@ -0,0 +1,33 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.utils import timezone
+
+from .timezones import get_user_timezone
+
+
+class UserTimezoneMiddleware:
+    """Activate the logged-in user's time zone so localdate()/localtime() follow their day."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.user.is_authenticated:
+            timezone.activate(get_user_timezone(request.user))
+        else:
+            timezone.deactivate()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        if user.is_authenticated:
+            timezone.activate(await sync_to_async(get_user_timezone)(user))
+        else:
+            timezone.deactivate()
+        return await self.get_response(request)
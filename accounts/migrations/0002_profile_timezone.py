@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:35
+
+import accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='timezone',
+            field=models.CharField(default='UTC', max_length=64, validators=[accounts.models.validate_timezone]),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:12
+
+from django.db import migrations, models
+
+# Frozen copy of accounts.targets as of this migration, so later changes to
+# the live formula cannot change what the backfill does.
+TARGET_INPUTS = ("age", "gender", "height_cm", "weight_kg", "goal", "activity_level")
+GENDER_OFFSET = {"Male": 5, "Female": -161, "Other": -78}
+ACTIVITY_FACTOR = {
+    "Sedentary (little exercise)": 1.2,
+    "Lightly Active (1-3 days/week)": 1.375,
+    "Active (3-5 days/week)": 1.55,
+    "Very Active (6-7 days/week)": 1.725,
+}
+GOAL_FACTOR = {"Lose Weight": 0.8, "Maintain Weight": 1.0, "Gain Muscle": 1.1}
+PROTEIN_G_PER_KG = {"Lose Weight": 2.0, "Maintain Weight": 1.6, "Gain Muscle": 1.8}
+FAT_SHARE = 0.25
+KCAL_PER_G = {"protein": 4, "carbs": 4, "fat": 9}
+
+
+def compute_targets(age, gender, height_cm, weight_kg, goal, activity_level):
+    bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age + GENDER_OFFSET.get(gender, GENDER_OFFSET["Other"])
+    tdee = bmr * ACTIVITY_FACTOR.get(activity_level, 1.2)
+    calories = round(tdee * GOAL_FACTOR.get(goal, 1.0) / 10) * 10
+    protein = round(weight_kg * PROTEIN_G_PER_KG.get(goal, 1.6))
+    fat = round(calories * FAT_SHARE / KCAL_PER_G["fat"])
+    carbs = max(round((calories - protein * KCAL_PER_G["protein"] - fat * KCAL_PER_G["fat"]) / KCAL_PER_G["carbs"]), 0)
+    return {
+        "bmr": round(bmr, 1),
+        "tdee": round(tdee, 1),
+        "calories": max(calories, 0),
+        "protein": protein,
+        "carbs": carbs,
+        "fat": fat,
+    }
+
+
+def backfill_targets(apps, schema_editor):
+    Profile = apps.get_model("accounts", "Profile")
+    profiles = list(Profile.objects.all())
+    for profile in profiles:
+        targets = compute_targets(*(getattr(profile, name) for name in TARGET_INPUTS))
+        profile.bmr = targets["bmr"]
+        profile.tdee = targets["tdee"]
+        profile.target_calories = targets["calories"]
+        profile.target_protein = targets["protein"]
+        profile.target_carbs = targets["carbs"]
+        profile.target_fat = targets["fat"]
+    Profile.objects.bulk_update(
+        profiles, ["bmr", "tdee", "target_calories", "target_protein", "target_carbs", "target_fat"], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_profile_timezone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='bmr',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='target_calories',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='target_carbs',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='target_fat',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='target_protein',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='tdee',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_targets, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,22 @@
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+
+from .targets import TARGET_INPUTS, compute_targets
+
+
+@lru_cache(maxsize=None)
+def _timezone_names():
+    # available_timezones() walks the tzdata tree on every call
+    return frozenset(available_timezones())
+
+
+def validate_timezone(value):
+    if value not in _timezone_names():
+        raise ValidationError(f"Unknown time zone: {value}")
 
 
 class Profile(models.Model):
@@ -21,7 +38,54 @@ class Profile(models.Model):
     weight_kg = models.FloatField()
     goal = models.CharField(max_length=20, choices=GOAL)
     activity_level = models.CharField(max_length=40, choices=ACTIVITY)
+    timezone = models.CharField(max_length=64, default="UTC", validators=[validate_timezone])
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Derived from TARGET_INPUTS by refresh_targets() (accounts.targets)
+    bmr = models.FloatField(null=True, blank=True, editable=False)
+    tdee = models.FloatField(null=True, blank=True, editable=False)
+    target_calories = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    target_protein = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    target_carbs = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    target_fat = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    TARGET_FIELDS = ("bmr", "tdee", "target_calories", "target_protein", "target_carbs", "target_fat")
+
     def str(self):
         return f"{self.user.username} Profile"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(name in field_names for name in TARGET_INPUTS):
+            instance._saved_target_inputs = instance._target_inputs()
+        return instance
+
+    def _target_inputs(self):
+        return tuple(getattr(self, name) for name in TARGET_INPUTS)
+
+    def refresh_targets(self):
+        targets = compute_targets(*self._target_inputs())
+        self.bmr = targets["bmr"]
+        self.tdee = targets["tdee"]
+        self.target_calories = targets["calories"]
+        self.target_protein = targets["protein"]
+        self.target_carbs = targets["carbs"]
+        self.target_fat = targets["fat"]
+
+    def save(self, *args, **kwargs):
+        # Only recompute when an input changed since load (or targets were never set)
+        inputs = self._target_inputs()
+        if self.target_calories is None or inputs != getattr(self, "_saved_target_inputs", None):
+            self.refresh_targets()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], *self.TARGET_FIELDS}
+        super().save(*args, **kwargs)
+        self._saved_target_inputs = inputs
+
+    @property
+    def tzinfo(self):
+        try:
+            return ZoneInfo(self.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            return ZoneInfo("UTC")
@@ -0,0 +1,82 @@
+"""
+Daily calorie and macro targets from a user's profile.
+
+BMR uses the Mifflin-St Jeor equation and TDEE scales it by the activity
+level; the calorie target then applies the goal (a 20% deficit to lose
+weight, a 10% surplus to gain muscle). Protein is set per kg of body
+weight, fat at a share of calories, and carbs fill the rest.
+
+Profile stores the result (Profile.refresh_targets) and recomputes it only
+when one of TARGET_INPUTS changes, so pages read targets straight off the
+profile the timezone middleware has already loaded.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+
+TARGET_INPUTS = ("age", "gender", "height_cm", "weight_kg", "goal", "activity_level")
+
+# Used for users without a profile (the old hard-coded dashboard goals)
+DEFAULT_TARGETS = {"calories": 2100, "protein": 160, "carbs": 250, "fat": 70}
+
+GENDER_OFFSET = {"Male": 5, "Female": -161, "Other": -78}
+ACTIVITY_FACTOR = {
+    "Sedentary (little exercise)": 1.2,
+    "Lightly Active (1-3 days/week)": 1.375,
+    "Active (3-5 days/week)": 1.55,
+    "Very Active (6-7 days/week)": 1.725,
+}
+GOAL_FACTOR = {"Lose Weight": 0.8, "Maintain Weight": 1.0, "Gain Muscle": 1.1}
+PROTEIN_G_PER_KG = {"Lose Weight": 2.0, "Maintain Weight": 1.6, "Gain Muscle": 1.8}
+FAT_SHARE = 0.25
+
+KCAL_PER_G = {"protein": 4, "carbs": 4, "fat": 9}
+
+
+def compute_targets(age, gender, height_cm, weight_kg, goal, activity_level):
+    """{"bmr", "tdee", "calories", "protein", "carbs", "fat"}; energy in kcal, macros in g."""
+    bmr = 10 * weight_kg + 6.25 * height_cm - 5 * age + GENDER_OFFSET.get(gender, GENDER_OFFSET["Other"])
+    tdee = bmr * ACTIVITY_FACTOR.get(activity_level, 1.2)
+    calories = round(tdee * GOAL_FACTOR.get(goal, 1.0) / 10) * 10
+    protein = round(weight_kg * PROTEIN_G_PER_KG.get(goal, 1.6))
+    fat = round(calories * FAT_SHARE / KCAL_PER_G["fat"])
+    carbs = max(round((calories - protein * KCAL_PER_G["protein"] - fat * KCAL_PER_G["fat"]) / KCAL_PER_G["carbs"]), 0)
+    return {
+        "bmr": round(bmr, 1),
+        "tdee": round(tdee, 1),
+        "calories": max(calories, 0),
+        "protein": protein,
+        "carbs": carbs,
+        "fat": fat,
+    }
+
+
+def get_targets(user):
+    """The user's stored targets, or DEFAULT_TARGETS without a profile."""
+    if user is None or not getattr(user, "is_authenticated", False):
+        return dict(DEFAULT_TARGETS)
+    try:
+        profile = user.profile
+    except ObjectDoesNotExist:
+        return dict(DEFAULT_TARGETS)
+    if profile.target_calories is None:
+        return dict(DEFAULT_TARGETS)
+    return {
+        "calories": profile.target_calories,
+        "protein": profile.target_protein,
+        "carbs": profile.target_carbs,
+        "fat": profile.target_fat,
+    }
+
+
+def remaining(targets, totals):
+    """Per nutrient: target, eaten, left (never negative) and percent of target."""
+    out = {}
+    for key, target in targets.items():
+        eaten = totals.get(key) or 0
+        out[key] = {
+            "target": target,
+            "eaten": round(eaten, 1),
+            "left": round(max(target - eaten, 0), 1),
+            "over": round(max(eaten - target, 0), 1),
+            "percent": min(round(100 * eaten / target), 999) if target else 0,
+        }
+    return out
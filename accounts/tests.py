@@ -1,3 +1,63 @@
-from django.test import TestCase
+from importlib import import_module
+from itertools import product
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from .models import Profile
+from .targets import ACTIVITY_FACTOR, GENDER_OFFSET, GOAL_FACTOR, compute_targets
+
+SEDENTARY = "Sedentary (little exercise)"
+LIGHT = "Lightly Active (1-3 days/week)"
+ACTIVE = "Active (3-5 days/week)"
+VERY_ACTIVE = "Very Active (6-7 days/week)"
+
+
+class ComputeTargetsTests(SimpleTestCase):
+    def test_known_inputs(self):
+        cases = [
+            # age, gender, height, weight, goal, activity -> bmr, tdee, kcal, protein, carbs, fat
+            ((30, "Male", 180, 80, "Maintain Weight", ACTIVE), (1780.0, 2759.0, 2760, 128, 389, 77)),
+            ((25, "Female", 164, 60, "Lose Weight", SEDENTARY), (1339.0, 1606.8, 1290, 120, 122, 36)),
+            ((40, "Other", 175, 90, "Gain Muscle", VERY_ACTIVE), (1715.8, 2959.7, 3260, 162, 448, 91)),
+            ((50, "Female", 150, 45, "Lose Weight", LIGHT), (976.5, 1342.7, 1070, 90, 110, 30)),
+        ]
+        for inputs, expected in cases:
+            with self.subTest(inputs=inputs):
+                targets = compute_targets(*inputs)
+                self.assertEqual(
+                    tuple(targets[k] for k in ("bmr", "tdee", "calories", "protein", "carbs", "fat")), expected
+                )
+
+    def test_migration_copy_matches_live_formula(self):
+        frozen = import_module("accounts.migrations.0003_profile_targets").compute_targets
+        for gender, activity, goal in product(GENDER_OFFSET, ACTIVITY_FACTOR, GOAL_FACTOR):
+            for age, height, weight in ((18, 150, 45.5), (35, 178, 82.3), (70, 195, 130)):
+                inputs = (age, gender, height, weight, goal, activity)
+                self.assertEqual(frozen(*inputs), compute_targets(*inputs), inputs)
+
+
+class ProfileTargetsTests(TestCase):
+    def setUp(self):
+        self.profile = Profile.objects.create(
+            user=User.objects.create_user("lifter", password="pw"), age=30, gender="Male",
+            height_cm=180, weight_kg=80, goal="Maintain Weight", activity_level=ACTIVE,
+        )
+
+    def test_targets_stored_on_create(self):
+        profile = Profile.objects.get(pk=self.profile.pk)
+        self.assertEqual((profile.bmr, profile.target_calories, profile.target_protein), (1780.0, 2760, 128))
+
+    def test_input_change_recomputes(self):
+        profile = Profile.objects.get(pk=self.profile.pk)
+        profile.goal = "Lose Weight"
+        profile.save(update_fields=["goal"])
+        profile = Profile.objects.get(pk=self.profile.pk)
+        self.assertEqual((profile.target_calories, profile.target_protein), (2210, 160))
+
+    def test_other_changes_keep_targets(self):
+        Profile.objects.filter(pk=self.profile.pk).update(target_calories=1234)
+        profile = Profile.objects.get(pk=self.profile.pk)
+        profile.timezone = "Europe/Paris"
+        profile.save()
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).target_calories, 1234)
@@ -0,0 +1,17 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
+
+
+def get_user_timezone(user):
+    """The user's profile time zone, or the project default for users without one."""
+    if user is None or not getattr(user, "is_authenticated", False):
+        return timezone.get_default_timezone()
+    try:
+        return user.profile.tzinfo
+    except ObjectDoesNotExist:
+        return timezone.get_default_timezone()
+
+
+def user_localdate(user, value=None):
+    """Calendar day of ``value`` (default: now) in the user's own time zone."""
+    return timezone.localdate(value or timezone.now(), get_user_timezone(user))
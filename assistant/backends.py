@@ -0,0 +1,106 @@
+"""
+Model backends for the assistant.
+
+A backend turns a prompt into an answer, either all at once (generate) or as
+a stream of text chunks (stream). GeminiBackend talks to Google's API;
+StubBackend answers locally and is meant for tests, benchmarks and offline
+development (select it with ASSISTANT_BACKEND=assistant.backends.StubBackend).
+"""
+import asyncio
+import re
+import time
+
+from asgiref.sync import sync_to_async
+
+
+class BackendUnavailable(Exception):
+    """The configured backend cannot be used (missing key, missing package...)."""
+
+
+class AssistantBackend:
+    name = "base"
+
+    def generate(self, prompt):
+        """Return the full answer text for ``prompt``."""
+        raise NotImplementedError
+
+    def stream(self, prompt):
+        """Yield the answer in chunks as they become available."""
+        yield self.generate(prompt)
+
+    async def agenerate(self, prompt):
+        """Async generate(); by default runs the blocking call in a worker thread."""
+        return await sync_to_async(self.generate, thread_sensitive=False)(prompt)
+
+
+class GeminiBackend(AssistantBackend):
+    name = "gemini"
+
+    def __init__(self, api_key, model_name="gemini-1.5-flash"):
+        if not api_key:
+            raise BackendUnavailable("API key missing.")
+        try:
+            import google.generativeai as gen
+        except ImportError as exc:
+            raise BackendUnavailable("google-generativeai is not installed.") from exc
+        gen.configure(api_key=api_key)
+        self._model = gen.GenerativeModel(model_name)
+
+    def generate(self, prompt):
+        resp = self._model.generate_content(prompt)
+        return (getattr(resp, "text", "") or "").strip()
+
+    def stream(self, prompt):
+        for chunk in self._model.generate_content(prompt, stream=True):
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+
+
+class StubBackend(AssistantBackend):
+    """
+    Deterministic local stand-in: canned answers, optional simulated latency.
+
+    ``latency`` is the time to the first token; ``token_delay`` is added
+    per word-sized chunk, between chunks in stream() and in total in
+    generate()/agenerate(), so every path costs the same as a real model.
+    """
+
+    name = "stub"
+
+    def __init__(self, answers=None, latency=0.0, token_delay=0.0):
+        self.answers = answers or {}
+        self.latency = latency
+        self.token_delay = token_delay
+        self.calls = 0
+
+    def _answer(self, prompt):
+        question = prompt.rsplit("User:", 1)[-1].strip()
+        return self.answers.get(question, f"(stub) {question}")
+
+    def generate(self, prompt):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        answer = self._answer(prompt)
+        if self.token_delay:
+            time.sleep(self.token_delay * len(answer.split()))
+        return answer
+
+    async def agenerate(self, prompt):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        answer = self._answer(prompt)
+        if self.token_delay:
+            await asyncio.sleep(self.token_delay * len(answer.split()))
+        return answer
+
+    def stream(self, prompt):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        for i, token in enumerate(re.findall(r"\S+\s*", self._answer(prompt))):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            yield token
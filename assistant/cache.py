@@ -0,0 +1,52 @@
+"""In-process LRU + TTL cache of assistant answers keyed by the normalised question."""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_question(q):
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return _WS.sub(" ", q.casefold()).strip().rstrip("?!. ")
+
+
+class ResponseCache:
+    def __init__(self, maxsize=512, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
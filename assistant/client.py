@@ -0,0 +1,102 @@
+"""
+Process-wide assistant client.
+
+The backend is built once per process on first use (not per request) and
+answers are served from a ResponseCache when the same question comes again.
+"""
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from core.telemetry import time_upstream
+
+from .backends import GeminiBackend
+from .cache import ResponseCache, normalize_question
+
+PROMPT = "Answer briefly. Fitness & nutrition only.\nUser: "
+
+_lock = threading.Lock()
+_backend = None
+_cache = None
+
+
+def _build_backend():
+    path = getattr(settings, "ASSISTANT_BACKEND", "assistant.backends.GeminiBackend")
+    backend_cls = import_string(path)
+    options = dict(getattr(settings, "ASSISTANT_BACKEND_OPTIONS", {}))
+    if issubclass(backend_cls, GeminiBackend):
+        options.setdefault("api_key", settings.GEMINI_API_KEY)
+        options.setdefault("model_name", getattr(settings, "ASSISTANT_MODEL", "gemini-1.5-flash"))
+    return backend_cls(**options)
+
+
+def get_backend():
+    """The shared backend; raises BackendUnavailable if it cannot be configured."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = _build_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Install a backend instance (e.g. a StubBackend in tests); None resets."""
+    global _backend
+    with _lock:
+        _backend = backend
+    get_response_cache().clear()
+
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    maxsize=getattr(settings, "ASSISTANT_CACHE_SIZE", 512),
+                    ttl=getattr(settings, "ASSISTANT_CACHE_TTL", 3600),
+                )
+    return _cache
+
+
+def ask(question):
+    """Return (answer, cached) for a question that has already been sanitised."""
+    cache = get_response_cache()
+    key = normalize_question(question)
+    answer = cache.get(key)
+    if answer is not None:
+        return answer, True
+    backend = get_backend()
+    with time_upstream("sync"):
+        answer = backend.generate(PROMPT + question)
+    if answer:
+        cache.set(key, answer)
+    return answer, False
+
+
+def ask_stream(question):
+    """
+    Yield (chunk, cached) pairs for a sanitised question.
+
+    A cached answer comes back as a single chunk; otherwise chunks are passed
+    through as the backend produces them and the joined answer is cached once
+    the stream completes.
+    """
+    cache = get_response_cache()
+    key = normalize_question(question)
+    answer = cache.get(key)
+    if answer is not None:
+        yield answer, True
+        return
+    parts = []
+    backend = get_backend()
+    # covers the whole stream, including time the client takes to read it
+    with time_upstream("stream"):
+        for chunk in backend.stream(PROMPT + question):
+            parts.append(chunk)
+            yield chunk, False
+    answer = "".join(parts).strip()
+    if answer:
+        cache.set(key, answer)
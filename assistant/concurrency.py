@@ -0,0 +1,241 @@
+"""
+Admission control for the assistant views.
+
+* a per-process cap on concurrent upstream calls (asyncio.Semaphore); a
+  call that times out keeps its slot until it actually returns,
+* the same cap, as a separate threading semaphore, on open sync SSE streams
+  (each holds a worker thread); a stream that finds no free slot is turned
+  away rather than queued,
+* a per-user token-bucket rate limit,
+* a hard timeout on every request,
+* coalescing: identical questions in flight at the same time share a single
+  upstream call instead of each paying for one.
+
+All state lives in this process; the semaphore and in-flight table are kept
+per event loop because asyncio primitives must not be shared across loops.
+"""
+import asyncio
+import threading
+import time
+import weakref
+
+from django.conf import settings
+
+from core.telemetry import time_upstream
+
+from .cache import normalize_question
+from .client import PROMPT, get_backend, get_response_cache
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Too many questions; slow down.")
+        self.retry_after = retry_after
+
+
+class Busy(Exception):
+    def __init__(self):
+        super().__init__("The assistant is busy; try again shortly.")
+
+
+class TokenBucket:
+    """
+    ``capacity`` requests per user, refilled continuously over ``window`` seconds.
+
+    A bucket that has refilled completely is the same as no bucket, so those
+    are dropped whenever the table doubles in size; it only holds users seen
+    within roughly the last window.
+    """
+
+    PRUNE_MIN = 1024
+
+    def __init__(self, capacity, window):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self._buckets = {}
+        self._prune_at = self.PRUNE_MIN
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        idle = [
+            key for key, (tokens, stamp) in self._buckets.items()
+            if tokens + (now - stamp) * self.rate >= self.capacity
+        ]
+        for key in idle:
+            del self._buckets[key]
+        self._prune_at = max(2 * len(self._buckets), self.PRUNE_MIN)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key):
+        """Consume one token for ``key``; returns seconds to wait (0 if allowed)."""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) >= self._prune_at:
+                self._prune(now)
+            tokens, stamp = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - stamp) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate
+
+
+class _LoopState:
+    def __init__(self, max_concurrency):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.inflight = {}
+
+
+_states = weakref.WeakKeyDictionary()
+_limiter = None
+_stream_slots = None
+_limiter_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TokenBucket(
+                    _setting("ASSISTANT_RATE_LIMIT_REQUESTS", 10),
+                    _setting("ASSISTANT_RATE_LIMIT_WINDOW", 60),
+                )
+    return _limiter
+
+
+def _get_stream_slots():
+    global _stream_slots
+    if _stream_slots is None:
+        with _limiter_lock:
+            if _stream_slots is None:
+                _stream_slots = threading.BoundedSemaphore(_setting("ASSISTANT_MAX_CONCURRENCY", 8))
+    return _stream_slots
+
+
+def reset():
+    """Drop limiter and per-loop state (after changing settings in tests)."""
+    global _limiter, _stream_slots
+    with _limiter_lock:
+        _limiter = None
+        _stream_slots = None
+    _states.clear()
+
+
+class _SlotRelease:
+    """Iterate ``events``; free the stream slot when they end or the response is closed."""
+
+    def __init__(self, events, slots):
+        self._events = events
+        self._slots = slots
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._events)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        # the WSGI server closes the response even if the body was never read
+        slots, self._slots = self._slots, None
+        if slots is not None:
+            self._events.close()
+            slots.release()
+
+
+def admit_stream(user_id, events):
+    """
+    Apply the rate limit and the stream cap to a sync SSE response body.
+
+    Returns an iterable to hand to StreamingHttpResponse; it holds one slot
+    until the stream finishes or the response is closed. Raises RateLimited
+    or Busy.
+    """
+    retry_after = get_limiter().take(user_id)
+    if retry_after:
+        raise RateLimited(retry_after)
+    slots = _get_stream_slots()
+    if not slots.acquire(blocking=False):
+        raise Busy()
+    return _SlotRelease(iter(events), slots)
+
+
+def _loop_state():
+    loop = asyncio.get_running_loop()
+    state = _states.get(loop)
+    if state is None:
+        state = _states[loop] = _LoopState(_setting("ASSISTANT_MAX_CONCURRENCY", 8))
+    return state
+
+
+def _release(state, call):
+    state.semaphore.release()
+    if not call.cancelled():
+        call.exception()  # nobody may be awaiting a call that outlived its timeout
+
+
+async def _upstream(state, key, question, timeout):
+    await state.semaphore.acquire()
+    try:
+        call = asyncio.ensure_future(get_backend().agenerate(PROMPT + question))
+    except BaseException:
+        state.semaphore.release()
+        raise
+    # The slot is freed when the call finishes, not when we stop waiting for
+    # it: a timed-out sync backend keeps its worker thread busy until the
+    # model answers, and that thread must still count toward the cap.
+    call.add_done_callback(lambda c: _release(state, c))
+    with time_upstream("async"):
+        answer = await asyncio.wait_for(asyncio.shield(call), timeout)
+    if answer:
+        get_response_cache().set(key, answer)
+    return answer
+
+
+def _forget(state, key, task):
+    if state.inflight.get(key) is task:
+        del state.inflight[key]
+    if not task.cancelled():
+        task.exception()  # mark as retrieved even if every waiter timed out
+
+
+async def aask(user_id, question):
+    """
+    Answer a sanitised question under the process's admission rules.
+
+    Returns (answer, source) with source one of "cache", "upstream" or
+    "coalesced". Raises RateLimited, asyncio.TimeoutError, or whatever the
+    backend raised.
+    """
+    retry_after = get_limiter().take(user_id)
+    if retry_after:
+        raise RateLimited(retry_after)
+
+    key = normalize_question(question)
+    answer = get_response_cache().get(key)
+    if answer is not None:
+        return answer, "cache"
+
+    timeout = _setting("ASSISTANT_TIMEOUT", 20)
+    state = _loop_state()
+    task = state.inflight.get(key)
+    source = "coalesced"
+    if task is None:
+        source = "upstream"
+        task = asyncio.ensure_future(_upstream(state, key, question, timeout))
+        state.inflight[key] = task
+        task.add_done_callback(lambda t: _forget(state, key, t))
+    # shield: a waiter timing out must not cancel the call others share
+    answer = await asyncio.wait_for(asyncio.shield(task), timeout)
+    return answer, source
@@ -1,3 +1,214 @@
-from django.test import TestCase
+import asyncio
+import time
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import concurrency
+from .backends import StubBackend
+from .cache import ResponseCache
+from .client import ask, get_backend, set_backend
+from .concurrency import RateLimited, TokenBucket, aask
+
+
+class PeakBackend(StubBackend):
+    """StubBackend that records how many agenerate calls overlapped."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.running = 0
+        self.peak = 0
+
+    async def agenerate(self, prompt):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            return await super().agenerate(prompt)
+        finally:
+            self.running -= 1
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def test_lru_eviction(self):
+        cache = ResponseCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+    def test_expiry(self):
+        cache = ResponseCache(ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+class SharedClientTests(TestCase):
+    def setUp(self):
+        set_backend(None)
+        self.addCleanup(set_backend, None)
+
+    @override_settings(
+        ASSISTANT_BACKEND="assistant.backends.StubBackend", ASSISTANT_BACKEND_OPTIONS={"latency": 0.0},
+    )
+    def test_backend_built_once_per_process(self):
+        backend = get_backend()
+        self.assertIsInstance(backend, StubBackend)
+        self.assertIs(get_backend(), backend)
+
+    @override_settings(ASSISTANT_BACKEND="assistant.backends.StubBackend", ASSISTANT_BACKEND_OPTIONS={"latncy": 1})
+    def test_misspelled_option_fails_loudly(self):
+        with self.assertRaises(TypeError):
+            get_backend()
+
+    def test_repeated_question_is_served_from_cache(self):
+        backend = StubBackend()
+        set_backend(backend)
+        self.assertEqual(ask("How much protein?"), ("(stub) How much protein?", False))
+        self.assertEqual(ask("  how much   PROTEIN "), ("(stub) How much protein?", True))
+        self.assertEqual(backend.calls, 1)
+
+    def test_chat_view_reports_cache_hits(self):
+        set_backend(StubBackend())
+        self.client.force_login(User.objects.create_user("lifter", password="pw"))
+        first = self.client.post("/ai/chat/", {"q": "Creatine?"}).json()
+        second = self.client.post("/ai/chat/", {"q": "creatine"}).json()
+        self.assertEqual((first["cached"], second["cached"]), (False, True))
+        self.assertEqual(second["answer"], first["answer"])
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_capacity_then_wait(self):
+        bucket = TokenBucket(2, 60)
+        self.assertEqual((bucket.take("u"), bucket.take("u")), (0, 0))
+        self.assertAlmostEqual(bucket.take("u"), 30, delta=0.1)
+        self.assertEqual(bucket.take("other"), 0)
+
+    def test_full_buckets_are_pruned(self):
+        bucket = TokenBucket(1, 0.01)
+        bucket._prune_at = 3
+        for key in "abc":
+            bucket.take(key)
+        time.sleep(0.02)
+        bucket.take("d")
+        self.assertEqual(len(bucket), 1)
+
+
+class AskConcurrencyTests(TestCase):
+    def setUp(self):
+        concurrency.reset()
+        self.addCleanup(concurrency.reset)
+        self.addCleanup(set_backend, None)
+
+    def use(self, backend):
+        set_backend(backend)
+        return backend
+
+    async def test_identical_questions_share_one_call(self):
+        backend = self.use(StubBackend(latency=0.05))
+        results = await asyncio.gather(aask(1, "How much protein?"), aask(2, "how much protein"))
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(sorted(source for _, source in results), ["coalesced", "upstream"])
+        self.assertEqual(await aask(3, "How much protein?"), ("(stub) How much protein?", "cache"))
+
+    @override_settings(ASSISTANT_MAX_CONCURRENCY=2)
+    async def test_concurrent_calls_are_capped(self):
+        backend = self.use(PeakBackend(latency=0.02))
+        await asyncio.gather(*(aask(i, f"question {i}") for i in range(6)))
+        self.assertEqual((backend.calls, backend.peak), (6, 2))
+
+    @override_settings(ASSISTANT_RATE_LIMIT_REQUESTS=1)
+    async def test_rate_limit_rejects(self):
+        self.use(StubBackend())
+        await aask(1, "first")
+        with self.assertRaises(RateLimited) as ctx:
+            await aask(1, "second")
+        self.assertGreater(ctx.exception.retry_after, 0)
+
+    @override_settings(ASSISTANT_MAX_CONCURRENCY=1, ASSISTANT_TIMEOUT=0.02)
+    async def test_slot_held_until_a_timed_out_call_returns(self):
+        self.use(StubBackend(latency=0.1))
+        with self.assertRaises(asyncio.TimeoutError):
+            await aask(1, "slow")
+        semaphore = concurrency._loop_state().semaphore
+        self.assertTrue(semaphore.locked())
+        await asyncio.sleep(0.15)
+        self.assertFalse(semaphore.locked())
+
+    @override_settings(ASSISTANT_MAX_CONCURRENCY=1)
+    async def test_cancelled_waiter_releases_slot_and_caches(self):
+        backend = self.use(StubBackend(latency=0.05))
+        waiter = asyncio.ensure_future(aask(1, "cancel me"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0.1)
+        self.assertFalse(concurrency._loop_state().semaphore.locked())
+        self.assertEqual(await aask(2, "cancel me"), ("(stub) cancel me", "cache"))
+        self.assertEqual(backend.calls, 1)
+
+
+class AsyncChatViewTests(TestCase):
+    def setUp(self):
+        concurrency.reset()
+        self.addCleanup(concurrency.reset)
+        self.addCleanup(set_backend, None)
+        self.client.force_login(User.objects.create_user("lifter", password="pw"))
+
+    @override_settings(ASSISTANT_RATE_LIMIT_REQUESTS=1)
+    def test_second_question_gets_429(self):
+        set_backend(StubBackend())
+        self.assertEqual(self.client.post("/ai/chat/async/", {"q": "one"}).json()["source"], "upstream")
+        response = self.client.post("/ai/chat/async/", {"q": "two"})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+    @override_settings(ASSISTANT_TIMEOUT=0.01)
+    def test_timeout_gets_504(self):
+        set_backend(StubBackend(latency=0.05))
+        self.assertEqual(self.client.post("/ai/chat/async/", {"q": "slow"}).status_code, 504)
+
+
+class StreamViewTests(TestCase):
+    def setUp(self):
+        concurrency.reset()
+        self.addCleanup(concurrency.reset)
+        self.addCleanup(set_backend, None)
+        set_backend(StubBackend(answers={"hi": "Eat more protein."}))
+        self.client.force_login(User.objects.create_user("lifter", password="pw"))
+
+    def stream(self, q="hi"):
+        return self.client.post("/ai/chat/stream/", {"q": q})
+
+    def test_event_framing(self):
+        response = self.stream()
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = b"".join(response.streaming_content).decode()
+        self.assertEqual(
+            body,
+            'data: {"token": "Eat "}\n\n'
+            'data: {"token": "more "}\n\n'
+            'data: {"token": "protein."}\n\n'
+            'event: done\ndata: {"cached": false}\n\n',
+        )
+        body = b"".join(self.stream().streaming_content).decode()
+        self.assertEqual(body, 'data: {"token": "Eat more protein."}\n\nevent: done\ndata: {"cached": true}\n\n')
+
+    @override_settings(ASSISTANT_RATE_LIMIT_REQUESTS=1)
+    def test_rate_limited(self):
+        self.stream().close()
+        response = self.stream()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    @override_settings(ASSISTANT_MAX_CONCURRENCY=1)
+    def test_open_stream_holds_the_only_slot(self):
+        first = self.stream()
+        response = self.stream()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        first.close()  # closed unread, as on a client disconnect
+        self.assertEqual(self.stream().status_code, 200)
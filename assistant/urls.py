@@ -5,4 +5,6 @@ app_name = "assistant"
 
 urlpatterns = [
     path("chat/", views.ai_chat, name="chat"),
+    path("chat/stream/", views.ai_chat_stream, name="chat_stream"),
+    path("chat/async/", views.ai_chat_async, name="chat_async"),
 ]
\ No newline at end of file
@@ -1,16 +1,17 @@
-from django.http import JsonResponse
+import asyncio
+import json
+import math
+
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from django.utils.html import strip_tags
-from django.conf import settings
-import google.generativeai as gen
 
-def _model():
-    if not settings.GEMINI_API_KEY:
-        return None
-    gen.configure(api_key=settings.GEMINI_API_KEY)
-    return gen.GenerativeModel("gemini-1.5-flash")
+from .backends import BackendUnavailable
+from .client import ask, ask_stream
+from .concurrency import Busy, RateLimited, aask, admit_stream
+
 
 @csrf_exempt  # for quick start; switch to CSRF token in production
 @require_POST
@@ -19,11 +20,89 @@ def ai_chat(request):
     q = strip_tags(request.POST.get("q", "")).strip()
     if not q:
         return JsonResponse({"ok": False, "answer": "Empty question."}, status=400)
-    m = _model()
-    if m is None:
-        return JsonResponse({"ok": False, "answer": "API key missing."}, status=500)
     try:
-        resp = m.generate_content("Answer briefly. Fitness & nutrition only.\nUser: " + q)
-        return JsonResponse({"ok": True, "answer": (getattr(resp, "text", "") or "").strip()})
+        answer, cached = ask(q)
+    except BackendUnavailable as e:
+        return JsonResponse({"ok": False, "answer": str(e)}, status=500)
+    except Exception as e:
+        return JsonResponse({"ok": False, "answer": f"Error: {e}"}, status=500)
+    return JsonResponse({"ok": True, "answer": answer, "cached": cached})
+
+
+def _retry_later(message, status, retry_after):
+    response = JsonResponse({"ok": False, "answer": message}, status=status)
+    response["Retry-After"] = str(math.ceil(retry_after))
+    return response
+
+
+def _sse(data, event=None):
+    payload = f"data: {json.dumps(data)}\n\n"
+    return f"event: {event}\n{payload}" if event else payload
+
+
+def _stream_events(q):
+    cached = False
+    try:
+        for chunk, cached in ask_stream(q):
+            yield _sse({"token": chunk})
+    except BackendUnavailable as e:
+        yield _sse({"message": str(e)}, event="error")
+        return
+    except Exception as e:
+        yield _sse({"message": f"Error: {e}"}, event="error")
+        return
+    yield _sse({"cached": cached}, event="done")
+
+
+@csrf_exempt  # for quick start; switch to CSRF token in production
+@require_POST
+@login_required
+def ai_chat_stream(request):
+    """
+    Same question as ai_chat, answered as server-sent events.
+
+    Each ``data:`` event carries ``{"token": "..."}``; the stream ends with an
+    ``event: done`` (or ``event: error``) message. Streams share the async
+    view's per-user rate limit (429) and concurrency cap (503 when every
+    slot is taken), since each one holds a worker thread.
+    """
+    q = strip_tags(request.POST.get("q", "")).strip()
+    if not q:
+        return JsonResponse({"ok": False, "answer": "Empty question."}, status=400)
+    try:
+        events = admit_stream(request.user.pk, _stream_events(q))
+    except RateLimited as e:
+        return _retry_later(str(e), 429, e.retry_after)
+    except Busy as e:
+        return _retry_later(str(e), 503, 1)
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # tell nginx not to buffer the stream
+    return response
+
+
+@csrf_exempt  # for quick start; switch to CSRF token in production
+@require_POST
+@login_required
+async def ai_chat_async(request):
+    """
+    Async ai_chat for the ASGI deployment (config/asgi.py).
+
+    Waiting on the model does not hold a worker thread; concurrency, per-user
+    rate and total time are capped by assistant.concurrency.
+    """
+    q = strip_tags(request.POST.get("q", "")).strip()
+    if not q:
+        return JsonResponse({"ok": False, "answer": "Empty question."}, status=400)
+    user = await request.auser()
+    try:
+        answer, source = await aask(user.pk, q)
+    except RateLimited as e:
+        return _retry_later(str(e), 429, e.retry_after)
+    except asyncio.TimeoutError:
+        return JsonResponse({"ok": False, "answer": "The assistant took too long; try again."}, status=504)
+    except BackendUnavailable as e:
+        return JsonResponse({"ok": False, "answer": str(e)}, status=500)
     except Exception as e:
-        return JsonResponse({"ok": False, "answer": f"Error: {e}"}, status=500)
\ No newline at end of file
+        return JsonResponse({"ok": False, "answer": f"Error: {e}"}, status=500)
+    return JsonResponse({"ok": True, "answer": answer, "cached": source == "cache", "source": source})
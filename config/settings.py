@@ -51,12 +51,26 @@ INSTALLED_APPS = [
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 
+# Assistant model backend (dotted path to an assistant.backends.AssistantBackend).
+# Use assistant.backends.StubBackend for local development, tests and benchmarks.
+ASSISTANT_BACKEND = os.getenv("ASSISTANT_BACKEND", "assistant.backends.GeminiBackend")
+ASSISTANT_MODEL = os.getenv("ASSISTANT_MODEL", "gemini-1.5-flash")
+ASSISTANT_CACHE_SIZE = int(os.getenv("ASSISTANT_CACHE_SIZE", 512))
+ASSISTANT_CACHE_TTL = int(os.getenv("ASSISTANT_CACHE_TTL", 60 * 60))
+# Limits for the async endpoint (per worker process)
+ASSISTANT_MAX_CONCURRENCY = int(os.getenv("ASSISTANT_MAX_CONCURRENCY", 8))
+ASSISTANT_TIMEOUT = float(os.getenv("ASSISTANT_TIMEOUT", 20))
+ASSISTANT_RATE_LIMIT_REQUESTS = int(os.getenv("ASSISTANT_RATE_LIMIT_REQUESTS", 10))
+ASSISTANT_RATE_LIMIT_WINDOW = int(os.getenv("ASSISTANT_RATE_LIMIT_WINDOW", 60))
+
 MIDDLEWARE = [
+    'core.profiling.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.UserTimezoneMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -99,6 +113,38 @@ else:
     }
 
 
+# Cache
+# Dashboard payloads are cached per user and invalidated by a data version
+# (see core/cache.py). Point CACHE_BACKEND at a shared backend (file-based,
+# memcached, redis) when running more than one worker process;
+# `manage.py check --deploy` warns while it is still the LocMemCache.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "fitlytics"),
+    }
+}
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv("DASHBOARD_CACHE_TIMEOUT", 60 * 60))
+# Request profiling (core.profiling): Server-Timing headers and sampled slow-request logs
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "True") == "True"
+# The header reveals DB/query/app timings to every client, so it is off in production by default
+PROFILING_SERVER_TIMING = os.getenv("PROFILING_SERVER_TIMING", str(DEBUG)) == "True"
+PROFILING_TEMPLATE_TIMING = os.getenv("PROFILING_TEMPLATE_TIMING", "True") == "True"
+PROFILING_SLOW_REQUEST_MS = int(os.getenv("PROFILING_SLOW_REQUEST_MS", 500))
+PROFILING_SLOW_LOG_SAMPLE_RATE = float(os.getenv("PROFILING_SLOW_LOG_SAMPLE_RATE", 0.1))
+# Rows one /import/ request handles before answering with a checkpoint to resume from
+IMPORT_MAX_ROWS_PER_REQUEST = int(os.getenv("IMPORT_MAX_ROWS_PER_REQUEST", 20000))
+# Prometheus endpoint (core.telemetry, /prometheus/). Give all workers the same
+# METRICS_MULTIPROCESS_DIR (emptied on deploy) to report their sum.
+METRICS_MULTIPROCESS_DIR = os.getenv("METRICS_MULTIPROCESS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+METRICS_SCRAPE_TOKEN = os.getenv("METRICS_SCRAPE_TOKEN", "")
+# Part of every dashboard ETag (core.etags); change it on deploys that alter templates
+ETAG_SALT = os.getenv("ETAG_SALT", "")
+# Seconds between checks for food catalog changes made by other processes
+FOOD_INDEX_CHECK_INTERVAL = int(os.getenv("FOOD_INDEX_CHECK_INTERVAL", 5))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
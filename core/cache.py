@@ -0,0 +1,102 @@
+"""
+Per-user versioned cache for dashboard payloads.
+
+Every cached payload key embeds the user's current data version. Writes to a
+user's meals or training data bump that version (see core.signals), which
+orphans all of their cached payloads at once; nothing is ever deleted or
+scanned, and a stale payload can never be read back.
+
+Use a shared backend (file, memcached, redis) when running several worker
+processes: with the default locmem backend each process keeps its own
+versions and would not see bumps made by the others.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+_MISSING = object()
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def _cache():
+    return caches[getattr(settings, "DASHBOARD_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 60 * 60)
+
+
+def _version_key(user_id):
+    return f"dash:v:{user_id}"
+
+
+def _fresh_version():
+    # Time-based so a version key that was evicted never restarts at a number
+    # an older payload might still be stored under.
+    return time.time_ns() // 1000
+
+
+def get_data_version(user_id):
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(user_id):
+    cache = _cache()
+    key = _version_key(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _fresh_version()
+        cache.set(key, version, None)
+        return version
+
+
+def _record(name, hit):
+    with _stats_lock:
+        _stats[name]["hits" if hit else "misses"] += 1
+
+
+def cached_payload(user_id, name, builder, timeout=None):
+    """
+    Return ``builder()`` for this user, cached until their data next changes.
+
+    ``name`` identifies the payload and should include anything else the
+    payload depends on (e.g. the local date for "today" views).
+    """
+    version = get_data_version(user_id)
+    cache = _cache()
+    key = f"dash:{name}:{user_id}:{version}"
+    payload = cache.get(key, _MISSING)
+    if payload is not _MISSING:
+        _record(name.split(":", 1)[0], True)
+        return payload
+    _record(name.split(":", 1)[0], False)
+    payload = builder()
+    cache.set(key, payload, _timeout() if timeout is None else timeout)
+    return payload
+
+
+def cache_stats():
+    """Process-local hit/miss counters per payload family."""
+    with _stats_lock:
+        snapshot = {name: dict(counts) for name, counts in _stats.items()}
+    for counts in snapshot.values():
+        total = counts["hits"] + counts["misses"]
+        counts["hit_ratio"] = round(counts["hits"] / total, 4) if total else None
+    return snapshot
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
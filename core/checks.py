@@ -0,0 +1,32 @@
+"""
+System checks for settings the core app depends on.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+LOCMEM_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_dashboard_cache(app_configs, **kwargs):
+    # Data versions (core.cache) drive both the payload cache and the
+    # dashboard ETags (core.etags). With a per-process cache, bumps made by
+    # management commands (import_history, compute_training_load,
+    # refresh_user_summaries) never reach the web workers, and browsers keep
+    # getting 304s for pages that are out of date. A deploy check only, as a
+    # single runserver process is fine with the LocMemCache default.
+    alias = getattr(settings, "DASHBOARD_CACHE_ALIAS", "default")
+    backend = settings.CACHES.get(alias, {}).get("BACKEND", "")
+    if backend != LOCMEM_BACKEND:
+        return []
+    return [
+        Warning(
+            f"CACHES[{alias!r}] uses the per-process LocMemCache.",
+            hint=(
+                "Data version bumps made by other processes (management commands, other "
+                "workers) are not seen, so cached dashboards and their ETags stay stale. "
+                "Set CACHE_BACKEND to a shared backend (file-based, memcached, redis) in production."
+            ),
+            id="core.W001",
+        )
+    ]
@@ -0,0 +1,64 @@
+"""
+Conditional GET for per-user dashboards and exports.
+
+``data_etag`` derives an ETag from the user's data version (core.cache),
+which every write to their meals, training, measurements, profile or
+derived tables already bumps. Checking it costs a cache read and no
+queries of its own, so an unchanged page answers 304 without running the
+view. Use it via ``conditional_dashboard`` rather than ``condition``
+directly so the response is also marked private and always revalidated.
+
+Besides the data version the tag covers everything else a rendered page
+depends on:
+
+* the user and their local date ("today" views roll over at midnight);
+* the query string (exports and ranges);
+* the CSRF cookie, so a page served from the browser cache never carries a
+  form token from before a login rotated it;
+* ``ETAG_SALT``, to change on deploys that alter templates.
+
+The data version must live in a cache every process shares: bumps made by
+management commands or other workers are invisible to a per-process
+LocMemCache, and browsers would keep getting 304s for a stale page.
+``manage.py check --deploy`` warns about that setup (core.W001).
+
+No tag is produced for anonymous users, non-GET/HEAD requests, requests
+without a CSRF cookie yet (the render sets one), or while flash messages
+are pending (they must be rendered, and only a render consumes them).
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from accounts.timezones import user_localdate
+
+from .cache import get_data_version
+
+
+def data_etag(request, *args, **kwargs):
+    if request.method not in ("GET", "HEAD"):
+        return None
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    csrf_cookie = request.META.get("CSRF_COOKIE")
+    if not csrf_cookie or len(get_messages(request)):
+        return None
+    parts = (
+        getattr(settings, "ETAG_SALT", ""),
+        request.resolver_match.view_name if request.resolver_match else request.path,
+        user.pk,
+        get_data_version(user.pk),
+        user_localdate(user).isoformat(),
+        request.GET.urlencode(),
+        csrf_cookie,
+    )
+    return hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:32]
+
+
+def conditional_dashboard(view):
+    """``condition(etag_func=data_etag)`` plus ``Cache-Control: private, no-cache``."""
+    return cache_control(private=True, no_cache=True)(condition(etag_func=data_etag)(view))
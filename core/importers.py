@@ -0,0 +1,308 @@
+"""
+Bulk import of meal and workout history from CSV or JSON Lines dumps.
+
+Rows are streamed from the file, validated with the app's own forms in
+fixed-size chunks and written with ``bulk_create``; each chunk commits in its
+own transaction, together with the daily rollups for the days it touched,
+and reports a checkpoint (rows consumed so far), so an interrupted import
+can be resumed by skipping that many rows. ``max_rows`` stops a run at the
+first chunk boundary past that many rows (``done`` is then false), which
+keeps a single upload request short.
+
+The CSV layouts match the raw ``meals`` and ``sets`` exports from
+/metrics/export.csv, so an export can be re-imported as-is:
+
+* meals:    date, logged_at, meal_type, food_name, calories, protein, carbs, fat
+* workouts: date, session, exercise, muscle_group, set, reps, weight_kg, rir, is_warmup
+
+Consecutive workout rows sharing (date, session) form one TrainingSession and,
+within it, consecutive rows sharing the exercise name form one Exercise.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, time
+from itertools import groupby, islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.timezones import get_user_timezone
+from metrics import rollups
+from nutrition import frequent
+from nutrition.forms import MealForm
+from nutrition.models import Meal
+from training.forms import ExerciseForm, SetForm, TrainingSessionForm
+from training import records
+from training.models import Exercise, ExerciseDefinition, Set, TrainingSession
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+FORMATS = ("csv", "jsonl")
+
+
+class ImportFileError(ValueError):
+    """Raised for problems with the file as a whole (bad format, unreadable header)."""
+
+
+class ImportReport:
+    def __init__(self, skipped_rows=0):
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_failed = 0
+        self.checkpoint = skipped_rows
+        self.done = True
+        self.errors = []
+
+    def add_error(self, row_number, errors):
+        self.rows_failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "rows_read": self.rows_read,
+            "rows_imported": self.rows_imported,
+            "rows_failed": self.rows_failed,
+            "checkpoint": self.checkpoint,
+            "done": self.done,
+            "errors": self.errors,
+            "errors_truncated": self.rows_failed > len(self.errors),
+        }
+
+
+def guess_format(filename):
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "csv"
+
+
+def iter_records(fileobj, fmt):
+    """Yield (row_number, dict) from a binary file object without reading it all."""
+    if fmt not in FORMATS:
+        raise ImportFileError(f"Unsupported format: {fmt}")
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        if not reader.fieldnames:
+            raise ImportFileError("CSV file has no header row.")
+        for n, row in enumerate(reader, start=1):
+            yield n, row
+        return
+    for n, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            yield n, None
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError:
+            obj = {"__invalid__": "Invalid JSON."}
+        yield n, obj if isinstance(obj, dict) else {"__invalid__": "Expected a JSON object."}
+
+
+def _form_errors(form):
+    return {field: [str(e) for e in errs] for field, errs in form.errors.items()}
+
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def _parse_datetime(value, tz):
+    dt = datetime.fromisoformat(str(value).strip())
+    return dt if timezone.is_aware(dt) else timezone.make_aware(dt, tz)
+
+
+class _Importer:
+    def __init__(self, user, chunk_size=CHUNK_SIZE):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.tz = get_user_timezone(user)
+
+    def run(self, records, skip_rows=0, on_checkpoint=None, max_rows=None):
+        """
+        Import ``records`` (from iter_records), skipping the first ``skip_rows``.
+
+        ``on_checkpoint(report)`` is called after every committed chunk. With
+        ``max_rows``, stop once at least that many rows have been read and
+        report ``done = False`` if any are left.
+        """
+        report = ImportReport(skipped_rows=skip_rows)
+        records = ((n, r) for n, r in records if n > skip_rows)
+        for chunk in self._chunks(records):
+            if max_rows is not None and report.rows_read >= max_rows:
+                report.done = False
+                break
+            with transaction.atomic():
+                imported, days = self._import_chunk(chunk, report)
+                if days:
+                    rollups.rebuild_user(self.user.pk, days)
+            report.rows_read += len(chunk)
+            report.rows_imported += imported
+            report.checkpoint = chunk[-1][0]
+            if on_checkpoint:
+                on_checkpoint(report)
+        return report
+
+
+class MealImporter(_Importer):
+    def _chunks(self, records):
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def _when(self, row):
+        """(local_date, created_at) for a row, or raise ValueError."""
+        if row.get("logged_at"):
+            created_at = _parse_datetime(row["logged_at"], self.tz)
+            if row.get("date"):
+                return _parse_date(row["date"]), created_at
+            return timezone.localdate(created_at, self.tz), created_at
+        if row.get("date"):
+            local_date = _parse_date(row["date"])
+            return local_date, timezone.make_aware(datetime.combine(local_date, time(12)), self.tz)
+        raise ValueError("Provide a date or logged_at value.")
+
+    def _import_chunk(self, chunk, report):
+        meals, logged = [], []
+        for n, row in chunk:
+            if row is None:
+                continue
+            if "__invalid__" in row:
+                report.add_error(n, {"__all__": [row["__invalid__"]]})
+                continue
+            form = MealForm(data={k: row.get(k) for k in MealForm.Meta.fields})
+            errors = {} if form.is_valid() else _form_errors(form)
+            try:
+                local_date, created_at = self._when(row)
+            except ValueError:
+                errors["date"] = ["Provide an ISO date (YYYY-MM-DD) or logged_at datetime."]
+            if errors:
+                report.add_error(n, errors)
+                continue
+            meal = form.save(commit=False)
+            meal.user = self.user
+            meal.local_date = local_date
+            meals.append(meal)
+            logged.append(created_at)
+
+        Meal.objects.bulk_create(meals)
+        # bulk_create stamps auto_now_add fields with "now"; put the historical
+        # timestamps back with one CASE-based UPDATE for the whole chunk.
+        for meal, created_at in zip(meals, logged):
+            meal.created_at = created_at
+        Meal.objects.bulk_update(meals, ["created_at"])
+        frequent.record_meals(self.user.pk, meals)
+        return len(meals), {meal.local_date for meal in meals}
+
+
+def _truthy(value):
+    if isinstance(value, str):
+        return value.strip().lower() not in ("", "0", "false", "no", "n", "off")
+    return bool(value)
+
+
+def _session_key(row):
+    if not row or "__invalid__" in row:
+        return None
+    return (str(row.get("date") or "").strip(), str(row.get("session") or "").strip())
+
+
+class WorkoutImporter(_Importer):
+    def _chunks(self, records):
+        # Never split a session across chunks, so a checkpoint always lands on
+        # a session boundary and resuming cannot create half a workout.
+        chunk = []
+        for _, group in groupby(records, key=lambda rec: _session_key(rec[1])):
+            chunk.extend(group)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _import_chunk(self, chunk, report):
+        sessions, exercises, sets = [], [], []
+        for key, group in groupby(chunk, key=lambda rec: _session_key(rec[1])):
+            group = list(group)
+            if key is None:
+                for n, row in group:
+                    if row is not None:
+                        report.add_error(n, {"__all__": [row["__invalid__"]]})
+                continue
+            first = group[0][1]
+            session_form = TrainingSessionForm(data={
+                "name": key[1],
+                "date": key[0],
+                "duration_min": first.get("duration_min") or None,
+                "notes": first.get("notes") or "",
+            })
+            if not session_form.is_valid():
+                errors = _form_errors(session_form)
+                for n, _ in group:
+                    report.add_error(n, errors)
+                continue
+            session = session_form.save(commit=False)
+            session.user = self.user
+            session_exercises = []
+            for order, (name, ex_group) in enumerate(
+                groupby(group, key=lambda rec: str(rec[1].get("exercise") or "").strip())
+            ):
+                ex_group = list(ex_group)
+                ex_row = ex_group[0][1]
+                ex_form = ExerciseForm(data={
+                    "name": name,
+                    "muscle_group": ex_row.get("muscle_group") or "",
+                    "is_compound": _truthy(ex_row.get("is_compound")),
+                    "order": order,
+                    "notes": "",
+                })
+                if not ex_form.is_valid():
+                    errors = _form_errors(ex_form)
+                    for n, _ in ex_group:
+                        report.add_error(n, errors)
+                    continue
+                exercise = ex_form.save(commit=False)
+                ex_sets = []
+                for idx, (n, row) in enumerate(ex_group):
+                    set_form = SetForm(data={
+                        "order": row.get("set") if row.get("set") not in (None, "") else idx,
+                        "reps": row.get("reps"),
+                        "weight_kg": row.get("weight_kg"),
+                        "rir": row.get("rir"),
+                        "is_warmup": _truthy(row.get("is_warmup")),
+                    })
+                    if not set_form.is_valid():
+                        report.add_error(n, _form_errors(set_form))
+                        continue
+                    st = set_form.save(commit=False)
+                    st.exercise = exercise
+                    ex_sets.append(st)
+                if ex_sets:
+                    exercise.session = session
+                    session_exercises.append(exercise)
+                    sets.extend(ex_sets)
+            if session_exercises:
+                sessions.append(session)
+                exercises.extend(session_exercises)
+
+        TrainingSession.objects.bulk_create(sessions)
+        ExerciseDefinition.objects.attach(exercises)
+        Exercise.objects.bulk_create(exercises)
+        Set.objects.bulk_create(sets)
+        # bulk_create skips the per-set signals, so fold the chunk's days in here
+        days = {s.date for s in sessions}
+        records.refresh_days(self.user.pk, days)
+        return len(sets), days
+
+
+IMPORTERS = {
+    "meals": MealImporter,
+    "workouts": WorkoutImporter,
+}
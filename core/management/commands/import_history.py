@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import CHUNK_SIZE, IMPORTERS, ImportFileError, guess_format, iter_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a CSV / JSON Lines dump of meals or workouts into a user's history. "
+        "Progress is checkpointed after every chunk; re-run with --resume to continue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSON Lines file to import.")
+        parser.add_argument("--user", required=True, help="Username or id of the owner.")
+        parser.add_argument("--kind", choices=sorted(IMPORTERS), required=True)
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            "--checkpoint-file",
+            help="Where to record progress (default: <path>.checkpoint).",
+        )
+        parser.add_argument("--resume", action="store_true", help="Skip rows already imported.")
+        parser.add_argument("--errors-file", help="Write per-row errors as JSON to this file.")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"No such file: {path}")
+
+        User = get_user_model()
+        ident = options["user"]
+        try:
+            user = User.objects.get(pk=int(ident)) if ident.isdigit() else User.objects.get(username=ident)
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {ident}")
+
+        checkpoint_file = Path(options["checkpoint_file"] or f"{path}.checkpoint")
+        skip_rows = 0
+        if options["resume"] and checkpoint_file.exists():
+            skip_rows = int(checkpoint_file.read_text().strip() or 0)
+            self.stdout.write(f"Resuming after row {skip_rows}.")
+
+        def on_checkpoint(report):
+            checkpoint_file.write_text(str(report.checkpoint))
+            self.stdout.write(
+                f"row {report.checkpoint}: imported={report.rows_imported} failed={report.rows_failed}"
+            )
+
+        importer = IMPORTERS[options["kind"]](user, chunk_size=options["chunk_size"])
+        fmt = options["format"] or guess_format(path.name)
+        try:
+            with path.open("rb") as fh:
+                report = importer.run(iter_records(fh, fmt), skip_rows=skip_rows, on_checkpoint=on_checkpoint)
+        except ImportFileError as exc:
+            raise CommandError(str(exc))
+
+        if options["errors_file"]:
+            Path(options["errors_file"]).write_text(json.dumps(report.errors, indent=2))
+        for err in report.errors[:20]:
+            self.stderr.write(f"row {err['row']}: {err['errors']}")
+        checkpoint_file.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.rows_imported} row(s); {report.rows_failed} row(s) failed."
+        ))
@@ -0,0 +1,219 @@
+"""
+Per-request profiling: query count, DB time, template time and view time.
+
+RequestProfilingMiddleware keeps a RequestProfile in a context variable for
+the duration of each request (sync or async; ``sync_to_async`` threads see
+the same object). Two hooks feed it:
+
+* a database execute wrapper, installed on every connection as it is
+  created (``connection_created``), so queries run in worker threads by
+  async views are counted too. It times each query and sums the time per
+  SQL text (parameters stay out, so one statement run in a loop shows up as
+  one entry with a count);
+* a wrapper around the Django template backend's ``render``, which times
+  each top-level render (includes and extends are part of it). Django has
+  no hook around rendering (``template_rendered`` is only sent by the test
+  runner, and after the fact), so ``install()`` replaces
+  ``django.template.backends.django.Template.render`` for the whole
+  process. PROFILING_TEMPLATE_TIMING = False leaves it alone, and ``tpl``
+  then stays 0.
+
+With PROFILING_SERVER_TIMING (defaults to DEBUG, since it shows timings to
+any client) each response gets a ``Server-Timing`` header (db, tpl, app,
+total) that the browser dev tools display. The totals always go to the
+metrics registry (core.telemetry). Requests slower than PROFILING_SLOW_REQUEST_MS
+are logged as one JSON line on the ``core.profiling`` logger with the most
+expensive SQL. Only a PROFILING_SLOW_LOG_SAMPLE_RATE share of them is logged,
+so an overload cannot turn into a log flood.
+
+The per-query cost is a clock read and a dict update, and the per-request
+cost is a context variable, one header and one registry update, so it is
+cheap enough to leave enabled. PROFILING_ENABLED = False removes the
+middleware altogether (and with it the request metrics).
+
+Streaming responses (the CSV export, the assistant's SSE stream) produce
+their body after the middleware has returned, so the queries and time spent
+streaming are not counted; the figures cover building the response only.
+"""
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template as DjangoTemplate
+from django.utils.functional import empty
+
+from . import telemetry
+
+logger = logging.getLogger(__name__)
+
+TOP_SQL = 5
+# distinct statements tracked per request; later ones only count toward totals
+MAX_TRACKED_SQL = 200
+
+_current = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    __slots__ = ("started", "queries", "db_time", "template_time", "template_depth", "sql")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.sql = {}
+
+    def add_query(self, sql, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        entry = self.sql.get(sql)
+        if entry is not None:
+            entry[0] += 1
+            entry[1] += elapsed
+        elif len(self.sql) < MAX_TRACKED_SQL:
+            self.sql[sql] = [1, elapsed]
+
+    def top_sql(self, limit=TOP_SQL):
+        ranked = sorted(self.sql.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {"sql": sql[:500], "count": count, "ms": round(elapsed * 1000, 2)}
+            for sql, (count, elapsed) in ranked
+        ]
+
+
+def current_profile():
+    """The RequestProfile of the request being served, or None."""
+    return _current.get()
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(sql, time.perf_counter() - started)
+
+
+def _install_db_wrapper(connection, **kwargs):
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+_original_render = DjangoTemplate.render
+
+
+def _timed_render(self, context=None, request=None):
+    profile = _current.get()
+    if profile is None:
+        return _original_render(self, context, request)
+    profile.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context, request)
+    finally:
+        profile.template_depth -= 1
+        if not profile.template_depth:
+            profile.template_time += time.perf_counter() - started
+
+
+def install(templates=True):
+    """Hook the database layer and, with ``templates``, template rendering (idempotent)."""
+    connection_created.connect(_install_db_wrapper, dispatch_uid="core.profiling.db")
+    for connection in connections.all(initialized_only=True):
+        _install_db_wrapper(connection)
+    if templates:
+        DjangoTemplate.render = _timed_render
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+def _user_id(request):
+    # only if authentication already ran: loading the user here would add
+    # queries (and is not allowed at all from the async path)
+    user = getattr(request, "user", None)
+    wrapped = getattr(user, "_wrapped", user)
+    if wrapped is None or wrapped is empty:
+        return None
+    return getattr(wrapped, "pk", None)
+
+
+class RequestProfilingMiddleware:
+    """Put it first in MIDDLEWARE so ``total`` covers the whole stack."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, "PROFILING_SERVER_TIMING", settings.DEBUG)
+        self.slow_ms = getattr(settings, "PROFILING_SLOW_REQUEST_MS", 500)
+        self.sample_rate = getattr(settings, "PROFILING_SLOW_LOG_SAMPLE_RATE", 0.1)
+        install(templates=getattr(settings, "PROFILING_TEMPLATE_TIMING", True))
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, profile)
+        return response
+
+    def _finish(self, request, response, profile):
+        total = time.perf_counter() - profile.started
+        # everything that is neither SQL nor template rendering: view code and middleware
+        app = max(total - profile.db_time - profile.template_time, 0.0)
+        telemetry.record_request(request, response, total, profile.queries, profile.db_time)
+        if self.server_timing:
+            response["Server-Timing"] = ", ".join((
+                f'db;dur={_ms(profile.db_time)};desc="{profile.queries} queries"',
+                f"tpl;dur={_ms(profile.template_time)}",
+                f"app;dur={_ms(app)}",
+                f"total;dur={_ms(total)}",
+            ))
+        if total * 1000 >= self.slow_ms and random.random() < self.sample_rate:
+            match = request.resolver_match
+            logger.warning(json.dumps({
+                "event": "slow_request",
+                "method": request.method,
+                "path": request.path,
+                "view": match.view_name if match else None,
+                "status": response.status_code,
+                "user_id": _user_id(request),
+                "total_ms": _ms(total),
+                "db_ms": _ms(profile.db_time),
+                "queries": profile.queries,
+                "template_ms": _ms(profile.template_time),
+                "app_ms": _ms(app),
+                "top_sql": profile.top_sql(),
+            }))
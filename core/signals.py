@@ -0,0 +1,46 @@
+"""
+Bump a user's dashboard data version whenever their logged data changes.
+
+Meal, TrainingSession, BodyMeasurement and Profile writes bump on commit,
+so a concurrent request can never cache pre-commit data under the new
+version. The same version drives the dashboards' ETags (core.etags). Every Meal, session,
+Exercise and Set write also marks a rollup day dirty (metrics.signals); once
+those buckets are rewritten on commit the version is bumped again, which
+covers set/exercise edits and invalidates anything cached in between. The
+same goes for personal records (training.signals).
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import Profile
+from metrics.models import BodyMeasurement
+from metrics.rollups import rollups_refreshed
+from nutrition.models import Meal
+from training.models import TrainingSession
+from training.records import records_refreshed
+
+from .cache import bump_data_version
+
+
+def _bump_on_commit(user_id):
+    if user_id is not None:
+        transaction.on_commit(lambda: bump_data_version(user_id))
+
+
+@receiver(post_save, sender=Meal)
+@receiver(post_delete, sender=Meal)
+@receiver(post_save, sender=TrainingSession)
+@receiver(post_delete, sender=TrainingSession)
+@receiver(post_save, sender=BodyMeasurement)
+@receiver(post_delete, sender=BodyMeasurement)
+@receiver(post_save, sender=Profile)
+def owner_data_changed(sender, instance, **kwargs):
+    _bump_on_commit(instance.user_id)
+
+
+@receiver(rollups_refreshed)
+@receiver(records_refreshed)
+def rollups_rewritten(sender, user_ids, **kwargs):
+    for user_id in user_ids:
+        bump_data_version(user_id)
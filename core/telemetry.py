@@ -0,0 +1,319 @@
+"""
+In-process metrics registry with a Prometheus text-format exposition.
+
+Recorded here:
+
+* per request (fed by core.profiling.RequestProfilingMiddleware): a count by
+  URL name, method and status, a latency histogram and a DB query count
+  histogram by URL name, and DB time by URL name;
+* assistant upstream calls: a latency histogram by mode (sync, stream,
+  async) and outcome (ok, error, timeout, cancelled);
+* dashboard and assistant response cache hits and misses, read from the
+  caches' own counters when a snapshot is taken, plus hit ratios derived
+  from them at exposition time.
+
+Recording takes one lock for a few dict updates, with no I/O. Requests
+without a URL match are labelled ``<unmatched>`` so 404 probes cannot grow
+the label set.
+
+Several worker processes: set METRICS_MULTIPROCESS_DIR to a directory the
+workers share (cleared on deploy). Each process then writes its snapshot
+there as JSON at most every METRICS_FLUSH_INTERVAL seconds (write to a
+temporary file, then rename, so readers never see half a file) and at exit.
+The endpoint sums every file with the live state of the process serving the
+scrape. Files are named by pid and start time, so the counts of workers that
+exited or were recycled stay in the totals, which keeps counters monotonic
+the way Prometheus expects. Without the directory the endpoint reports the
+serving process only.
+"""
+import asyncio
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPSTREAM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+UNMATCHED = "<unmatched>"
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+COUNTERS = {
+    "fitlytics_http_requests_total": "Requests served, by URL name, method and status.",
+    "fitlytics_http_request_db_seconds_total": "Time spent in database queries, by URL name.",
+    "fitlytics_dashboard_cache_requests_total": "Dashboard payload cache lookups, by payload and result.",
+    "fitlytics_assistant_cache_requests_total": "Assistant response cache lookups, by result.",
+}
+HISTOGRAMS = {
+    "fitlytics_http_request_duration_seconds": ("Request latency, by URL name.", LATENCY_BUCKETS),
+    "fitlytics_http_request_db_queries": ("Database queries per request, by URL name.", QUERY_BUCKETS),
+    "fitlytics_assistant_upstream_duration_seconds": (
+        "Assistant model call latency, by mode and outcome.", UPSTREAM_BUCKETS,
+    ),
+}
+# Derived at exposition time from the summed hit/miss counters
+RATIOS = {
+    "fitlytics_dashboard_cache_hit_ratio": (
+        "Dashboard payload cache hit ratio, by payload.", "fitlytics_dashboard_cache_requests_total",
+    ),
+    "fitlytics_assistant_cache_hit_ratio": (
+        "Assistant response cache hit ratio.", "fitlytics_assistant_cache_requests_total",
+    ),
+}
+
+
+class Registry:
+    """Counters and histograms of one process, keyed by (name, labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        # (name, labels) -> [count per bucket (last is +Inf)..., sum]
+        self._histograms = {}
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            self._observe(name, labels, value)
+
+    def _observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        row = self._histograms.get((name, labels))
+        if row is None:
+            row = self._histograms[(name, labels)] = [0] * (len(buckets) + 2)
+        row[bisect_left(buckets, value)] += 1
+        row[-1] += value
+
+    def record_request(self, view, method, status, duration, queries, db_time):
+        with self._lock:
+            key = ("fitlytics_http_requests_total", (("view", view), ("method", method), ("status", str(status))))
+            self._counters[key] = self._counters.get(key, 0) + 1
+            key = ("fitlytics_http_request_db_seconds_total", (("view", view),))
+            self._counters[key] = self._counters.get(key, 0) + db_time
+            labels = (("view", view),)
+            self._observe("fitlytics_http_request_duration_seconds", labels, duration)
+            self._observe("fitlytics_http_request_db_queries", labels, queries)
+
+    def snapshot(self):
+        """JSON-serialisable state, including the caches' current counters."""
+        with self._lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, list(labels), list(row)] for (name, labels), row in self._histograms.items()]
+        counters.extend(_cache_counters())
+        return {"counters": counters, "histograms": histograms}
+
+    def __bool__(self):
+        return bool(self._counters or self._histograms)
+
+
+def _cache_counters():
+    from assistant.client import get_response_cache
+
+    from .cache import cache_stats
+
+    rows = []
+    for payload, counts in cache_stats().items():
+        for result, field in (("hit", "hits"), ("miss", "misses")):
+            rows.append([
+                "fitlytics_dashboard_cache_requests_total",
+                [["payload", payload], ["result", result]],
+                counts[field],
+            ])
+    cache = get_response_cache()
+    rows.append(["fitlytics_assistant_cache_requests_total", [["result", "hit"]], cache.hits])
+    rows.append(["fitlytics_assistant_cache_requests_total", [["result", "miss"]], cache.misses])
+    return rows
+
+
+registry = Registry()
+
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+_started = time.time_ns()
+
+
+def _multiprocess_dir():
+    return getattr(settings, "METRICS_MULTIPROCESS_DIR", "")
+
+
+def _own_file(directory):
+    return os.path.join(directory, f"{os.getpid()}-{_started}.json")
+
+
+def flush(force=False):
+    """Write this process's snapshot to METRICS_MULTIPROCESS_DIR if one is due."""
+    global _last_flush
+    directory = _multiprocess_dir()
+    if not directory:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < getattr(settings, "METRICS_FLUSH_INTERVAL", 5):
+        return
+    # one writer per process; the others skip instead of waiting
+    if not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        _last_flush = now
+        path = _own_file(directory)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(registry.snapshot(), fh)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # metrics must never fail a request
+    finally:
+        _flush_lock.release()
+
+
+def _after_fork():
+    # a forked worker starts from zero under its own file, or it would report
+    # whatever the parent had recorded a second time
+    global registry, _flush_lock, _last_flush, _started
+    registry = Registry()
+    _flush_lock = threading.Lock()
+    _last_flush = 0.0
+    _started = time.time_ns()
+
+
+def _flush_at_exit():
+    # management commands that served no requests leave no file behind
+    if registry:
+        flush(force=True)
+
+
+os.register_at_fork(after_in_child=_after_fork)
+atexit.register(_flush_at_exit)
+
+
+def record_request(request, response, duration, queries, db_time):
+    match = request.resolver_match
+    view = match.view_name if match else UNMATCHED
+    method = request.method if request.method in METHODS else "other"
+    registry.record_request(view, method, response.status_code, duration, queries, db_time)
+    flush()
+
+
+def observe_upstream(mode, outcome, duration):
+    registry.observe("fitlytics_assistant_upstream_duration_seconds", (("mode", mode), ("outcome", outcome)), duration)
+
+
+@contextmanager
+def time_upstream(mode):
+    """Time an assistant model call; also usable around an ``await``."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except (asyncio.TimeoutError, TimeoutError):
+        outcome = "timeout"
+        raise
+    except (asyncio.CancelledError, GeneratorExit):
+        # the waiter went away (cancelled task, client closed the stream)
+        outcome = "cancelled"
+        raise
+    finally:
+        observe_upstream(mode, outcome, time.perf_counter() - started)
+
+
+def _snapshots():
+    directory = _multiprocess_dir()
+    yield registry.snapshot()
+    if not directory:
+        return
+    own = os.path.basename(_own_file(directory))
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if not name.endswith(".json") or name == own:
+            continue
+        try:
+            with open(os.path.join(directory, name)) as fh:
+                yield json.load(fh)
+        except (OSError, ValueError):
+            continue  # removed or unreadable; skip it for this scrape
+
+
+def collect():
+    """Merged counters and histograms of every process: ({key: value}, {key: row})."""
+    counters, histograms = {}, {}
+    for snapshot in _snapshots():
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, row in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.get(key)
+            if merged is None or len(merged) != len(row):
+                histograms[key] = list(row)
+            else:
+                histograms[key] = [a + b for a, b in zip(merged, row)]
+    return counters, histograms
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _ratios(counters, source):
+    totals = {}
+    for (name, labels), value in counters.items():
+        if name != source:
+            continue
+        result = dict(labels).get("result")
+        rest = tuple(pair for pair in labels if pair[0] != "result")
+        hits, total = totals.get(rest, (0, 0))
+        totals[rest] = (hits + (value if result == "hit" else 0), total + value)
+    return {labels: hits / total for labels, (hits, total) in totals.items() if total}
+
+
+def render():
+    """The merged registry in the Prometheus text exposition format."""
+    counters, histograms = collect()
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    for name, (help_text, source) in RATIOS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for labels, ratio in sorted(_ratios(counters, source).items()):
+            lines.append(f"{name}{_labels(labels)} {_number(round(ratio, 6))}")
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (metric, labels), row in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, math.inf), row[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, [('le', _number(float(bound)))])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(row[-1])}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
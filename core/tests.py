@@ -1,3 +1,218 @@
-from django.test import TestCase
+import io
+import json
+import os
+import re
+import tempfile
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from metrics.models import DailyNutritionSummary
+from nutrition.models import Meal
+
+from . import telemetry
+from .cache import bump_data_version, cached_payload, get_data_version
+from .importers import MealImporter, iter_records
+
+
+def meals_csv(days):
+    lines = ["date,meal_type,food_name,calories,protein,carbs,fat"]
+    lines += [f"2024-01-{day:02d},Lunch,Rice,{100 * day},10,20,5" for day in days]
+    return io.BytesIO(("\n".join(lines) + "\n").encode())
+
+
+class ImportResumeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+
+    def test_resume_from_checkpoint(self):
+        checkpoints = []
+        importer = MealImporter(self.user, chunk_size=3)
+        report = importer.run(
+            iter_records(meals_csv(range(1, 11)), "csv"),
+            on_checkpoint=lambda r: checkpoints.append(r.checkpoint), max_rows=5,
+        )
+        self.assertFalse(report.done)
+        self.assertEqual((report.rows_read, report.checkpoint), (6, 6))
+        self.assertEqual(checkpoints, [3, 6])
+        self.assertEqual(Meal.objects.filter(user=self.user).count(), 6)
+
+        report = importer.run(iter_records(meals_csv(range(1, 11)), "csv"), skip_rows=report.checkpoint)
+        self.assertTrue(report.done)
+        self.assertEqual((report.rows_read, report.rows_imported, report.checkpoint), (4, 4, 10))
+        self.assertEqual(
+            sorted(Meal.objects.filter(user=self.user).values_list("calories", flat=True)),
+            [100 * day for day in range(1, 11)],
+        )
+        # each chunk rebuilt the rollups of the days it wrote
+        summaries = DailyNutritionSummary.objects.filter(user=self.user)
+        self.assertEqual(summaries.count(), 10)
+        self.assertEqual(summaries.get(day=date(2024, 1, 10)).calories, 1000)
+
+    def test_version_bump_waits_for_commit(self):
+        before = get_data_version(self.user.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            MealImporter(self.user).run(iter_records(meals_csv([1, 2]), "csv"))
+            self.assertEqual(get_data_version(self.user.pk), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_data_version(self.user.pk), before)
+
+    def test_invalid_rows_are_reported_not_imported(self):
+        data = io.BytesIO(b"date,meal_type,food_name,calories,protein,carbs,fat\n"
+                          b"2024-01-01,Lunch,Rice,500,10,20,5\n"
+                          b"not-a-date,Lunch,Rice,-1,10,20,5\n")
+        report = MealImporter(self.user).run(iter_records(data, "csv"))
+        self.assertEqual((report.rows_imported, report.rows_failed), (1, 1))
+        self.assertEqual(report.errors[0]["row"], 2)
+
+
+class ConditionalDashboardTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+        self.client.force_login(self.user)
+        # the first render sets the CSRF cookie the tag depends on
+        self.client.get("/nutrition/")
+        self.etag = self.client.get("/nutrition/")["ETag"]
+
+    def revalidate(self):
+        return self.client.get("/nutrition/", HTTP_IF_NONE_MATCH=self.etag)
+
+    def test_unchanged_data_answers_304(self):
+        response = self.revalidate()
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_a_write_invalidates_the_tag(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Meal.objects.create(
+                user=self.user, meal_type="Lunch", food_name="Rice", calories=500,
+                protein=10, carbs=0, fat=0, local_date=date.today(),
+            )
+        response = self.revalidate()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], self.etag)
+
+    def test_version_bump_invalidates_the_tag(self):
+        bump_data_version(self.user.pk)
+        self.assertEqual(self.revalidate().status_code, 200)
+
+
+class CachedPayloadTests(TestCase):
+    def setUp(self):
+        cache.clear()  # user ids are reused between tests; versions are not
+        self.user = User.objects.create_user("lifter", password="pw")
+        self.builds = 0
+
+    def payload(self):
+        def build():
+            self.builds += 1
+            return {"meals": Meal.objects.filter(user=self.user).count()}
+        return cached_payload(self.user.pk, "test:meals", build)
+
+    def test_cached_until_the_user_writes(self):
+        self.assertEqual(self.payload(), {"meals": 0})
+        self.assertEqual(self.payload(), {"meals": 0})
+        self.assertEqual(self.builds, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Meal.objects.create(
+                user=self.user, meal_type="Lunch", food_name="Rice", calories=500,
+                protein=10, carbs=0, fat=0, local_date=date(2024, 1, 1),
+            )
+        self.assertEqual(self.payload(), {"meals": 1})
+        self.assertEqual(self.builds, 2)
+
+    def test_other_users_writes_keep_the_payload(self):
+        self.payload()
+        bump_data_version(User.objects.create_user("other", password="pw").pk)
+        self.payload()
+        self.assertEqual(self.builds, 1)
+
+    def test_version_waits_for_commit(self):
+        before = get_data_version(self.user.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Meal.objects.create(
+                user=self.user, meal_type="Lunch", food_name="Rice", calories=500,
+                protein=10, carbs=0, fat=0, local_date=date(2024, 1, 1),
+            )
+        self.assertEqual(get_data_version(self.user.pk), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_data_version(self.user.pk), before)
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("lifter", password="pw"))
+
+    @override_settings(PROFILING_SERVER_TIMING=True)
+    def test_header_reports_phases_and_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/nutrition/foods/search/?q=zucc")
+        timing = response["Server-Timing"]
+        self.assertEqual(re.findall(r"(?:^|, )(\w+);dur=", timing), ["db", "tpl", "app", "total"])
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        self.assertGreater(len(queries), 0)
+
+    @override_settings(PROFILING_SERVER_TIMING=False)
+    def test_header_off(self):
+        self.assertNotIn("Server-Timing", self.client.get("/nutrition/foods/search/?q=zucc"))
+
+
+class TelemetryTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(telemetry, "registry", telemetry.Registry())
+        self.registry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_render_after_a_request(self):
+        self.client.get("/")
+        text = telemetry.render()
+        self.assertIn("# TYPE fitlytics_http_requests_total counter", text)
+        self.assertIn("# TYPE fitlytics_http_request_duration_seconds histogram", text)
+        self.assertIn('fitlytics_http_requests_total{view="core:home",method="GET",status="200"} 1', text)
+        self.assertIn('fitlytics_http_request_duration_seconds_bucket{view="core:home",le="+Inf"} 1', text)
+        self.assertIn('fitlytics_http_request_duration_seconds_count{view="core:home"} 1', text)
+
+    def test_other_processes_are_summed(self):
+        self.registry.record_request("core:home", "GET", 200, 0.02, 3, 0.001)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        other = {
+            "counters": [
+                ["fitlytics_http_requests_total", [["view", "core:home"], ["method", "GET"], ["status", "200"]], 2],
+            ],
+            "histograms": [
+                ["fitlytics_http_request_db_queries", [["view", "core:home"]], [0, 0, 0, 2, 0, 0, 0, 0, 0, 0, 0, 6]],
+            ],
+        }
+        with open(os.path.join(tmp.name, "1-1.json"), "w") as fh:
+            json.dump(other, fh)
+
+        with override_settings(METRICS_MULTIPROCESS_DIR=tmp.name):
+            counters, histograms = telemetry.collect()
+            text = telemetry.render()
+            telemetry.flush(force=True)
+            self.assertTrue(os.path.exists(telemetry._own_file(tmp.name)))
+            self.assertEqual(telemetry.collect(), (counters, histograms))  # own file is not counted twice
+
+        key = ("fitlytics_http_requests_total", (("view", "core:home"), ("method", "GET"), ("status", "200")))
+        self.assertEqual(counters[key], 3)
+        queries = histograms[("fitlytics_http_request_db_queries", (("view", "core:home"),))]
+        self.assertEqual(queries, [0, 0, 0, 3, 0, 0, 0, 0, 0, 0, 0, 9])
+        self.assertIn('fitlytics_http_requests_total{view="core:home",method="GET",status="200"} 3', text)
+        self.assertIn('fitlytics_http_request_db_queries_bucket{view="core:home",le="5"} 3', text)
+        self.assertIn('fitlytics_http_request_db_queries_sum{view="core:home"} 9', text)
+
+
+class SharedCacheCheckTests(TestCase):
+    def test_locmem_warns_only_under_deploy(self):
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            self.assertNotIn("core.W001", [message.id for message in run_checks()])
+            self.assertIn("core.W001", [message.id for message in run_checks(include_deployment_checks=True)])
@@ -5,6 +5,9 @@ app_name = "core"
 
 urlpatterns = [
     path("", views.home, name="home"),
+    path("import/", views.import_history, name="import"),
+    path("cache-stats/", views.dashboard_cache_stats, name="cache_stats"),
+    path("prometheus/", views.prometheus_metrics, name="prometheus"),
     # nutrition is provided by the nutrition app (included in project urls).
     # Keep core.urls focused on small top-level routes.
 ]
@@ -1,4 +1,16 @@
+import hmac
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET, require_POST
+
+from . import telemetry
+from .cache import cache_stats
+from .importers import IMPORTERS, ImportFileError, guess_format, iter_records
 
 # Create your views here.
 def home(request):
@@ -12,4 +24,68 @@ def training(request):
     return render(request, "training/training.html")
 
 def metrics(request):
-    return render(request, "metrics.html")
\ No newline at end of file
+    return render(request, "metrics.html")
+
+
+@login_required
+@require_POST
+def import_history(request):
+    """
+    Import an uploaded CSV / JSON Lines dump (``file``) of ``kind`` meals or workouts.
+
+    The upload is parsed straight from Django's temporary file in chunks, and
+    one request imports at most IMPORT_MAX_ROWS_PER_REQUEST rows. While the
+    report says ``done: false``, post the same file again with ``skip_rows``
+    set to its ``checkpoint``; that is also how an interrupted upload resumes.
+    Larger dumps can go through the ``import_history`` command instead.
+    """
+    upload = request.FILES.get("file")
+    kind = request.POST.get("kind")
+    if upload is None or kind not in IMPORTERS:
+        return JsonResponse(
+            {"ok": False, "error": "Send a file and kind (meals or workouts)."}, status=400
+        )
+    try:
+        skip_rows = max(int(request.POST.get("skip_rows") or 0), 0)
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "skip_rows must be an integer."}, status=400)
+
+    fmt = request.POST.get("format") or guess_format(upload.name)
+    try:
+        report = IMPORTERS[kind](request.user).run(
+            iter_records(upload, fmt), skip_rows=skip_rows,
+            max_rows=getattr(settings, "IMPORT_MAX_ROWS_PER_REQUEST", 20000),
+        )
+    except ImportFileError as exc:
+        return JsonResponse({"ok": False, "error": str(exc)}, status=400)
+    return JsonResponse({"ok": True, **report.as_dict()})
+
+
+@staff_member_required
+def dashboard_cache_stats(request):
+    """Hit/miss counters of the dashboard cache for this worker process."""
+    return JsonResponse({"ok": True, "stats": cache_stats()})
+
+
+def _scrape_allowed(request):
+    token = getattr(settings, "METRICS_SCRAPE_TOKEN", "")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if hmac.compare_digest(supplied.encode(), token.encode()):
+            return True
+    return request.user.is_active and request.user.is_staff
+
+
+@never_cache
+@require_GET
+def prometheus_metrics(request):
+    """
+    Prometheus scrape target (core.telemetry), summed over all worker processes
+    when METRICS_MULTIPROCESS_DIR is set.
+
+    Scrapers authenticate with ``Authorization: Bearer <METRICS_SCRAPE_TOKEN>``;
+    logged-in staff can open it in a browser.
+    """
+    if not _scrape_allowed(request):
+        return HttpResponse("Forbidden\n", status=403, content_type="text/plain")
+    return HttpResponse(telemetry.render(), content_type=telemetry.CONTENT_TYPE)
@@ -0,0 +1,47 @@
+"""
+Largest-Triangle-Three-Buckets (LTTB) downsampling for long chart series.
+
+LTTB keeps the first and last points and, for each of ``threshold - 2``
+equal-count buckets in between, the point forming the largest triangle
+with the point kept from the previous bucket and the mean of the next
+bucket. Peaks and troughs survive, which plain striding or averaging
+smooth away. One pass over the buckets; the work within a bucket is
+vectorised.
+"""
+import numpy as np
+
+DEFAULT_POINTS = 300
+MIN_POINTS = 10
+MAX_POINTS = 2000
+
+
+def lttb(x, y, threshold):
+    """Indices of the points to keep from ``x``/``y`` (sorted by x, no NaNs)."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def clamp_points(value):
+    try:
+        return min(max(int(value), MIN_POINTS), MAX_POINTS)
+    except (TypeError, ValueError):
+        return DEFAULT_POINTS
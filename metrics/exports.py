@@ -0,0 +1,100 @@
+"""
+Row generators for the streaming CSV export.
+
+Everything here yields one CSV line at a time from server-side cursors
+(``.iterator(chunk_size=...)``), so memory stays flat however many years of
+history a user asks for. The meals and sets exports take any range, since
+they only write rows that exist; the daily export writes a row for every
+calendar day, so its range is limited to MAX_DAILY_EXPORT_DAYS.
+"""
+import csv
+from datetime import timedelta
+
+from nutrition.models import Meal
+from training.models import Set
+
+from .models import DailyNutritionSummary, DailyTrainingSummary
+
+CHUNK_SIZE = 2000
+MAX_DAILY_EXPORT_DAYS = 10 * 366
+
+DAILY_HEADER = ["date", "calories", "protein", "carbs", "fat", "training_volume", "training_sets"]
+MEALS_HEADER = ["date", "logged_at", "meal_type", "food_name", "calories", "protein", "carbs", "fat"]
+SETS_HEADER = [
+    "date", "session", "exercise", "muscle_group", "set", "reps", "weight_kg", "rir", "is_warmup",
+]
+
+
+class _Echo:
+    """File-like object whose write() just hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _daily_rows(user, start, end):
+    # Both rollup streams are ordered by day, so walking the calendar merges them
+    # without holding either in memory.
+    nut = DailyNutritionSummary.objects.filter(user=user, day__range=(start, end)).order_by("day")
+    train = DailyTrainingSummary.objects.filter(user=user, day__range=(start, end)).order_by("day")
+    nut_iter = nut.values_list("day", "calories", "protein", "carbs", "fat").iterator(chunk_size=CHUNK_SIZE)
+    train_iter = train.values_list("day", "volume", "sets_count").iterator(chunk_size=CHUNK_SIZE)
+    n = next(nut_iter, None)
+    t = next(train_iter, None)
+    day = start
+    while True:
+        row = [day.isoformat(), 0, 0, 0, 0, 0, 0]
+        if n is not None and n[0] == day:
+            row[1:5] = n[1:]
+            n = next(nut_iter, None)
+        if t is not None and t[0] == day:
+            row[5:7] = t[1:]
+            t = next(train_iter, None)
+        yield row
+        if day >= end:
+            break  # never step past end (end may be date.max)
+        day += timedelta(days=1)
+
+
+def _meal_rows(user, start, end):
+    qs = (
+        Meal.objects.filter(user=user, local_date__range=(start, end))
+        .order_by("local_date", "created_at", "id")
+        .values_list("local_date", "created_at", "meal_type", "food_name", "calories", "protein", "carbs", "fat")
+    )
+    for local_date, created_at, *rest in qs.iterator(chunk_size=CHUNK_SIZE):
+        yield [local_date.isoformat(), created_at.isoformat(), *rest]
+
+
+def _set_rows(user, start, end):
+    qs = (
+        Set.objects.filter(
+            exercise__session__user=user, exercise__session__date__range=(start, end)
+        )
+        .order_by("exercise__session__date", "exercise__session_id", "exercise__order", "exercise_id", "order")
+        .values_list(
+            "exercise__session__date", "exercise__session__name", "exercise__name",
+            "exercise__muscle_group", "order", "reps", "weight_kg", "rir", "is_warmup",
+        )
+    )
+    for day, *rest in qs.iterator(chunk_size=CHUNK_SIZE):
+        yield [day.isoformat(), *rest]
+
+
+EXPORTS = {
+    "daily": (DAILY_HEADER, _daily_rows),
+    "meals": (MEALS_HEADER, _meal_rows),
+    "sets": (SETS_HEADER, _set_rows),
+}
+
+
+def stream_export(kind, user, start, end):
+    header, rows = EXPORTS[kind]
+    return _csv_lines(header, rows(user, start, end))
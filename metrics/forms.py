@@ -0,0 +1,23 @@
+from django import forms
+
+from .models import BodyMeasurement
+
+
+class BodyMeasurementForm(forms.ModelForm):
+    class Meta:
+        model = BodyMeasurement
+        fields = ["date", *BodyMeasurement.SERIES]
+        widgets = {
+            "date": forms.DateInput(attrs={"type": "date"}),
+            "weight_kg": forms.NumberInput(attrs={"step": "0.1", "min": "20", "max": "400", "placeholder": "80.0"}),
+            "body_fat_pct": forms.NumberInput(attrs={"step": "0.1", "min": "2", "max": "70", "placeholder": "18"}),
+            "waist_cm": forms.NumberInput(attrs={"step": "0.1", "min": "30", "max": "250", "placeholder": "84"}),
+            "hips_cm": forms.NumberInput(attrs={"step": "0.1", "min": "30", "max": "250", "placeholder": "98"}),
+            "chest_cm": forms.NumberInput(attrs={"step": "0.1", "min": "30", "max": "250", "placeholder": "102"}),
+        }
+
+    def clean(self):
+        cleaned = super().clean()
+        if all(cleaned.get(field) is None for field in BodyMeasurement.SERIES):
+            raise forms.ValidationError("Enter at least one measurement.")
+        return cleaned
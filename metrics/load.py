@@ -0,0 +1,214 @@
+"""
+Training load model: acute:chronic workload ratio and fitness/fatigue.
+
+Daily load is the rolled-up training volume (kg·reps) from
+DailyTrainingSummary. Users are processed in batches: a nightly window is
+loaded with one query into a dense users x days matrix, so the rolling
+means are cumulative-sum differences along the day axis and each EWMA is a
+single pass over the days that updates every user of the batch at once.
+Full rebuilds stream the batch's rows in user order and compute one user's
+history at a time. Rows are generated lazily and inserted INSERT_BATCH at a
+time, so no step holds a batch's whole output.
+
+Nightly runs only rewrite the trailing ``days`` of each series, since
+earlier rows do not change unless history is edited (use ``full=True`` to
+rewrite all). They read just that window plus the CHRONIC_DAYS before it
+for the rolling means, and start both EWMAs from the stored row of the day
+before the window, so their cost does not grow with account age. Users with
+no stored row to start from (first run, or back after a dormant spell) get
+their whole history computed once instead.
+
+Users idle for more than DORMANT_AFTER_DAYS are skipped: their stored rows
+are left as they are rather than rewritten with values that have decayed to
+zero.
+"""
+from datetime import timedelta
+from itertools import groupby, islice
+from operator import itemgetter
+
+import numpy as np
+from django.db import transaction
+from django.db.models import FloatField, Max, Min
+from django.db.models.functions import Cast
+
+from .models import DailyTrainingLoad, DailyTrainingSummary
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+FITNESS_DAYS = 42
+FATIGUE_DAYS = 7
+DEFAULT_WRITE_DAYS = 60
+BATCH_SIZE = 200
+INSERT_BATCH = 1000
+# after this many idle days both EWMAs have decayed to ~0; stop writing rows
+DORMANT_AFTER_DAYS = 6 * FITNESS_DAYS
+
+
+def _rolling_mean(loads, window):
+    cumulative = np.concatenate((np.zeros((loads.shape[0], 1)), np.cumsum(loads, axis=1)), axis=1)
+    end = np.arange(1, loads.shape[1] + 1)
+    return (cumulative[:, end] - cumulative[:, np.maximum(end - window, 0)]) / window
+
+
+def _ewma(loads, span, initial=None):
+    alpha = 2 / (span + 1)
+    out = np.empty_like(loads)
+    current = np.zeros(loads.shape[0]) if initial is None else np.array(initial, dtype=float)
+    for t in range(loads.shape[1]):
+        current += alpha * (loads[:, t] - current)
+        out[:, t] = current
+    return out
+
+
+def compute(loads, lead=0, fitness0=None, fatigue0=None):
+    """
+    All series for a users x days ``loads`` matrix (oldest day first).
+
+    The first ``lead`` days only feed the rolling means and are dropped from
+    the result; the EWMAs start on the day after them from ``fitness0`` and
+    ``fatigue0`` (per user, zero by default).
+    """
+    acute = _rolling_mean(loads, ACUTE_DAYS)[:, lead:]
+    chronic = _rolling_mean(loads, CHRONIC_DAYS)[:, lead:]
+    loads = loads[:, lead:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        acwr = np.where(chronic > 0, acute / chronic, np.nan)
+    fitness = _ewma(loads, FITNESS_DAYS, fitness0)
+    fatigue = _ewma(loads, FATIGUE_DAYS, fatigue0)
+    return {
+        "load": loads,
+        "acute": acute,
+        "chronic": chronic,
+        "acwr": acwr,
+        "fitness": fitness,
+        "fatigue": fatigue,
+        "form": fitness - fatigue,
+    }
+
+
+def _histories(user_ids, as_of):
+    """(user_id, first day, 1 x days loads) per user, one user's history in memory at a time."""
+    rows = (
+        DailyTrainingSummary.objects.filter(user_id__in=user_ids, day__lte=as_of)
+        .order_by("user_id", "day")
+        .values_list("user_id", "day", Cast("volume", FloatField()))
+    )
+    for user_id, group in groupby(rows.iterator(chunk_size=2000), key=itemgetter(0)):
+        group = list(group)
+        first = group[0][1]
+        loads = np.zeros((1, (as_of - first).days + 1))
+        for _, day, volume in group:
+            loads[0, (day - first).days] = volume
+        yield user_id, first, loads
+
+
+def _rows(users, origin, series, starts):
+    """DailyTrainingLoad rows for column ``starts[i]`` onwards of each user's series."""
+    for i, user_id in enumerate(users):
+        for t in range(starts[i], series["load"].shape[1]):
+            acwr = series["acwr"][i, t]
+            yield DailyTrainingLoad(
+                user_id=user_id,
+                day=origin + timedelta(days=t),
+                load=series["load"][i, t],
+                acute=series["acute"][i, t],
+                chronic=series["chronic"][i, t],
+                acwr=None if np.isnan(acwr) else float(acwr),
+                fitness=series["fitness"][i, t],
+                fatigue=series["fatigue"][i, t],
+                form=series["form"][i, t],
+            )
+
+
+def _insert(objs):
+    """bulk_create ``objs`` (any iterable) INSERT_BATCH rows at a time; returns the count."""
+    written = 0
+    while True:
+        chunk = list(islice(objs, INSERT_BATCH))
+        if not chunk:
+            return written
+        DailyTrainingLoad.objects.bulk_create(chunk)
+        written += len(chunk)
+
+
+def _refresh_full(user_ids, as_of):
+    """
+    Recompute and rewrite the whole history of ``user_ids``, one user at a
+    time: each series starts at that user's own first day, so memory follows
+    the longest single history rather than users x the batch's oldest day.
+    """
+    written = 0
+    with transaction.atomic():
+        DailyTrainingLoad.objects.filter(user_id__in=user_ids).delete()
+        for user_id, first, loads in _histories(user_ids, as_of):
+            written += _insert(_rows([user_id], first, compute(loads), [0]))
+    return written
+
+
+def _refresh_window(users, as_of, window_start, firsts, seeds):
+    """Rewrite ``window_start``..``as_of``, continuing from the stored ``seeds``."""
+    lead = CHRONIC_DAYS - 1
+    origin = window_start - timedelta(days=lead)
+    span = (as_of - origin).days + 1
+    position = {user_id: i for i, user_id in enumerate(users)}
+    loads = np.zeros((len(users), span))
+    for user_id, day, volume in (
+        DailyTrainingSummary.objects.filter(user_id__in=users, day__range=(origin, as_of))
+        .order_by()
+        .values_list("user_id", "day", Cast("volume", FloatField()))
+    ):
+        loads[position[user_id], (day - origin).days] = volume
+    fitness0 = [seeds.get(user_id, (0.0, 0.0))[0] for user_id in users]
+    fatigue0 = [seeds.get(user_id, (0.0, 0.0))[1] for user_id in users]
+    series = compute(loads, lead, fitness0, fatigue0)
+    starts = [max((firsts[user_id] - window_start).days, 0) for user_id in users]
+    with transaction.atomic():
+        DailyTrainingLoad.objects.filter(user_id__in=users, day__gte=window_start).delete()
+        return _insert(_rows(users, window_start, series, starts))
+
+
+def refresh_batch(user_ids, as_of, write_days=DEFAULT_WRITE_DAYS, full=False):
+    """Compute and store load series for ``user_ids``; returns rows written."""
+    if full:
+        return _refresh_full(user_ids, as_of)
+    window_start = as_of - timedelta(days=write_days - 1)
+    bounds = {
+        user_id: (first, last)
+        for user_id, first, last in DailyTrainingSummary.objects.filter(user_id__in=user_ids, day__lte=as_of)
+        .values("user_id").annotate(first=Min("day"), last=Max("day"))
+        .values_list("user_id", "first", "last")
+    }
+    seeds = {
+        user_id: (fitness, fatigue)
+        for user_id, fitness, fatigue in DailyTrainingLoad.objects.filter(
+            user_id__in=list(bounds), day=window_start - timedelta(days=1)
+        ).values_list("user_id", "fitness", "fatigue")
+    }
+    window, rebuild = [], []
+    for user_id, (first, last) in sorted(bounds.items()):
+        if (as_of - last).days > DORMANT_AFTER_DAYS:
+            continue
+        if first >= window_start or user_id in seeds:
+            window.append(user_id)
+        else:
+            rebuild.append(user_id)
+    written = _refresh_full(rebuild, as_of) if rebuild else 0
+    if window:
+        firsts = {user_id: bounds[user_id][0] for user_id in window}
+        written += _refresh_window(window, as_of, window_start, firsts, seeds)
+    return written
+
+
+def user_batches(user_ids=None, batch_size=BATCH_SIZE):
+    """Ids of users with any training, in ascending batches."""
+    qs = DailyTrainingSummary.objects.order_by("user_id").values_list("user_id", flat=True).distinct()
+    if user_ids:
+        qs = qs.filter(user_id__in=user_ids)
+    batch = []
+    for user_id in qs.iterator():
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
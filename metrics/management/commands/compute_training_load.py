@@ -0,0 +1,46 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.cache import bump_data_version
+from metrics import load
+
+
+class Command(BaseCommand):
+    help = "Compute ACWR and fitness/fatigue series from the daily training rollups (run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--as-of", help="Last day to compute (YYYY-MM-DD, default today).")
+        parser.add_argument(
+            "--days", type=int, default=load.DEFAULT_WRITE_DAYS,
+            help="Trailing days of each series to (re)write.",
+        )
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Rewrite every day of history (after imports or history edits).",
+        )
+        parser.add_argument("--batch-size", type=int, default=load.BATCH_SIZE)
+        parser.add_argument(
+            "--user", type=int, action="append", dest="users",
+            help="Only compute this user id (may be given multiple times).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            as_of = date.fromisoformat(options["as_of"]) if options["as_of"] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--as-of must be a YYYY-MM-DD date.")
+        if options["days"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--days and --batch-size must be positive.")
+
+        users = rows = 0
+        started = time.monotonic()
+        for batch in load.user_batches(options["users"], options["batch_size"]):
+            rows += load.refresh_batch(batch, as_of, options["days"], options["full"])
+            for user_id in batch:
+                bump_data_version(user_id)
+            users += len(batch)
+            self.stdout.write(f"{users} user(s), {rows} row(s), {time.monotonic() - started:.1f}s")
+        self.stdout.write(self.style.SUCCESS(f"Training load computed for {users} user(s) as of {as_of}."))
@@ -0,0 +1,115 @@
+import json
+import os
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from metrics.summaries import CHUNK_SIZE, init_worker, run_chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh every user's weekly averages, training volume and streaks, "
+        "spreading chunks of user ids over a process pool. Completed chunks are "
+        "checkpointed; re-run with --resume to continue an interrupted run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--as-of", help="Day to summarise up to (YYYY-MM-DD, default today).")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="Worker processes (1 runs in-process).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            "--checkpoint-file",
+            help="Where to record finished chunks (default: user_summaries_<as-of>.checkpoint).",
+        )
+        parser.add_argument("--resume", action="store_true", help="Skip chunks already finished.")
+        parser.add_argument("--timings-file", help="Write per-chunk timings as JSON to this file.")
+        parser.add_argument(
+            "--user", type=int, action="append", dest="users",
+            help="Only refresh this user id (may be given multiple times).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            as_of = date.fromisoformat(options["as_of"]) if options["as_of"] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--as-of must be a YYYY-MM-DD date.")
+        workers, chunk_size = options["workers"], options["chunk_size"]
+        if workers < 1 or chunk_size < 1:
+            raise CommandError("--workers and --chunk-size must be positive.")
+
+        checkpoint_file = Path(options["checkpoint_file"] or f"user_summaries_{as_of}.checkpoint")
+        done = []
+        if options["resume"] and checkpoint_file.exists():
+            state = json.loads(checkpoint_file.read_text())
+            if state.get("as_of") != as_of.isoformat():
+                raise CommandError(
+                    f"{checkpoint_file} is for {state.get('as_of')}, not {as_of}; drop --resume or the file."
+                )
+            done = state["chunks"]
+            self.stdout.write(f"Resuming: {len(done)} chunk(s) already done.")
+
+        users = get_user_model().objects.order_by("pk").values_list("pk", flat=True)
+        if options["users"]:
+            users = users.filter(pk__in=options["users"])
+        ranges = sorted((c["lo"], c["hi"]) for c in done)
+        los = [lo for lo, _ in ranges]
+
+        def already_done(pk):
+            i = bisect_right(los, pk) - 1
+            return i >= 0 and pk <= ranges[i][1]
+
+        user_ids = [pk for pk in users if not already_done(pk)]
+        chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+        if not chunks:
+            self.stdout.write(self.style.SUCCESS("Nothing to do."))
+            return
+
+        started = time.perf_counter()
+        timings = []
+
+        def finished(result):
+            timings.append(result)
+            done.append(result)
+            tmp = checkpoint_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"as_of": as_of.isoformat(), "chunks": done}))
+            os.replace(tmp, checkpoint_file)
+            elapsed = time.perf_counter() - started
+            finished_users = sum(t["users"] for t in timings)
+            eta = elapsed / finished_users * (len(user_ids) - finished_users)
+            self.stdout.write(
+                f"[{len(timings)}/{len(chunks)}] users {result['lo']}-{result['hi']} "
+                f"({result['users']}) in {result['seconds']:.2f}s by pid {result['pid']}; "
+                f"{finished_users}/{len(user_ids)} done, {elapsed:.1f}s elapsed, ~{eta:.0f}s left"
+            )
+
+        if workers == 1:
+            for chunk in chunks:
+                finished(run_chunk(chunk, as_of))
+        else:
+            # Children must not share the parent's database connections.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                futures = [pool.submit(run_chunk, chunk, as_of) for chunk in chunks]
+                for future in as_completed(futures):
+                    finished(future.result())
+
+        elapsed = time.perf_counter() - started
+        seconds = [t["seconds"] for t in timings]
+        if options["timings_file"]:
+            Path(options["timings_file"]).write_text(json.dumps(timings, indent=2))
+        checkpoint_file.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"Summarised {len(user_ids)} user(s) in {len(chunks)} chunk(s) with {workers} worker(s) "
+            f"in {elapsed:.1f}s (chunk mean {sum(seconds) / len(seconds):.2f}s, max {max(seconds):.2f}s)."
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metrics', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTrainingLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('load', models.FloatField(default=0)),
+                ('acute', models.FloatField(default=0)),
+                ('chronic', models.FloatField(default=0)),
+                ('acwr', models.FloatField(blank=True, null=True)),
+                ('fitness', models.FloatField(default=0)),
+                ('fatigue', models.FloatField(default=0)),
+                ('form', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_training_load', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='uniq_daily_training_load_user_day')],
+            },
+        ),
+    ]
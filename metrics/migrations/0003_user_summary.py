@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metrics', '0002_daily_training_load'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField()),
+                ('nutrition_days_7d', models.PositiveIntegerField(default=0)),
+                ('avg_calories_7d', models.FloatField(default=0)),
+                ('avg_protein_7d', models.FloatField(default=0)),
+                ('avg_carbs_7d', models.FloatField(default=0)),
+                ('avg_fat_7d', models.FloatField(default=0)),
+                ('training_volume_7d', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('training_volume_28d', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sessions_7d', models.PositiveIntegerField(default=0)),
+                ('logging_streak', models.PositiveIntegerField(default=0)),
+                ('longest_logging_streak', models.PositiveIntegerField(default=0)),
+                ('training_streak_weeks', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'user summaries',
+            },
+        ),
+    ]
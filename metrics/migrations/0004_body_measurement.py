@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_from_profiles(apps, schema_editor):
+    # Profile.weight_kg is the only weight we have so far: start each history with it
+    Profile = apps.get_model("accounts", "Profile")
+    BodyMeasurement = apps.get_model("metrics", "BodyMeasurement")
+    BodyMeasurement.objects.bulk_create(
+        [
+            BodyMeasurement(user_id=user_id, date=created_at.date(), weight_kg=weight_kg)
+            for user_id, created_at, weight_kg in Profile.objects.values_list("user_id", "created_at", "weight_kg")
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_profile_targets'),
+        ('metrics', '0003_user_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BodyMeasurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('weight_kg', models.FloatField(blank=True, null=True)),
+                ('body_fat_pct', models.FloatField(blank=True, null=True)),
+                ('waist_cm', models.FloatField(blank=True, null=True)),
+                ('hips_cm', models.FloatField(blank=True, null=True)),
+                ('chest_cm', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='body_measurements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'date'), name='uniq_body_measurement_user_date')],
+            },
+        ),
+        migrations.RunPython(seed_from_profiles, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,144 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class DailyNutritionSummary(models.Model):
+    """Per-user, per-day nutrition totals kept current by metrics.signals."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_nutrition"
+    )
+    day = models.DateField()
+    calories = models.PositiveIntegerField(default=0)
+    protein = models.FloatField(default=0)
+    carbs = models.FloatField(default=0)
+    fat = models.FloatField(default=0)
+    meals_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="uniq_daily_nutrition_user_day"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} nutrition {self.day}"
+
+
+class DailyTrainingSummary(models.Model):
+    """Per-user, per-day training totals kept current by metrics.signals."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_training"
+    )
+    day = models.DateField()
+    volume = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sets_count = models.PositiveIntegerField(default=0)
+    exercises_count = models.PositiveIntegerField(default=0)
+    sessions_count = models.PositiveIntegerField(default=0)
+    duration_min = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="uniq_daily_training_user_day"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} training {self.day}"
+
+
+class DailyTrainingLoad(models.Model):
+    """
+    Per-user, per-day training load model written by the nightly
+    ``compute_training_load`` command (metrics.load) from DailyTrainingSummary.
+
+    ``acute``/``chronic`` are 7/28-day rolling means of daily volume and
+    ``acwr`` their ratio; ``fitness``/``fatigue`` are 42/7-day EWMAs of volume
+    and ``form`` is fitness minus fatigue.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_training_load"
+    )
+    day = models.DateField()
+    load = models.FloatField(default=0)
+    acute = models.FloatField(default=0)
+    chronic = models.FloatField(default=0)
+    acwr = models.FloatField(null=True, blank=True)
+    fitness = models.FloatField(default=0)
+    fatigue = models.FloatField(default=0)
+    form = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="uniq_daily_training_load_user_day"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} load {self.day}"
+
+
+class UserSummary(models.Model):
+    """
+    Per-user weekly averages, volume and streaks, refreshed by the nightly
+    ``refresh_user_summaries`` command (metrics.summaries) as of ``as_of``.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="summary"
+    )
+    as_of = models.DateField()
+    # nutrition over the 7 days ending on as_of, averaged over days with meals
+    nutrition_days_7d = models.PositiveIntegerField(default=0)
+    avg_calories_7d = models.FloatField(default=0)
+    avg_protein_7d = models.FloatField(default=0)
+    avg_carbs_7d = models.FloatField(default=0)
+    avg_fat_7d = models.FloatField(default=0)
+    training_volume_7d = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    training_volume_28d = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sessions_7d = models.PositiveIntegerField(default=0)
+    # consecutive days with a meal logged, still alive if the last one was as_of or the day before
+    logging_streak = models.PositiveIntegerField(default=0)
+    longest_logging_streak = models.PositiveIntegerField(default=0)
+    # consecutive ISO weeks with at least one session, counting this week or last
+    training_streak_weeks = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "user summaries"
+
+    def __str__(self):
+        return f"{self.user_id} summary {self.as_of}"
+
+
+class BodyMeasurement(models.Model):
+    """One day's bodyweight and tape measurements; charted via metrics.downsample."""
+
+    SERIES = ("weight_kg", "body_fat_pct", "waist_cm", "hips_cm", "chest_cm")
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="body_measurements"
+    )
+    date = models.DateField()
+    weight_kg = models.FloatField(null=True, blank=True)
+    body_fat_pct = models.FloatField(null=True, blank=True)
+    waist_cm = models.FloatField(null=True, blank=True)
+    hips_cm = models.FloatField(null=True, blank=True)
+    chest_cm = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["date"]
+        constraints = [
+            # also serves as the (user, date) index for range reads
+            models.UniqueConstraint(fields=["user", "date"], name="uniq_body_measurement_user_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} body {self.date}"
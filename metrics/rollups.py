@@ -0,0 +1,172 @@
+"""
+Daily rollups for the metrics dashboard.
+
+Each (user, day) bucket is recomputed from its source rows whenever something
+in that bucket changes, so the dashboard and CSV export only ever read a
+handful of precomputed rows instead of re-aggregating a user's whole history.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+from django.dispatch import Signal
+
+from nutrition.models import Meal
+from training.models import Exercise, Set, TrainingSession
+
+from .models import DailyNutritionSummary, DailyTrainingSummary
+
+VOLUME_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+# Sent with ``user_ids`` (a set) once rewritten daily buckets have committed,
+# including full rebuilds after imports that bypass model signals.
+rollups_refreshed = Signal()
+
+
+def meal_day(meal):
+    """Calendar day a meal is bucketed under (the owner's local day at write time)."""
+    return meal.local_date
+
+
+def _set_volume():
+    return Coalesce(
+        F("weight_kg") * Cast(F("reps"), output_field=VOLUME_FIELD),
+        Value(0, output_field=VOLUME_FIELD),
+        output_field=VOLUME_FIELD,
+    )
+
+
+def refresh_nutrition_day(user_id, day):
+    agg = Meal.objects.filter(user_id=user_id, local_date=day).aggregate(
+        calories=Sum("calories"),
+        protein=Sum("protein"),
+        carbs=Sum("carbs"),
+        fat=Sum("fat"),
+        meals_count=Count("id"),
+    )
+    if not agg["meals_count"]:
+        DailyNutritionSummary.objects.filter(user_id=user_id, day=day).delete()
+        return None
+    summary, _ = DailyNutritionSummary.objects.update_or_create(
+        user_id=user_id,
+        day=day,
+        defaults={k: (v or 0) for k, v in agg.items()},
+    )
+    return summary
+
+
+def refresh_training_day(user_id, day):
+    sessions = TrainingSession.objects.filter(user_id=user_id, date=day)
+    session_agg = sessions.aggregate(
+        sessions_count=Count("id"),
+        duration_min=Sum("duration_min"),
+    )
+    if not session_agg["sessions_count"]:
+        DailyTrainingSummary.objects.filter(user_id=user_id, day=day).delete()
+        return None
+    set_agg = Set.objects.filter(
+        exercise__session__user_id=user_id, exercise__session__date=day
+    ).aggregate(volume=Sum(_set_volume()), sets_count=Count("id"))
+    exercises_count = Exercise.objects.filter(session__in=sessions).count()
+    summary, _ = DailyTrainingSummary.objects.update_or_create(
+        user_id=user_id,
+        day=day,
+        defaults={
+            "volume": set_agg["volume"] or Decimal("0"),
+            "sets_count": set_agg["sets_count"] or 0,
+            "exercises_count": exercises_count,
+            "sessions_count": session_agg["sessions_count"],
+            "duration_min": session_agg["duration_min"] or 0,
+        },
+    )
+    return summary
+
+
+def rebuild_user(user_id, days=None):
+    """
+    Drop and recompute one user's daily buckets with grouped queries: every
+    bucket, or only those for ``days`` (e.g. the days an import chunk touched).
+
+    Listeners (the data version bump) run on commit of the outermost
+    transaction, so a caller's atomic block cannot publish a version that
+    readers would pair with pre-commit data.
+    """
+    with transaction.atomic():
+        _rebuild_user(user_id, days)
+    transaction.on_commit(lambda: rollups_refreshed.send(sender=None, user_ids={user_id}))
+
+
+def _only(days, field):
+    return {} if days is None else {f"{field}__in": list(days)}
+
+
+def _rebuild_user(user_id, days=None):
+    DailyNutritionSummary.objects.filter(user_id=user_id, **_only(days, "day")).delete()
+    DailyTrainingSummary.objects.filter(user_id=user_id, **_only(days, "day")).delete()
+
+    nutrition = (
+        Meal.objects.filter(user_id=user_id, **_only(days, "local_date"))
+        .values(day=F("local_date"))
+        .annotate(
+            calories=Sum("calories"),
+            protein=Sum("protein"),
+            carbs=Sum("carbs"),
+            fat=Sum("fat"),
+            meals_count=Count("id"),
+        )
+        .order_by("day")
+    )
+    DailyNutritionSummary.objects.bulk_create(
+        [
+            DailyNutritionSummary(
+                user_id=user_id,
+                day=row["day"],
+                calories=row["calories"] or 0,
+                protein=row["protein"] or 0,
+                carbs=row["carbs"] or 0,
+                fat=row["fat"] or 0,
+                meals_count=row["meals_count"],
+            )
+            for row in nutrition
+        ],
+        batch_size=500,
+    )
+
+    sessions = {
+        row["date"]: row
+        for row in TrainingSession.objects.filter(user_id=user_id, **_only(days, "date"))
+        .values("date")
+        .annotate(sessions_count=Count("id"), duration_min=Sum("duration_min"))
+        .order_by()
+    }
+    sets = {
+        row["day"]: row
+        for row in Set.objects.filter(exercise__session__user_id=user_id, **_only(days, "exercise__session__date"))
+        .annotate(day=F("exercise__session__date"))
+        .values("day")
+        .annotate(volume=Sum(_set_volume()), sets_count=Count("id"))
+        .order_by()
+    }
+    exercises = {
+        row["session__date"]: row["n"]
+        for row in Exercise.objects.filter(session__user_id=user_id, **_only(days, "session__date"))
+        .values("session__date")
+        .annotate(n=Count("id"))
+        .order_by()
+    }
+    DailyTrainingSummary.objects.bulk_create(
+        [
+            DailyTrainingSummary(
+                user_id=user_id,
+                day=day,
+                volume=sets.get(day, {}).get("volume") or Decimal("0"),
+                sets_count=sets.get(day, {}).get("sets_count") or 0,
+                exercises_count=exercises.get(day, 0),
+                sessions_count=row["sessions_count"],
+                duration_min=row["duration_min"] or 0,
+            )
+            for day, row in sorted(sessions.items())
+        ],
+        batch_size=500,
+    )
@@ -0,0 +1,138 @@
+"""
+Nutrition and training series at day, week, month or year granularity.
+
+Buckets are aggregated in the database from the daily rollup tables
+(DailyNutritionSummary / DailyTrainingSummary) with ``Trunc`` + GROUP BY, so
+a query returns at most one row per bucket however long the range: two
+years by month reads 24 grouped rows, about what 30 days by day reads.
+Empty buckets are filled in Python so every column lines up with ``labels``.
+
+Weeks start on Monday (ISO). Nutrition values are averages per logged day;
+training values are totals for the bucket. Labels are bucket starts; the
+first and last buckets only cover the part inside [start, end], which must
+lie within FIRST_DAY..LAST_DAY (far enough from date.min/date.max that
+bucket arithmetic cannot overflow).
+"""
+from datetime import date, timedelta
+
+from django.db.models import Avg, Count, DateField, Sum
+from django.db.models.functions import Trunc
+
+from .models import DailyNutritionSummary, DailyTrainingSummary
+
+GRANULARITIES = ("day", "week", "month", "year")
+MAX_BUCKETS = 1000
+FIRST_DAY = date(1900, 1, 1)
+LAST_DAY = date(2999, 12, 31)
+# Default range per granularity, counted in buckets back from the current one
+DEFAULT_BUCKETS = {"day": 30, "week": 12, "month": 12, "year": 5}
+
+
+def bucket_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_bucket(day, granularity):
+    if granularity == "week":
+        return day + timedelta(days=7)
+    if granularity == "month":
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    if granularity == "year":
+        return date(day.year + 1, 1, 1)
+    return day + timedelta(days=1)
+
+
+def previous_bucket(day, granularity, count):
+    """Start of the bucket ``count`` buckets before the one holding ``day``."""
+    day = bucket_start(day, granularity)
+    if granularity == "day":
+        return day - timedelta(days=count)
+    if granularity == "week":
+        return day - timedelta(weeks=count)
+    if granularity == "month":
+        months = day.year * 12 + day.month - 1 - count
+        return date(months // 12, months % 12 + 1, 1)
+    return date(day.year - count, 1, 1)
+
+
+def bucket_count(start, end, granularity):
+    """Number of buckets ``bucket_labels`` would return, without building them."""
+    if granularity == "week":
+        return (bucket_start(end, "week") - bucket_start(start, "week")).days // 7 + 1
+    if granularity == "month":
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    if granularity == "year":
+        return end.year - start.year + 1
+    return (end - start).days + 1
+
+
+def bucket_labels(start, end, granularity):
+    labels = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        labels.append(current)
+        current = next_bucket(current, granularity)
+    return labels
+
+
+def _grouped(model, user, start, end, granularity, aggregates):
+    rows = (
+        model.objects.filter(user=user, day__range=(start, end))
+        .annotate(bucket=Trunc("day", granularity, output_field=DateField()))
+        .values("bucket")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    return {row.pop("bucket"): row for row in rows}
+
+
+def _column(rows, labels, key, digits=1):
+    """Values of ``key`` per label (0 for empty buckets); ``digits=0`` gives ints."""
+    out = []
+    for label in labels:
+        value = rows.get(label, {}).get(key)
+        if value is None:
+            out.append(0)
+        else:
+            out.append(round(float(value), digits) if digits else int(round(value)))
+    return out
+
+
+def bucketed_series(user, granularity, start, end):
+    """Columnar payload: ``labels`` plus one list per series, aligned with them."""
+    labels = bucket_labels(start, end, granularity)
+    nutrition = _grouped(DailyNutritionSummary, user, start, end, granularity, {
+        "calories": Avg("calories"), "protein": Avg("protein"), "carbs": Avg("carbs"),
+        "fat": Avg("fat"), "meals": Sum("meals_count"), "days": Count("id"),
+    })
+    training = _grouped(DailyTrainingSummary, user, start, end, granularity, {
+        "volume": Sum("volume"), "sets": Sum("sets_count"), "sessions": Sum("sessions_count"),
+        "duration_min": Sum("duration_min"), "days": Count("id"),
+    })
+    return {
+        "granularity": granularity,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "labels": [label.isoformat() for label in labels],
+        "nutrition": {
+            "calories": _column(nutrition, labels, "calories", 0),
+            "protein": _column(nutrition, labels, "protein"),
+            "carbs": _column(nutrition, labels, "carbs"),
+            "fat": _column(nutrition, labels, "fat"),
+            "meals": _column(nutrition, labels, "meals", 0),
+            "days": _column(nutrition, labels, "days", 0),
+        },
+        "training": {
+            "volume": _column(training, labels, "volume"),
+            "sets": _column(training, labels, "sets", 0),
+            "sessions": _column(training, labels, "sessions", 0),
+            "duration_min": _column(training, labels, "duration_min", 0),
+            "days": _column(training, labels, "days", 0),
+        },
+    }
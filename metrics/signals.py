@@ -0,0 +1,171 @@
+"""
+Keep the daily rollup tables in step with Meal and training writes.
+
+Handlers only record which (user, day) buckets became dirty; the buckets are
+recomputed once per transaction on commit, so a cascading delete of a session
+with dozens of sets refreshes its day a single time.
+
+Body measurement writes also copy the latest logged weight onto the profile,
+which recomputes the user's daily targets (accounts.targets). A new profile
+starts the weight history with its signup weight.
+"""
+import threading
+
+from django.db import transaction
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import Profile
+
+from nutrition.models import Meal
+from training.models import Exercise, Set, TrainingSession
+
+from . import rollups
+from .models import BodyMeasurement
+
+NUTRITION = "nutrition"
+TRAINING = "training"
+
+_local = threading.local()
+
+
+def _state():
+    if not hasattr(_local, "dirty"):
+        _local.dirty = set()
+        _local.session_keys = {}
+        _local.exercise_keys = {}
+    return _local
+
+
+def _flush():
+    state = _state()
+    dirty, state.dirty = state.dirty, set()
+    state.session_keys = {}
+    state.exercise_keys = {}
+    if not dirty:
+        return
+    for kind, user_id, day in sorted(dirty, key=str):
+        if kind == NUTRITION:
+            rollups.refresh_nutrition_day(user_id, day)
+        else:
+            rollups.refresh_training_day(user_id, day)
+    rollups.rollups_refreshed.send(sender=None, user_ids={user_id for _, user_id, _ in dirty})
+
+
+def mark_dirty(kind, user_id, day):
+    if user_id is None or day is None:
+        return
+    _state().dirty.add((kind, user_id, day))
+    # Buckets left over from a rolled-back transaction are simply recomputed
+    # by the next flush; recomputing from source is always safe.
+    transaction.on_commit(_flush)
+
+
+def _session_key(session_id):
+    keys = _state().session_keys
+    if session_id not in keys:
+        keys[session_id] = (
+            TrainingSession.objects.filter(pk=session_id).values_list("user_id", "date").first()
+        )
+    return keys[session_id]
+
+
+def _exercise_key(exercise_id):
+    keys = _state().exercise_keys
+    if exercise_id not in keys:
+        keys[exercise_id] = (
+            TrainingSession.objects.filter(exercises__id=exercise_id)
+            .values_list("user_id", "date")
+            .first()
+        )
+    return keys[exercise_id]
+
+
+def _cached_related(instance, field_name):
+    """Return a related object only if it is already loaded, without a query."""
+    field = instance._meta.get_field(field_name)
+    return field.get_cached_value(instance) if field.is_cached(instance) else None
+
+
+@receiver(post_save, sender=Meal)
+@receiver(post_delete, sender=Meal)
+def meal_changed(sender, instance, **kwargs):
+    mark_dirty(NUTRITION, instance.user_id, rollups.meal_day(instance))
+
+
+@receiver(pre_save, sender=TrainingSession)
+def session_date_changing(sender, instance, **kwargs):
+    # Only remember the old day here: outside a transaction on_commit runs
+    # immediately, so marking now would refresh it before the UPDATE lands.
+    instance._rollup_previous_day = None
+    if instance.pk is None:
+        return
+    previous = (
+        TrainingSession.objects.filter(pk=instance.pk).values_list("user_id", "date").first()
+    )
+    if previous and previous[1] != instance.date:
+        instance._rollup_previous_day = previous
+
+
+@receiver(post_save, sender=TrainingSession)
+@receiver(post_delete, sender=TrainingSession)
+def session_changed(sender, instance, **kwargs):
+    previous = getattr(instance, "_rollup_previous_day", None)
+    if previous:
+        mark_dirty(TRAINING, *previous)
+    mark_dirty(TRAINING, instance.user_id, instance.date)
+
+
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+def exercise_changed(sender, instance, **kwargs):
+    session = _cached_related(instance, "session")
+    key = (session.user_id, session.date) if session else _session_key(instance.session_id)
+    if key:
+        mark_dirty(TRAINING, *key)
+
+
+@receiver(post_save, sender=Set)
+@receiver(post_delete, sender=Set)
+def set_changed(sender, instance, **kwargs):
+    exercise = _cached_related(instance, "exercise")
+    session = _cached_related(exercise, "session") if exercise else None
+    key = (session.user_id, session.date) if session else _exercise_key(instance.exercise_id)
+    if key:
+        mark_dirty(TRAINING, *key)
+
+
+def sync_profile_weight(user_id):
+    latest = (
+        BodyMeasurement.objects.filter(user_id=user_id, weight_kg__isnull=False)
+        .order_by("-date").values_list("weight_kg", flat=True).first()
+    )
+    if latest is None:
+        return
+    try:
+        profile = Profile.objects.get(user_id=user_id)
+    except ObjectDoesNotExist:
+        return
+    if profile.weight_kg != latest:
+        profile.weight_kg = latest
+        profile.save(update_fields=["weight_kg"])
+
+
+@receiver(post_save, sender=BodyMeasurement)
+@receiver(post_delete, sender=BodyMeasurement)
+def body_measurement_changed(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: sync_profile_weight(user_id))
+
+
+@receiver(post_save, sender=Profile)
+def profile_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    BodyMeasurement.objects.get_or_create(
+        user_id=instance.user_id,
+        date=timezone.localdate(timezone.now(), instance.tzinfo),
+        defaults={"weight_kg": instance.weight_kg},
+    )
@@ -0,0 +1,168 @@
+"""
+Nightly per-user summaries: weekly nutrition averages, training volume and
+streaks (see UserSummary).
+
+summarize_chunk() covers one chunk of user ids with a fixed handful of
+grouped queries over the daily rollup tables, whatever the chunk size.
+Streaks (the longest one needs all history) are counted in a single pass
+over an ordered query iterator, so memory stays flat however long users
+have been logging. The refresh_user_summaries command fans chunks out over
+a process pool; each worker runs init_worker() once and then run_chunk()
+per chunk.
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg, Count, Q, Sum
+
+from core.cache import bump_data_version
+
+from .models import DailyNutritionSummary, DailyTrainingSummary, UserSummary
+
+CHUNK_SIZE = 1000
+
+_SUMMARY_FIELDS = [
+    "as_of", "nutrition_days_7d", "avg_calories_7d", "avg_protein_7d", "avg_carbs_7d",
+    "avg_fat_7d", "training_volume_7d", "training_volume_28d", "sessions_7d",
+    "logging_streak", "longest_logging_streak", "training_streak_weeks", "updated_at",
+]
+
+
+def _streaks(pairs, current_from):
+    """
+    Run lengths of consecutive integers per user, in one pass over ``pairs``.
+
+    ``pairs`` are (user_id, n) ordered by user then n; repeats of the same n
+    are ignored, so it can be fed straight from an ordered query iterator.
+    Returns {user_id: (current, longest)}, where a run is current if its last
+    value is >= ``current_from``.
+    """
+    out = {}
+    user = last = None
+    run = longest = 0
+    for user_id, n in pairs:
+        if user_id != user:
+            if user is not None:
+                out[user] = (run if last >= current_from else 0, longest)
+            user, last, run, longest = user_id, n, 1, 1
+        elif n != last:
+            run = run + 1 if n == last + 1 else 1
+            longest = max(longest, run)
+            last = n
+    if user is not None:
+        out[user] = (run if last >= current_from else 0, longest)
+    return out
+
+
+def _iso_week(day):
+    # date(1, 1, 1) was a Monday and has ordinal 1
+    return (day.toordinal() - 1) // 7
+
+
+def summarize_chunk(user_ids, as_of):
+    """Recompute and upsert UserSummary rows for ``user_ids``; returns how many."""
+    week_start = as_of - timedelta(days=6)
+    month_start = as_of - timedelta(days=27)
+
+    nutrition = {
+        row["user_id"]: row
+        for row in DailyNutritionSummary.objects.filter(
+            user_id__in=user_ids, day__range=(week_start, as_of)
+        )
+        .values("user_id")
+        .annotate(
+            days=Count("id"), calories=Avg("calories"), protein=Avg("protein"),
+            carbs=Avg("carbs"), fat=Avg("fat"),
+        )
+        .order_by()
+    }
+    training = {
+        row["user_id"]: row
+        for row in DailyTrainingSummary.objects.filter(
+            user_id__in=user_ids, day__range=(month_start, as_of)
+        )
+        .values("user_id")
+        .annotate(
+            volume_28d=Sum("volume"),
+            volume_7d=Sum("volume", filter=Q(day__gte=week_start)),
+            sessions_7d=Sum("sessions_count", filter=Q(day__gte=week_start)),
+        )
+        .order_by()
+    }
+    logging = _streaks(
+        (
+            (user_id, day.toordinal())
+            for user_id, day in DailyNutritionSummary.objects.filter(user_id__in=user_ids, day__lte=as_of)
+            .order_by("user_id", "day")
+            .values_list("user_id", "day")
+            .iterator(chunk_size=5000)
+        ),
+        current_from=as_of.toordinal() - 1,
+    )
+    training_weeks = _streaks(
+        (
+            (user_id, _iso_week(day))
+            for user_id, day in DailyTrainingSummary.objects.filter(
+                user_id__in=user_ids, day__lte=as_of, sessions_count__gt=0
+            )
+            .order_by("user_id", "day")
+            .values_list("user_id", "day")
+            .iterator(chunk_size=5000)
+        ),
+        current_from=_iso_week(as_of) - 1,
+    )
+
+    summaries = []
+    for user_id in user_ids:
+        n = nutrition.get(user_id, {})
+        t = training.get(user_id, {})
+        current, longest = logging.get(user_id, (0, 0))
+        summaries.append(UserSummary(
+            user_id=user_id,
+            as_of=as_of,
+            nutrition_days_7d=n.get("days") or 0,
+            avg_calories_7d=n.get("calories") or 0,
+            avg_protein_7d=n.get("protein") or 0,
+            avg_carbs_7d=n.get("carbs") or 0,
+            avg_fat_7d=n.get("fat") or 0,
+            training_volume_7d=t.get("volume_7d") or 0,
+            training_volume_28d=t.get("volume_28d") or 0,
+            sessions_7d=t.get("sessions_7d") or 0,
+            logging_streak=current,
+            longest_logging_streak=longest,
+            training_streak_weeks=training_weeks.get(user_id, (0, 0))[0],
+        ))
+    with transaction.atomic():
+        UserSummary.objects.bulk_create(
+            summaries, update_conflicts=True, unique_fields=["user"], update_fields=_SUMMARY_FIELDS,
+        )
+    for user_id in user_ids:
+        bump_data_version(user_id)
+    return len(summaries)
+
+
+def init_worker():
+    """
+    Process-pool initializer. The parent closes its connections before the pool
+    starts, so each worker lazily opens its own; with the spawn/forkserver start
+    methods Django also has to be set up in the child.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+
+
+def run_chunk(user_ids, as_of):
+    """Worker entry point: summarise one chunk and report its timing."""
+    started = time.perf_counter()
+    count = summarize_chunk(user_ids, as_of)
+    return {
+        "lo": user_ids[0],
+        "hi": user_ids[-1],
+        "users": count,
+        "seconds": round(time.perf_counter() - started, 3),
+        "pid": os.getpid(),
+    }
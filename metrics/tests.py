@@ -1,3 +1,287 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from accounts.models import Profile
+from nutrition.models import Meal
+from training.models import Exercise, Set, TrainingSession
+
+from . import load
+from .downsample import lttb
+from .exports import MAX_DAILY_EXPORT_DAYS
+from .models import (
+    BodyMeasurement, DailyNutritionSummary, DailyTrainingLoad, DailyTrainingSummary, UserSummary,
+)
+from .series import bucket_count, bucket_labels, previous_bucket
+
+
+class RollupMaintenanceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+        self.day = date(2024, 3, 1)
+
+    def add_meal(self, calories, protein=10):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Meal.objects.create(
+                user=self.user, meal_type="Lunch", food_name="Rice", calories=calories,
+                protein=protein, carbs=0, fat=0, local_date=self.day,
+            )
+
+    def nutrition(self, day=None):
+        return DailyNutritionSummary.objects.filter(user=self.user, day=day or self.day).first()
+
+    def test_meal_create_update_delete(self):
+        first = self.add_meal(500)
+        self.add_meal(300, protein=20)
+        summary = self.nutrition()
+        self.assertEqual((summary.calories, summary.protein, summary.meals_count), (800, 30, 2))
+
+        first.calories = 600
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        self.assertEqual(self.nutrition().calories, 900)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Meal.objects.filter(user=self.user).delete()
+        self.assertIsNone(self.nutrition())
+
+    def log_session(self, day, sets=((5, "100"), (5, "110"))):
+        with self.captureOnCommitCallbacks(execute=True):
+            session = TrainingSession.objects.create(user=self.user, name="Push", date=day, duration_min=45)
+            exercise = Exercise.objects.create(session=session, name="Bench Press", order=0)
+            for order, (reps, weight) in enumerate(sets):
+                Set.objects.create(exercise=exercise, order=order, reps=reps, weight_kg=Decimal(weight))
+        return session
+
+    def test_training_create_and_set_delete(self):
+        session = self.log_session(self.day)
+        summary = DailyTrainingSummary.objects.get(user=self.user, day=self.day)
+        self.assertEqual((summary.volume, summary.sets_count, summary.sessions_count), (Decimal("1050"), 2, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Set.objects.filter(exercise__session=session, weight_kg=Decimal("110")).delete()
+        summary = DailyTrainingSummary.objects.get(user=self.user, day=self.day)
+        self.assertEqual((summary.volume, summary.sets_count), (Decimal("500"), 1))
+
+    def test_session_date_change_moves_its_bucket(self):
+        session = self.log_session(self.day)
+        new_day = date(2024, 3, 5)
+        session.date = new_day
+        with self.captureOnCommitCallbacks(execute=True):
+            session.save()
+        self.assertFalse(DailyTrainingSummary.objects.filter(user=self.user, day=self.day).exists())
+        self.assertEqual(DailyTrainingSummary.objects.get(user=self.user, day=new_day).volume, Decimal("1050"))
+
+    def test_session_delete_clears_its_day(self):
+        session = self.log_session(self.day)
+        with self.captureOnCommitCallbacks(execute=True):
+            session.delete()
+        self.assertFalse(DailyTrainingSummary.objects.filter(user=self.user).exists())
+
+
+class LttbTests(SimpleTestCase):
+    def test_short_series_are_kept_whole(self):
+        self.assertEqual(list(lttb([0, 1, 2], [5, 6, 7], 10)), [0, 1, 2])
+
+    def test_keeps_endpoints_and_spikes(self):
+        x = np.arange(1000)
+        y = np.zeros(1000)
+        y[437], y[812] = 50.0, -30.0
+        keep = lttb(x, y, 50)
+        self.assertEqual(len(keep), 50)
+        self.assertEqual((keep[0], keep[-1]), (0, 999))
+        self.assertIn(437, keep)
+        self.assertIn(812, keep)
+        self.assertTrue(np.all(np.diff(keep) > 0))
+
+
+class BucketLabelTests(SimpleTestCase):
+    def test_month_buckets_cross_the_year(self):
+        labels = bucket_labels(date(2023, 11, 15), date(2024, 2, 3), "month")
+        self.assertEqual(labels, [date(2023, 11, 1), date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 1)])
+
+    def test_year_buckets(self):
+        labels = bucket_labels(date(2022, 12, 31), date(2024, 1, 1), "year")
+        self.assertEqual(labels, [date(2022, 1, 1), date(2023, 1, 1), date(2024, 1, 1)])
+
+    def test_weeks_start_on_monday(self):
+        # 2024-01-01 is a Monday; 2023-12-31 is the Sunday before it
+        labels = bucket_labels(date(2023, 12, 31), date(2024, 1, 8), "week")
+        self.assertEqual(labels, [date(2023, 12, 25), date(2024, 1, 1), date(2024, 1, 8)])
+
+    def test_previous_bucket_crosses_the_year(self):
+        self.assertEqual(previous_bucket(date(2024, 2, 10), "month", 2), date(2023, 12, 1))
+
+    def test_count_matches_labels(self):
+        start, end = date(2023, 12, 30), date(2025, 3, 2)
+        for granularity in ("day", "week", "month", "year"):
+            with self.subTest(granularity=granularity):
+                self.assertEqual(
+                    bucket_count(start, end, granularity), len(bucket_labels(start, end, granularity))
+                )
+
+
+class BodyMeasurementLogTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+        self.client.force_login(self.user)
+
+    def log(self, **values):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/metrics/body/log/", {"date": "2024-03-01", **values})
+
+    def test_partial_logs_keep_each_others_values(self):
+        self.log(weight_kg="80.5")
+        self.log(waist_cm="84")
+        row = BodyMeasurement.objects.get(user=self.user, date=date(2024, 3, 1))
+        self.assertEqual((row.weight_kg, row.waist_cm), (80.5, 84))
+
+    def test_empty_submission_is_rejected(self):
+        self.log()
+        self.assertFalse(BodyMeasurement.objects.filter(user=self.user).exists())
+
+    def test_new_profile_starts_the_weight_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Profile.objects.create(
+                user=self.user, age=30, gender="Male", height_cm=180, weight_kg=82,
+                goal="Maintain Weight", activity_level="Active (3-5 days/week)", timezone="UTC",
+            )
+        self.assertEqual(BodyMeasurement.objects.get(user=self.user).weight_kg, 82)
+
+
+class TrainingLoadTests(TestCase):
+    def test_known_series(self):
+        series = load.compute(np.full((1, 28), 100.0))
+        # day 7: a full acute week against a chronic window that is a quarter full
+        self.assertEqual((series["acute"][0, 6], series["chronic"][0, 6], series["acwr"][0, 6]), (100, 25, 4))
+        self.assertEqual((series["chronic"][0, -1], series["acwr"][0, -1]), (100, 1))
+        self.assertAlmostEqual(series["fatigue"][0, 0], 25)  # alpha = 2 / (7 + 1)
+        self.assertAlmostEqual(series["fatigue"][0, 1], 43.75)
+        self.assertAlmostEqual(series["fitness"][0, 0], 200 / 43)
+        self.assertTrue(np.isnan(load.compute(np.zeros((1, 3)))["acwr"]).all())
+
+    def test_nightly_window_matches_full_rebuild(self):
+        user = User.objects.create_user("lifter", password="pw")
+        start = date(2024, 1, 1)
+        for i in range(0, 150, 2):
+            DailyTrainingSummary.objects.create(user=user, day=start + timedelta(days=i), volume=1000 + 37 * (i % 11))
+        yesterday, today = start + timedelta(days=139), start + timedelta(days=149)
+        load.refresh_batch([user.pk], yesterday, full=True)
+        self.assertEqual(load.refresh_batch([user.pk], today, write_days=30), 30)
+        incremental = list(DailyTrainingLoad.objects.filter(user=user).order_by("day").values_list(
+            "day", "acute", "chronic", "acwr", "fitness", "fatigue"))
+
+        self.assertEqual(load.refresh_batch([user.pk], today, full=True), 150)
+        full = list(DailyTrainingLoad.objects.filter(user=user).order_by("day").values_list(
+            "day", "acute", "chronic", "acwr", "fitness", "fatigue"))
+        self.assertEqual(len(incremental), len(full))
+        for got, want in zip(incremental, full):
+            self.assertEqual(got[0], want[0])
+            np.testing.assert_allclose(got[1:], want[1:], rtol=1e-9)
+
+
+class UserSummaryJobTests(TestCase):
+    def test_single_worker_run_matches_hand_computed_summary(self):
+        user = User.objects.create_user("lifter", password="pw")
+        idle = User.objects.create_user("idle", password="pw")
+        # a 10-day logging run in February, then 3 days, then 6 days up to as_of
+        days = [date(2024, 2, d) for d in range(1, 11)]
+        days += [date(2024, 3, d) for d in (1, 2, 3, 5, 6, 7, 8, 9, 10)]
+        for day in days:
+            DailyNutritionSummary.objects.create(
+                user=user, day=day, calories=2000, protein=day.day, carbs=200, fat=70, meals_count=3,
+            )
+        # trained in the weeks of Jan 29, Feb 19, Feb 26 and Mar 4
+        for day, volume in ((date(2024, 1, 30), 800), (date(2024, 2, 19), 2000), (date(2024, 2, 28), 1000),
+                            (date(2024, 3, 6), 500), (date(2024, 3, 9), 250)):
+            DailyTrainingSummary.objects.create(user=user, day=day, volume=volume, sessions_count=1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            call_command(
+                "refresh_user_summaries", as_of="2024-03-10", workers=1,
+                checkpoint_file=str(Path(tmp) / "run.checkpoint"), stdout=StringIO(),
+            )
+
+        summary = UserSummary.objects.get(user=user)
+        self.assertEqual(summary.as_of, date(2024, 3, 10))
+        self.assertEqual(
+            (summary.nutrition_days_7d, summary.avg_calories_7d, summary.avg_protein_7d),
+            (6, 2000, 7.5),
+        )
+        self.assertEqual(
+            (summary.training_volume_7d, summary.training_volume_28d, summary.sessions_7d),
+            (Decimal("750"), Decimal("3750"), 2),
+        )
+        self.assertEqual(
+            (summary.logging_streak, summary.longest_logging_streak, summary.training_streak_weeks),
+            (6, 10, 3),
+        )
+        empty = UserSummary.objects.get(user=idle)
+        self.assertEqual((empty.nutrition_days_7d, empty.logging_streak, empty.training_volume_28d), (0, 0, 0))
+
+
+class CsvExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get("/metrics/export.csv", params)
+        if response.status_code != 200:
+            return response, None
+        return response, b"".join(response.streaming_content).decode().splitlines()
+
+    def test_daily_rows_fill_every_day(self):
+        DailyNutritionSummary.objects.create(
+            user=self.user, day=date(2024, 3, 1), calories=2000, protein=150, carbs=200, fat=70, meals_count=3,
+        )
+        DailyTrainingSummary.objects.create(user=self.user, day=date(2024, 3, 3), volume=Decimal("1050"), sets_count=2)
+        response, lines = self.export(start="2024-03-01", end="2024-03-03")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("fitlytics_daily_2024-03-01_2024-03-03.csv", response["Content-Disposition"])
+        self.assertEqual(lines, [
+            "date,calories,protein,carbs,fat,training_volume,training_sets",
+            "2024-03-01,2000,150.0,200.0,70.0,0,0",
+            "2024-03-02,0,0,0,0,0,0",
+            "2024-03-03,0,0,0,0,1050.00,2",
+        ])
+
+    def test_raw_meal_and_set_rows(self):
+        Meal.objects.create(
+            user=self.user, meal_type="Lunch", food_name="Rice", calories=500,
+            protein=10, carbs=100, fat=2, local_date=date(2024, 3, 2),
+        )
+        session = TrainingSession.objects.create(user=self.user, name="Push", date=date(2024, 3, 2))
+        exercise = Exercise.objects.create(session=session, name="Bench Press", muscle_group="Chest", order=0)
+        Set.objects.create(exercise=exercise, order=0, reps=5, weight_kg=Decimal("100"))
+        _, meals = self.export(kind="meals", start="2024-03-01", end="2024-03-31")
+        self.assertEqual(len(meals), 2)
+        self.assertTrue(meals[1].startswith("2024-03-02,"))
+        self.assertTrue(meals[1].endswith(",Lunch,Rice,500,10.0,100.0,2.0"))
+        _, sets = self.export(kind="sets", start="2024-03-01", end="2024-03-31")
+        self.assertEqual(sets[1], "2024-03-02,Push,Bench Press,Chest,0,5,100.00,,False")
+
+    def test_range_parsing(self):
+        self.assertEqual(self.export(start="March")[0].status_code, 400)
+        self.assertEqual(self.export(start="2024-03-02", end="2024-03-01")[0].status_code, 400)
+        self.assertEqual(self.export(kind="weekly")[0].status_code, 400)
+        _, lines = self.export()
+        self.assertEqual(len(lines), 31)  # header + the default 30 days
+
+    def test_only_daily_exports_have_a_range_limit(self):
+        start = date(2000, 1, 1)
+        end = (start + timedelta(days=MAX_DAILY_EXPORT_DAYS)).isoformat()
+        response, _ = self.export(start=start.isoformat(), end=end)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b"kind=meals", response.content)
+        response, lines = self.export(kind="meals", start="0001-01-01", end="9999-12-31")
+        self.assertEqual((response.status_code, lines), (200, [",".join(
+            ["date", "logged_at", "meal_type", "food_name", "calories", "protein", "carbs", "fat"]
+        )]))
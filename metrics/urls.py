@@ -6,5 +6,8 @@ app_name = "metrics"
 
 urlpatterns = [
     path("", views.metrics_home, name="home"),
-    path("export.csv", views.metrics_export_csv, name="export_csv")
+    path("export.csv", views.metrics_export_csv, name="export_csv"),
+    path("series/", views.metrics_series, name="series"),
+    path("body/", views.body_measurements, name="body_measurements"),
+    path("body/log/", views.body_measurement_log, name="body_measurement_log"),
 ]
\ No newline at end of file
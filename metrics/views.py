@@ -1,15 +1,25 @@
-from datetime import timedelta, datetime, time
-from decimal import Decimal
+from datetime import timedelta
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, F, Count, Value, DecimalField, DateTimeField, FloatField, IntegerField, ExpressionWrapper
-from django.db.models.functions import Cast
-from django.db.models.functions import TruncDate, Coalesce
-from django.shortcuts import render
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
 from django.utils import timezone
+from django.views.decorators.http import require_POST
 import logging
 
-from nutrition.models import Meal
-from training.models import Set, TrainingSession
+import numpy as np
+
+from accounts.targets import get_targets, remaining
+from core.cache import cached_payload
+from core.etags import conditional_dashboard
+
+from .downsample import DEFAULT_POINTS, clamp_points, lttb
+from .forms import BodyMeasurementForm
+from .series import (
+    DEFAULT_BUCKETS, FIRST_DAY, GRANULARITIES, LAST_DAY, MAX_BUCKETS, bucket_count, bucketed_series,
+    previous_bucket,
+)
+from .models import BodyMeasurement, DailyNutritionSummary, DailyTrainingLoad, DailyTrainingSummary, UserSummary
 
 logger = logging.getLogger(__name__)
 
@@ -21,217 +31,253 @@ def _last_n_days(days=30):
     return start, end, [d.isoformat() for d in labels]
 
 
-def _meal_date_field():
-    """
-    Detect which date-like field the Meal model has.
-    Prefer 'date' if present, else 'created_at', else 'created_on', else 'consumed_at'.
-    Returns (field_name, is_datetime)
-    """
-    candidates = ("date", "created_at", "created_on", "consumed_at")
-    for name in candidates:
-        try:
-            fld = Meal._meta.get_field(name)
-            return name, isinstance(fld, DateTimeField)
-        except Exception:
-            continue
-    # fallback: assume created_at DateTime
-    return "created_at", True
+def _daily_series(user, start, end, labels):
+    """Read the precomputed daily rollups for [start, end] and align them to labels."""
+    nut_map = {
+        row.day.isoformat(): row
+        for row in DailyNutritionSummary.objects.filter(user=user, day__range=(start, end))
+    }
+    train_map = {
+        row.day.isoformat(): row
+        for row in DailyTrainingSummary.objects.filter(user=user, day__range=(start, end))
+    }
+    empty_nut = DailyNutritionSummary()
+    empty_train = DailyTrainingSummary()
+    series = {
+        "calories": [],
+        "protein": [],
+        "carbs": [],
+        "fat": [],
+        "train_volume": [],
+        "train_sets": [],
+    }
+    for d in labels:
+        n = nut_map.get(d, empty_nut)
+        t = train_map.get(d, empty_train)
+        series["calories"].append(int(n.calories or 0))
+        series["protein"].append(float(n.protein or 0))
+        series["carbs"].append(float(n.carbs or 0))
+        series["fat"].append(float(n.fat or 0))
+        series["train_volume"].append(float(t.volume or 0))
+        series["train_sets"].append(int(t.sets_count or 0))
+    return series, nut_map, train_map
+
+
+def _load_series(user, start, end, labels):
+    """Stored training-load series (metrics.load) aligned to labels; None where not computed."""
+    rows = {
+        row["day"].isoformat(): row
+        for row in DailyTrainingLoad.objects.filter(user=user, day__range=(start, end))
+        .values("day", "acwr", "fitness", "fatigue", "form")
+    }
+    series = {"acwr": [], "fitness": [], "fatigue": [], "form": []}
+    for d in labels:
+        row = rows.get(d)
+        for key in series:
+            value = row[key] if row else None
+            series[key].append(None if value is None else round(value, 2))
+    latest = rows[max(rows)] if rows else None
+    return series, latest
 
 
 @login_required
+@conditional_dashboard
 def metrics_home(request):
     start, end, labels = _last_n_days(30)
 
-   
-    meal_date_field, is_dt = _meal_date_field()
-    tz = timezone.get_current_timezone()
-    if is_dt:
-        # Group by local-day using TruncDate; no date-range filter to avoid tz edge-cases
-        filt = {
-            "user": request.user,
-        }
-        day_expr = TruncDate(meal_date_field, tzinfo=tz)
-    else:
-        # DateField: still use TruncDate for consistency
-        filt = {
-            "user": request.user,
-        }
-        day_expr = TruncDate(meal_date_field)
-
-    nut = (
-        Meal.objects.filter(**filt)
-        .annotate(day=day_expr)
-        .values("day")
-        .annotate(
-            calories=Coalesce(Sum("calories"), Value(0), output_field=IntegerField()),
-            protein=Coalesce(Sum("protein"), Value(0.0), output_field=FloatField()),
-            carbs=Coalesce(Sum("carbs"), Value(0.0), output_field=FloatField()),
-            fat=Coalesce(Sum("fat"), Value(0.0), output_field=FloatField()),
-        )
-    )
-    nut_map = {row["day"].isoformat(): row for row in nut}
-    calories = [int(nut_map.get(d, {}).get("calories", 0) or 0) for d in labels]
-    protein = [float(nut_map.get(d, {}).get("protein", 0) or 0) for d in labels]
-    carbs = [float(nut_map.get(d, {}).get("carbs", 0) or 0) for d in labels]
-    fat = [float(nut_map.get(d, {}).get("fat", 0) or 0) for d in labels]
-    try:
-        logger.warning(
-            "Metrics nutrition: rows=%s total_cal=%s", len(nut_map), sum(calories)
-        )
-    except Exception:
-        logger.warning("Metrics nutrition logging failed")
-
-  
-    vol_field = DecimalField(max_digits=14, decimal_places=2)
-    train_qs = (
-        Set.objects.filter(
-            exercise__session__user=request.user,
-        )
-        .annotate(day=F("exercise__session__date"))
-        .annotate(
-            vol_raw=ExpressionWrapper(
-                F("weight_kg") * Cast(F("reps"), output_field=vol_field),
-                output_field=vol_field,
-            )
-        )
-        .annotate(
-            volume=Coalesce(
-                F("vol_raw"),
-                Value(0, output_field=vol_field),
-                output_field=vol_field,
-            )
-        )
-        .values("day")
-        .annotate(
-            total_volume=Coalesce(
-                Sum("volume"), Value(0, output_field=vol_field), output_field=vol_field
-            ),
-            total_sets=Coalesce(Count("id"), 0),
-        )
-    )
-    train_map = {row["day"].isoformat(): row for row in train_qs}
-    train_volume = [float(train_map.get(d, {}).get("total_volume", 0) or 0) for d in labels]
-    train_sets = [int(train_map.get(d, {}).get("total_sets", 0) or 0) for d in labels]
-    try:
-        logger.warning(
-            "Metrics training: rows=%s total_volume=%s total_sets=%s",
-            len(train_map), sum(train_volume), sum(train_sets)
+    def build():
+        series, nut_map, train_map = _daily_series(request.user, start, end, labels)
+        logger.debug(
+            "Metrics: nutrition_rows=%s training_rows=%s", len(nut_map), len(train_map)
         )
-    except Exception:
-        logger.warning("Metrics training logging failed")
-
-   
-    today = timezone.localdate()
-    today_key = today.isoformat()
-    if today_key in labels:
-        idx = labels.index(today_key)
-        # Nutrition fallback
-        if calories[idx] == 0 and protein[idx] == 0 and carbs[idx] == 0 and fat[idx] == 0:
-            agg = (
-                Meal.objects.filter(user=request.user, created_at__date=today)
-                .aggregate(
-                    calories=Coalesce(Sum("calories"), Value(0), output_field=IntegerField()),
-                    protein=Coalesce(Sum("protein"), Value(0.0), output_field=FloatField()),
-                    carbs=Coalesce(Sum("carbs"), Value(0.0), output_field=FloatField()),
-                    fat=Coalesce(Sum("fat"), Value(0.0), output_field=FloatField()),
-                )
-            )
-            calories[idx] = int(agg.get("calories") or 0)
-            protein[idx] = float(agg.get("protein") or 0)
-            carbs[idx] = float(agg.get("carbs") or 0)
-            fat[idx] = float(agg.get("fat") or 0)
-        # Training fallback
-        if train_volume[idx] == 0 and train_sets[idx] == 0:
-            t_agg = (
-                Set.objects.filter(exercise__session__user=request.user, exercise__session__date=today)
-                .annotate(vol=Coalesce(F("weight_kg") * F("reps"), Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)))
-                .aggregate(total_volume=Coalesce(Sum("vol"), Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)), total_sets=Coalesce(Count("id"), 0))
-            )
-            try:
-                train_volume[idx] = float(t_agg.get("total_volume") or 0)
-            except Exception:
-                train_volume[idx] = 0.0
-            train_sets[idx] = int(t_agg.get("total_sets") or 0)
+        load_series, load_latest = _load_series(request.user, start, end, labels)
+        return {
+            **series,
+            "load": load_series,
+            "load_latest": load_latest,
+            "summary": UserSummary.objects.filter(user=request.user).values().first(),
+            "nut_count": len(nut_map),
+            "train_count": len(train_map),
+        }
+
+    payload = cached_payload(request.user.pk, f"metrics_home:{end.isoformat()}", build)
+    calories = payload["calories"]
+    train_volume = payload["train_volume"]
+    train_sets = payload["train_sets"]
+    targets = get_targets(request.user)
+    # the last label is today, so today's intake is the tail of each series
+    today_totals = {key: payload[key][-1] for key in targets}
 
     ctx = {
         "labels": labels,
-        "calories": calories,
-        "protein": protein,
-        "carbs": carbs,
-        "fat": fat,
-        "train_volume": train_volume,
-        "train_sets": train_sets,
+        **payload,
+        "targets": remaining(targets, today_totals),
+        "calorie_target": targets["calories"],
         # debug counts for page 
-        "nut_count": len(nut_map),
-        "train_count": len(train_map),
         "cal_sum": sum(calories) if calories else 0,
         "train_set_sum": sum(train_sets) if train_sets else 0,
         "train_vol_sum": float(sum(train_volume)) if train_volume else 0.0,
+        "body_form": BodyMeasurementForm(initial={"date": end}),
+        "body_series": BodyMeasurement.SERIES,
     }
     return render(request, "metrics.html", ctx)
 
-import csv
-from django.http import HttpResponse
+
+from datetime import date
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+
+from .exports import EXPORTS, MAX_DAILY_EXPORT_DAYS, stream_export
+
+
+def _parse_day(value, default):
+    if not value:
+        return default
+    return date.fromisoformat(value)
+
 
 @login_required
+@conditional_dashboard
 def metrics_export_csv(request):
-    start, end, labels = _last_n_days(30)
+    """
+    Stream a CSV export.
 
-    meal_field, is_dt = _meal_date_field()
-    tz = timezone.get_current_timezone()
-    if is_dt:
-        filt = {"user": request.user}
-        day_expr = TruncDate(meal_field, tzinfo=tz)
-    else:
-        filt = {"user": request.user}
-        day_expr = TruncDate(meal_field)
-
-    nut = (
-        Meal.objects.filter(**filt)
-        .annotate(day=day_expr)
-        .values("day")
-        .annotate(
-            calories=Coalesce(Sum("calories"), Value(0), output_field=IntegerField()),
-            protein=Coalesce(Sum("protein"), Value(0.0), output_field=FloatField()),
-            carbs=Coalesce(Sum("carbs"), Value(0.0), output_field=FloatField()),
-            fat=Coalesce(Sum("fat"), Value(0.0), output_field=FloatField()),
+    Query params: ``kind`` is ``daily`` (default, per-day totals), ``meals`` or
+    ``sets`` (raw rows); ``start``/``end`` are ISO dates, defaulting to the
+    last 30 days. Raw exports take any range; a daily export longer than
+    MAX_DAILY_EXPORT_DAYS is refused, never clipped.
+    """
+    default_start, default_end, _ = _last_n_days(30)
+    kind = request.GET.get("kind", "daily")
+    if kind not in EXPORTS:
+        return HttpResponseBadRequest("kind must be one of: daily, meals, sets.")
+    try:
+        start = _parse_day(request.GET.get("start"), default_start)
+        end = _parse_day(request.GET.get("end"), default_end)
+    except ValueError:
+        return HttpResponseBadRequest("start and end must be YYYY-MM-DD dates.")
+    if start > end:
+        return HttpResponseBadRequest("start must be on or before end.")
+    if kind == "daily" and (end - start).days >= MAX_DAILY_EXPORT_DAYS:
+        return HttpResponseBadRequest(
+            f"A daily export covers at most {MAX_DAILY_EXPORT_DAYS} days; "
+            "split the range, or use kind=meals or kind=sets for all history."
+        )
+
+    response = StreamingHttpResponse(
+        stream_export(kind, request.user, start, end), content_type="text/csv"
+    )
+    filename = f"fitlytics_{kind}_{start.isoformat()}_{end.isoformat()}.csv"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _body_series(user, field, start, end, points):
+    qs = BodyMeasurement.objects.filter(user=user, **{f"{field}__isnull": False})
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    rows = list(qs.order_by("date").values_list("date", field))
+    if not rows:
+        return {"dates": [], "values": [], "raw_points": 0, "latest": None, "change": None}
+    dates, values = zip(*rows)
+    keep = lttb(np.array(dates, dtype="datetime64[D]").astype(np.int64), values, points)
+    return {
+        "dates": [dates[i].isoformat() for i in keep],
+        "values": [round(values[i], 2) for i in keep],
+        "raw_points": len(rows),
+        "latest": round(values[-1], 2),
+        "change": round(values[-1] - values[0], 2),
+    }
+
+
+@login_required
+def body_measurements(request):
+    """
+    One body measurement series as JSON, downsampled with LTTB.
+
+    Query params: ``series`` (default ``weight_kg``), ``start``/``end`` (ISO
+    dates, default all history) and ``points`` (at most this many points,
+    default 300).
+    """
+    field = request.GET.get("series", "weight_kg")
+    if field not in BodyMeasurement.SERIES:
+        return JsonResponse(
+            {"ok": False, "error": f"series must be one of: {', '.join(BodyMeasurement.SERIES)}."}, status=400
         )
+    try:
+        start = _parse_day(request.GET.get("start"), None)
+        end = _parse_day(request.GET.get("end"), None)
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "start and end must be YYYY-MM-DD dates."}, status=400)
+    if start and end and start > end:
+        return JsonResponse({"ok": False, "error": "start must be on or before end."}, status=400)
+    points = clamp_points(request.GET.get("points", DEFAULT_POINTS))
+    data = cached_payload(
+        request.user.pk, f"body_measurements:{field}:{start}:{end}:{points}",
+        lambda: _body_series(request.user, field, start, end, points),
     )
-    nut_map = {r["day"].isoformat(): r for r in nut}
-
-    vol_field = DecimalField(max_digits=14, decimal_places=2)
-    train = (
-        Set.objects.filter(exercise__session__user=request.user)
-        .annotate(day=F("exercise__session__date"))
-        .annotate(
-            vol_raw=ExpressionWrapper(
-                F("weight_kg") * Cast(F("reps"), output_field=vol_field),
-                output_field=vol_field,
-            )
+    return JsonResponse({"ok": True, "series": field, **data})
+
+
+@require_POST
+@login_required
+def body_measurement_log(request):
+    """Record measurements for one day; fields left empty keep their stored value."""
+    form = BodyMeasurementForm(request.POST)
+    if form.is_valid():
+        BodyMeasurement.objects.update_or_create(
+            user=request.user,
+            date=form.cleaned_data["date"],
+            defaults={
+                field: form.cleaned_data[field]
+                for field in BodyMeasurement.SERIES
+                if form.cleaned_data[field] is not None
+            },
+        )
+        messages.success(request, "Measurements saved.")
+    else:
+        messages.error(request, " ".join(e for errors in form.errors.values() for e in errors))
+    return redirect("metrics:home")
+
+
+@login_required
+def metrics_series(request):
+    """
+    Nutrition and training series as JSON columns for any range.
+
+    Query params: ``granularity`` (day, week, month or year; default day) and
+    ``start``/``end`` (ISO dates). ``end`` defaults to today and ``start`` to
+    30 days, 12 weeks, 12 months or 5 years before it.
+    """
+    granularity = request.GET.get("granularity", "day")
+    if granularity not in GRANULARITIES:
+        return JsonResponse(
+            {"ok": False, "error": f"granularity must be one of: {', '.join(GRANULARITIES)}."}, status=400
+        )
+    try:
+        end = _parse_day(request.GET.get("end"), timezone.localdate())
+        if not FIRST_DAY <= end <= LAST_DAY:
+            raise ValueError
+        start = _parse_day(
+            request.GET.get("start"), previous_bucket(end, granularity, DEFAULT_BUCKETS[granularity] - 1)
         )
-        .annotate(
-            volume=Coalesce(F("vol_raw"), Value(0, output_field=vol_field), output_field=vol_field)
+        if not FIRST_DAY <= start <= LAST_DAY:
+            raise ValueError
+    except (ValueError, OverflowError):
+        return JsonResponse(
+            {"ok": False, "error": f"start and end must be YYYY-MM-DD dates from {FIRST_DAY} to {LAST_DAY}."},
+            status=400,
         )
-        .values("day")
-        .annotate(
-            total_volume=Coalesce(Sum("volume"), Value(0, output_field=vol_field), output_field=vol_field),
-            total_sets=Coalesce(Count("id"), 0),
+    if start > end:
+        return JsonResponse({"ok": False, "error": "start must be on or before end."}, status=400)
+    if bucket_count(start, end, granularity) > MAX_BUCKETS:
+        return JsonResponse(
+            {"ok": False, "error": f"At most {MAX_BUCKETS} buckets; use a coarser granularity."}, status=400
         )
+    data = cached_payload(
+        request.user.pk, f"metrics_series:{granularity}:{start}:{end}",
+        lambda: bucketed_series(request.user, granularity, start, end),
     )
-    train_map = {r["day"].isoformat(): r for r in train}
+    return JsonResponse({"ok": True, **data})
 
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="metrics_30_days.csv"'
-    w = csv.writer(response)
-    w.writerow(["date", "calories", "protein", "carbs", "fat", "training_volume", "training_sets"])
-    for d in labels:
-        w.writerow([
-            d,
-            nut_map.get(d, {}).get("calories", 0),
-            nut_map.get(d, {}).get("protein", 0),
-            nut_map.get(d, {}).get("carbs", 0),
-            nut_map.get(d, {}).get("fat", 0),
-            train_map.get(d, {}).get("total_volume", 0),
-            train_map.get(d, {}).get("total_sets", 0),
-        ])
-    return response
\ No newline at end of file
@@ -0,0 +1,241 @@
+"""
+Streaming import of large nutrient reference tables into the Food catalog.
+
+The input is the USDA FoodData Central CSV layout: ``food.csv`` (one row
+per food: fdc_id, data_type, description, ...) and ``food_nutrient.csv``
+(one row per food and nutrient: fdc_id, nutrient_id, amount, ...; amounts
+are per 100 g). Neither file is ever held in memory:
+
+1. food.csv is read once for the ids of the wanted foods, kept as a sorted
+   int64 array;
+2. food_nutrient.csv is streamed, keeping only the handful of nutrients the
+   catalog stores. Buffered rows are joined to foods with ``searchsorted``
+   and written into a float32 foods x nutrients matrix (NaN = missing);
+3. food.csv is streamed again and each food is written with its matrix row.
+
+Only the id array, the matrix and the per-food values derived from it grow
+with the dataset (a few hundred bytes a food, nothing per nutrient row).
+Foods are written in batches, each in its own transaction. Every row
+carries a digest of its imported values, so a re-import creates new foods,
+updates changed ones and leaves the rest untouched.
+"""
+import csv
+import hashlib
+from array import array
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from . import foods
+from .foods import normalize_food_name
+from .models import Food
+
+BATCH_SIZE = 2000
+NUTRIENT_BUFFER_ROWS = 200_000
+DEFAULT_SOURCE = "fdc"
+DEFAULT_SERVING = "100 g"
+
+# Matrix columns and the FDC nutrient ids feeding them. Energy is reported
+# either directly (1008) or via Atwater factors (2047 general, 2048 specific);
+# the first one present wins.
+COLUMNS = ("energy", "energy_atwater_general", "energy_atwater_specific", "protein", "carbs", "fat")
+NUTRIENT_COLUMNS = {"1008": 0, "2047": 1, "2048": 2, "1003": 3, "1005": 4, "1004": 5}
+
+_WRITE_FIELDS = ["name", "key", "serving", "calories", "protein", "carbs", "fat", "source_hash", "updated_at"]
+
+
+class DatasetError(ValueError):
+    """Raised when an input file is missing a required column."""
+
+
+def _open_csv(path):
+    fh = open(path, encoding="utf-8-sig", newline="")
+    reader = csv.reader(fh)
+    try:
+        header = next(reader)
+    except StopIteration:
+        fh.close()
+        raise DatasetError(f"{path} is empty.")
+    return fh, reader, {name.strip(): i for i, name in enumerate(header)}
+
+
+def _columns(path, index, names):
+    missing = [name for name in names if name not in index]
+    if missing:
+        raise DatasetError(f"{path} has no {', '.join(missing)} column.")
+    return [index[name] for name in names]
+
+
+def _iter_foods(path, data_types):
+    """Yield (fdc_id, description) for wanted foods in file order."""
+    fh, reader, index = _open_csv(path)
+    with fh:
+        id_col, name_col = _columns(path, index, ["fdc_id", "description"])
+        type_col = index.get("data_type")
+        for row in reader:
+            if data_types and (type_col is None or row[type_col] not in data_types):
+                continue
+            try:
+                yield int(row[id_col]), row[name_col].strip()
+            except (ValueError, IndexError):
+                continue
+
+
+def read_food_ids(path, data_types=None):
+    ids = array("q", (fdc_id for fdc_id, _ in _iter_foods(path, data_types)))
+    return np.unique(np.frombuffer(ids, dtype=np.int64))
+
+
+def read_nutrients(path, food_ids, buffer_rows=NUTRIENT_BUFFER_ROWS):
+    """Foods x COLUMNS float32 matrix aligned with the sorted ``food_ids``."""
+    matrix = np.full((len(food_ids), len(COLUMNS)), np.nan, dtype=np.float32)
+    if not len(food_ids):
+        return matrix
+
+    def flush(ids, cols, amounts):
+        if not ids:
+            return
+        fdc = np.frombuffer(ids, dtype=np.int64)
+        pos = np.searchsorted(food_ids, fdc)
+        pos[pos == len(food_ids)] = 0
+        hit = food_ids[pos] == fdc
+        matrix[pos[hit], np.frombuffer(cols, dtype=np.int8)[hit]] = np.frombuffer(amounts)[hit]
+
+    fh, reader, index = _open_csv(path)
+    with fh:
+        id_col, nutrient_col, amount_col = _columns(path, index, ["fdc_id", "nutrient_id", "amount"])
+        ids, cols, amounts = array("q"), array("b"), array("d")
+        for row in reader:
+            try:
+                col = NUTRIENT_COLUMNS.get(row[nutrient_col])
+                if col is None:
+                    continue
+                fdc_id, amount = int(row[id_col]), float(row[amount_col])
+            except (ValueError, IndexError):
+                continue
+            ids.append(fdc_id)
+            cols.append(col)
+            amounts.append(amount)
+            if len(ids) >= buffer_rows:
+                flush(ids, cols, amounts)
+                ids, cols, amounts = array("q"), array("b"), array("d")
+        flush(ids, cols, amounts)
+    return matrix
+
+
+def _values(matrix):
+    """Per food (calories, protein, carbs, fat), or None when it has no energy value."""
+    energy = matrix[:, 0]
+    for col in (1, 2):
+        energy = np.where(np.isnan(energy), matrix[:, col], energy)
+    calories = np.maximum(np.rint(np.nan_to_num(energy)), 0).astype(np.int64)
+    macros = np.round(np.nan_to_num(matrix[:, 3:]).astype(np.float64), 2)
+    rows = zip(calories.tolist(), *macros.T.tolist())
+    return [row if has else None for row, has in zip(rows, (~np.isnan(energy)).tolist())]
+
+
+def _digest(name, values):
+    return hashlib.blake2b(repr((name, values)).encode(), digest_size=16).hexdigest()
+
+
+class LoadReport:
+    def __init__(self):
+        self.foods_read = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.deleted = 0
+
+    @property
+    def changed(self):
+        return self.created + self.updated + self.deleted
+
+    def as_dict(self):
+        return {
+            "foods_read": self.foods_read,
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "skipped": self.skipped,
+            "deleted": self.deleted,
+        }
+
+
+def _write_batch(batch, source, report):
+    """Write (source_id, name, values, digest) rows that are new or changed."""
+    existing = {
+        source_id: (pk, digest)
+        for source_id, pk, digest in Food.objects.filter(
+            source=source, source_id__in=[row[0] for row in batch]
+        ).values_list("source_id", "pk", "source_hash")
+    }
+    now = timezone.now()
+    new, changed = [], []
+    for source_id, name, (calories, protein, carbs, fat), digest in batch:
+        current = existing.get(source_id)
+        if current is not None and current[1] == digest:
+            report.unchanged += 1
+            continue
+        food = Food(
+            pk=current[0] if current else None, name=name, key=normalize_food_name(name),
+            serving=DEFAULT_SERVING, calories=calories, protein=protein, carbs=carbs, fat=fat,
+            source=source, source_id=source_id, source_hash=digest, updated_at=now,
+        )
+        (changed if current else new).append(food)
+    with transaction.atomic():
+        Food.objects.bulk_create(new)
+        Food.objects.bulk_update(changed, _WRITE_FIELDS)
+    report.created += len(new)
+    report.updated += len(changed)
+
+
+def _prune(source, loaded_ids, batch_size):
+    """Delete this source's foods that are no longer in the dataset."""
+    stale = [
+        pk for pk, source_id in Food.objects.filter(source=source).values_list("pk", "source_id").iterator()
+        if not source_id.isdigit() or int(source_id) not in loaded_ids
+    ]
+    for i in range(0, len(stale), batch_size):
+        Food.objects.filter(pk__in=stale[i:i + batch_size]).delete()
+    return len(stale)
+
+
+def load_dataset(
+    foods_path, nutrients_path, source=DEFAULT_SOURCE, data_types=None,
+    batch_size=BATCH_SIZE, prune=False, on_batch=None,
+):
+    """Import or refresh ``source`` foods; returns a LoadReport."""
+    report = LoadReport()
+    data_types = set(data_types or ())
+    food_ids = read_food_ids(foods_path, data_types)
+    values = _values(read_nutrients(nutrients_path, food_ids))
+    position = {fdc_id: i for i, fdc_id in enumerate(food_ids.tolist())}
+    loaded = np.zeros(len(food_ids), dtype=bool)
+
+    batch = []
+    for fdc_id, description in _iter_foods(foods_path, data_types):
+        report.foods_read += 1
+        i = position[fdc_id]
+        name = description[:200]
+        if values[i] is None or not name or loaded[i]:
+            report.skipped += 1
+            continue
+        loaded[i] = True
+        batch.append((str(fdc_id), name, values[i], _digest(name, values[i])))
+        if len(batch) >= batch_size:
+            _write_batch(batch, source, report)
+            batch = []
+            if on_batch:
+                on_batch(report)
+    if batch:
+        _write_batch(batch, source, report)
+        if on_batch:
+            on_batch(report)
+
+    if prune:
+        report.deleted = _prune(source, set(food_ids[loaded].tolist()), batch_size)
+    if report.changed:
+        foods.invalidate()
+    return report
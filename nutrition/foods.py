@@ -0,0 +1,142 @@
+"""
+In-process prefix index over the Food catalog for autocomplete.
+
+The index is two sorted arrays searched with bisect: one of whole food
+names and one of every later word of each name ("breast" for "chicken
+breast"), so a lookup is O(log n + limit) with no database query. Matches
+on the start of the name rank ahead of matches on a later word.
+
+Each process builds the index lazily from one ``values_list`` query and
+shares it across threads. Saving or deleting a Food marks the local index
+stale and bumps a shared version in the cache on commit; other processes
+notice the new version within FOOD_INDEX_CHECK_INTERVAL seconds and rebuild.
+Readers keep using the previous index while a rebuild runs.
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import caches
+
+_VERSION_KEY = "foods:index:v"
+_NON_WORD = re.compile(r"[^a-z0-9%]+")
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+
+
+def normalize_food_name(name):
+    """Lower-case, accent-free, single-spaced form used for matching."""
+    text = name or ""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+class FoodIndex:
+    def __init__(self, rows, version=None):
+        """``rows`` are (pk, key, name, serving, calories, protein, carbs, fat)."""
+        self.version = version
+        self.foods = {}
+        names, words = [], []
+        for pk, key, name, serving, calories, protein, carbs, fat in rows:
+            self.foods[pk] = {
+                "id": pk, "name": name, "serving": serving, "calories": calories,
+                "protein": protein, "carbs": carbs, "fat": fat,
+            }
+            names.append((key, pk))
+            start = key.find(" ")
+            while start != -1:
+                words.append((key[start + 1:], pk))
+                start = key.find(" ", start + 1)
+        names.sort()
+        words.sort()
+        self._names = [k for k, _ in names]
+        self._name_ids = [pk for _, pk in names]
+        self._words = [k for k, _ in words]
+        self._word_ids = [pk for _, pk in words]
+
+    def __len__(self):
+        return len(self.foods)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        prefix = normalize_food_name(query)
+        if not prefix:
+            return []
+        found = []
+        seen = set()
+        for keys, ids in ((self._names, self._name_ids), (self._words, self._word_ids)):
+            i = bisect_left(keys, prefix)
+            while i < len(keys) and len(found) < limit and keys[i].startswith(prefix):
+                pk = ids[i]
+                if pk not in seen:
+                    seen.add(pk)
+                    found.append(self.foods[pk])
+                i += 1
+        return found
+
+
+_lock = threading.Lock()
+_index = None
+_stale = True
+_checked_at = 0.0
+
+
+def _cache():
+    return caches[getattr(settings, "DASHBOARD_CACHE_ALIAS", "default")]
+
+
+def _shared_version():
+    cache = _cache()
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        cache.add(_VERSION_KEY, time.time_ns() // 1000, None)
+        version = cache.get(_VERSION_KEY)
+    return version
+
+
+def _build(version):
+    from .models import Food
+
+    rows = Food.objects.order_by().values_list(
+        "pk", "key", "name", "serving", "calories", "protein", "carbs", "fat"
+    )
+    return FoodIndex(rows.iterator(chunk_size=5000), version)
+
+
+def get_index():
+    """This process's index, rebuilt first if a Food changed since it was built."""
+    global _index, _stale, _checked_at
+    index = _index
+    now = time.monotonic()
+    interval = getattr(settings, "FOOD_INDEX_CHECK_INTERVAL", 5)
+    if index is not None and not _stale and now - _checked_at < interval:
+        return index
+    version = _shared_version()
+    _checked_at = now
+    if index is not None and not _stale and index.version == version:
+        return index
+    with _lock:
+        if _index is index or _stale:
+            _stale = False
+            _index = _build(version)
+        return _index
+
+
+def search(query, limit=DEFAULT_LIMIT):
+    return get_index().search(query, limit)
+
+
+def invalidate():
+    """Mark every process's index stale (call after the change is committed)."""
+    global _stale
+    _stale = True
+    cache = _cache()
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, time.time_ns() // 1000, None)
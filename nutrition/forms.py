@@ -1,16 +1,38 @@
 from django import forms
-from .models import Meal
+from .models import Food, Meal
 
 
 class MealForm(forms.ModelForm):
+    # Set by the food autocomplete; any macro left blank is taken from the food
+    food = forms.ModelChoiceField(queryset=Food.objects.all(), required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Meal
-        fields = ["meal_type", "food_name", "calories", "protein", "carbs", "fat"]
+        fields = ["meal_type", "food", "food_name", "calories", "protein", "carbs", "fat"]
         widgets = {
             "meal_type": forms.Select(attrs={"class": "meal-select"}),
-            "food_name": forms.TextInput(attrs={"placeholder": "Grilled Chicken"}),
+            "food_name": forms.TextInput(attrs={"placeholder": "Grilled Chicken", "autocomplete": "off"}),
             "calories": forms.NumberInput(attrs={"placeholder": "300"}),
             "protein": forms.NumberInput(attrs={"placeholder": "30"}),
             "carbs": forms.NumberInput(attrs={"placeholder": "20"}),
             "fat": forms.NumberInput(attrs={"placeholder": "10"}),
         }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["food_name"].required = False
+        self.fields["calories"].required = False
+
+    def clean(self):
+        cleaned = super().clean()
+        food = cleaned.get("food")
+        if food is not None:
+            for field in ("calories", "protein", "carbs", "fat"):
+                if cleaned.get(field) is None and field not in self.errors:
+                    cleaned[field] = getattr(food, field)
+            if not cleaned.get("food_name"):
+                cleaned["food_name"] = food.name
+        for field in ("food_name", "calories"):
+            if cleaned.get(field) in (None, "") and field not in self.errors:
+                self.add_error(field, "This field is required.")
+        return cleaned
@@ -0,0 +1,142 @@
+"""
+Per-user frequent foods for one-click quick-add.
+
+Each FrequentFood row is one food (by normalised name) with the values of
+its latest use and an exponentially decayed use count, so a food eaten
+daily last month ranks below one eaten daily this week. The count uses
+forward decay: a use at time t adds 2 ** ((t - EPOCH) / HALF_LIFE), which
+never has to be re-decayed as time passes, and rows are compared directly.
+It is stored as a base-2 logarithm (``log_score``) so it never overflows.
+
+Logging a meal updates one row; the list is a ``LIMIT`` read of that small
+table, never a GROUP BY over the meal history. Each user keeps at most
+CAPACITY rows, a few more than are shown so new habits can climb. Deleting
+a meal does not lower its food's count.
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+
+from core.cache import bump_data_version
+
+from .foods import normalize_food_name
+from .models import FrequentFood, Meal
+
+HALF_LIFE_DAYS = 14
+CAPACITY = 40
+SHOWN = 12
+
+EPOCH = datetime(2020, 1, 1, tzinfo=dt_timezone.utc)
+_FIELDS = ("food_name", "meal_type", "food_id", "calories", "protein", "carbs", "fat")
+
+
+def _weight(when):
+    """log2 of one use's forward-decayed weight."""
+    return (when - EPOCH).total_seconds() / 86400 / HALF_LIFE_DAYS
+
+
+def _log2_add(a, b):
+    hi, lo = max(a, b), min(a, b)
+    return hi + math.log2(1 + 2 ** (lo - hi))
+
+
+def _apply(row, meal, weight):
+    """Fold one meal into ``row``; the latest use supplies name and values."""
+    row.log_score = _log2_add(row.log_score, weight)
+    row.uses += 1
+    if row.last_used is None or meal.created_at >= row.last_used:
+        row.last_used = meal.created_at
+        for field in _FIELDS:
+            setattr(row, field, getattr(meal, field))
+
+
+def _trim(user_id):
+    overflow = list(
+        FrequentFood.objects.filter(user_id=user_id)
+        .order_by("-log_score", "-last_used")
+        .values_list("pk", flat=True)[CAPACITY:]
+    )
+    if overflow:
+        FrequentFood.objects.filter(pk__in=overflow).delete()
+
+
+def record_meal(meal):
+    """Count one newly logged meal."""
+    key = normalize_food_name(meal.food_name)
+    if not key:
+        return
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                row = FrequentFood.objects.select_for_update().filter(user_id=meal.user_id, key=key).first()
+                created = row is None
+                if created:
+                    row = FrequentFood(user_id=meal.user_id, key=key, log_score=-math.inf, uses=0)
+                _apply(row, meal, _weight(meal.created_at))
+                row.save()
+            break
+        except IntegrityError:
+            # a concurrent request created the row first; update it instead
+            if attempt:
+                raise
+    if created:
+        _trim(meal.user_id)
+    # runs after the meal's own on-commit bump; pages cached in between
+    # would otherwise miss this update
+    bump_data_version(meal.user_id)
+
+
+def record_meals(user_id, meals, trim=True):
+    """Count a batch of meals (bulk imports) with one read and one write per food."""
+    by_key = {}
+    for meal in meals:
+        key = normalize_food_name(meal.food_name)
+        if key:
+            by_key.setdefault(key, []).append(meal)
+    if not by_key:
+        return
+    with transaction.atomic():
+        rows = {
+            row.key: row
+            for row in FrequentFood.objects.select_for_update().filter(user_id=user_id, key__in=by_key)
+        }
+        new = []
+        for key, key_meals in by_key.items():
+            row = rows.get(key)
+            if row is None:
+                row = FrequentFood(user_id=user_id, key=key, log_score=-math.inf, uses=0)
+                new.append(row)
+            for meal in key_meals:
+                _apply(row, meal, _weight(meal.created_at))
+        FrequentFood.objects.bulk_create(new)
+        FrequentFood.objects.bulk_update(
+            [row for row in rows.values()], ["log_score", "uses", "last_used", *_FIELDS],
+        )
+    if new and trim:
+        _trim(user_id)
+
+
+def rebuild_user(user_id, chunk_size=2000):
+    """
+    Recompute a user's rows from their whole meal history, in one
+    transaction so readers never see the list empty mid-rebuild.
+    """
+    with transaction.atomic():
+        FrequentFood.objects.filter(user_id=user_id).delete()
+        batch = []
+        for meal in Meal.objects.filter(user_id=user_id).order_by("created_at").iterator(chunk_size=chunk_size):
+            batch.append(meal)
+            if len(batch) >= chunk_size:
+                record_meals(user_id, batch, trim=False)
+                batch = []
+        record_meals(user_id, batch, trim=False)
+        _trim(user_id)
+
+
+def top_foods(user, limit=SHOWN):
+    return list(
+        FrequentFood.objects.filter(user=user)
+        .order_by("-log_score", "-last_used")
+        .values("id", "food_name", "meal_type", "calories", "protein", "carbs", "fat", "uses")[:limit]
+    )
@@ -0,0 +1,54 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nutrition.datasets import BATCH_SIZE, DEFAULT_SOURCE, DatasetError, load_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a FoodData Central style food.csv / food_nutrient.csv pair into the "
+        "Food catalog. Re-running only writes foods whose name or values changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("foods", help="food.csv (fdc_id, data_type, description, ...).")
+        parser.add_argument("nutrients", help="food_nutrient.csv (fdc_id, nutrient_id, amount, ...).")
+        parser.add_argument("--source", default=DEFAULT_SOURCE, help="Dataset label stored on each food.")
+        parser.add_argument(
+            "--data-type", action="append", dest="data_types",
+            help="Only import foods of this data_type (e.g. foundation_food; may be given multiple times).",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--prune", action="store_true",
+            help="Delete foods from this source that are no longer in the dataset (or filtered out by --data-type).",
+        )
+
+    def handle(self, *args, **options):
+        for key in ("foods", "nutrients"):
+            if not Path(options[key]).exists():
+                raise CommandError(f"No such file: {options[key]}")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+
+        started = time.perf_counter()
+
+        def on_batch(report):
+            self.stdout.write(
+                f"{report.foods_read} foods read: created={report.created} "
+                f"updated={report.updated} unchanged={report.unchanged} skipped={report.skipped} "
+                f"({time.perf_counter() - started:.1f}s)"
+            )
+
+        try:
+            report = load_dataset(
+                options["foods"], options["nutrients"], source=options["source"],
+                data_types=options["data_types"], batch_size=options["batch_size"],
+                prune=options["prune"], on_batch=on_batch,
+            )
+        except DatasetError as exc:
+            raise CommandError(str(exc))
+        summary = ", ".join(f"{k}={v}" for k, v in report.as_dict().items())
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s: {summary}."))
@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from nutrition import frequent
+
+
+class Command(BaseCommand):
+    help = "Recompute each user's frequent foods (quick-add list) from their meal history."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", type=int, action="append", dest="users",
+            help="Only rebuild this user id (may be given multiple times).",
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        user_ids = options["users"]
+        if not user_ids:
+            user_ids = User.objects.order_by("pk").values_list("pk", flat=True).iterator()
+        count = 0
+        for user_id in user_ids:
+            frequent.rebuild_user(user_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt frequent foods for {count} user(s)."))
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:35
+
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_local_date(apps, schema_editor):
+    """Bucket existing meals by each owner's profile time zone, one UPDATE per zone."""
+    Meal = apps.get_model("nutrition", "Meal")
+    Profile = apps.get_model("accounts", "Profile")
+
+    zones = {}
+    for user_id, tz_name in Profile.objects.values_list("user_id", "timezone"):
+        zones.setdefault(tz_name, []).append(user_id)
+
+    for tz_name, user_ids in zones.items():
+        try:
+            tz = ZoneInfo(tz_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            tz = ZoneInfo(settings.TIME_ZONE)
+        for i in range(0, len(user_ids), 500):
+            Meal.objects.filter(user_id__in=user_ids[i:i + 500], local_date__isnull=True).update(
+                local_date=TruncDate("created_at", tzinfo=tz)
+            )
+
+    # Users without a profile fall back to the project time zone
+    Meal.objects.filter(local_date__isnull=True).update(
+        local_date=TruncDate("created_at", tzinfo=ZoneInfo(settings.TIME_ZONE))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_profile_timezone'),
+        ('nutrition', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meal',
+            name='local_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_local_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='meal',
+            name='local_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['user', 'local_date'], name='meal_user_local_date_idx'),
+        ),
+    ]
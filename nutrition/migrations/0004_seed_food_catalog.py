@@ -0,0 +1,68 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+_NON_WORD = re.compile(r"[^a-z0-9%]+")
+
+
+def normalize_food_name(name):
+    # frozen copy of nutrition.foods.normalize_food_name as of this migration
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+# (name, serving, calories, protein, carbs, fat); common staples to start the catalog
+FOODS = [
+    ("Chicken Breast, grilled", "100 g", 165, 31.0, 0.0, 3.6),
+    ("Chicken Thigh, roasted", "100 g", 209, 26.0, 0.0, 10.9),
+    ("Ground Beef, 90% lean", "100 g", 217, 26.1, 0.0, 11.7),
+    ("Salmon, baked", "100 g", 206, 22.1, 0.0, 12.4),
+    ("Tuna, canned in water", "100 g", 116, 25.5, 0.0, 0.8),
+    ("Egg, whole", "1 large (50 g)", 72, 6.3, 0.4, 4.8),
+    ("Egg White", "100 g", 52, 10.9, 0.7, 0.2),
+    ("Greek Yogurt, plain nonfat", "170 g", 100, 17.3, 6.1, 0.7),
+    ("Milk, 2%", "250 ml", 122, 8.1, 11.7, 4.8),
+    ("Cottage Cheese, low fat", "100 g", 81, 10.5, 4.3, 2.3),
+    ("Whey Protein", "1 scoop (30 g)", 120, 24.0, 3.0, 1.5),
+    ("Oats, rolled", "40 g", 152, 5.3, 27.0, 2.6),
+    ("White Rice, cooked", "100 g", 130, 2.7, 28.2, 0.3),
+    ("Brown Rice, cooked", "100 g", 123, 2.7, 25.6, 1.0),
+    ("Pasta, cooked", "100 g", 158, 5.8, 30.9, 0.9),
+    ("Whole Wheat Bread", "1 slice (32 g)", 82, 4.0, 13.8, 1.1),
+    ("Potato, baked", "100 g", 93, 2.5, 21.2, 0.1),
+    ("Sweet Potato, baked", "100 g", 90, 2.0, 20.7, 0.2),
+    ("Banana", "1 medium (118 g)", 105, 1.3, 27.0, 0.4),
+    ("Apple", "1 medium (182 g)", 95, 0.5, 25.1, 0.3),
+    ("Blueberries", "100 g", 57, 0.7, 14.5, 0.3),
+    ("Broccoli, steamed", "100 g", 35, 2.4, 7.2, 0.4),
+    ("Spinach, raw", "100 g", 23, 2.9, 3.6, 0.4),
+    ("Avocado", "100 g", 160, 2.0, 8.5, 14.7),
+    ("Almonds", "28 g", 164, 6.0, 6.1, 14.2),
+    ("Peanut Butter", "2 tbsp (32 g)", 188, 8.0, 6.3, 16.1),
+    ("Olive Oil", "1 tbsp (14 g)", 119, 0.0, 0.0, 13.5),
+    ("Cheddar Cheese", "28 g", 113, 7.0, 0.4, 9.3),
+    ("Black Beans, cooked", "100 g", 132, 8.9, 23.7, 0.5),
+    ("Tofu, firm", "100 g", 144, 17.3, 2.8, 8.7),
+]
+
+
+def seed(apps, schema_editor):
+    Food = apps.get_model("nutrition", "Food")
+    for name, serving, calories, protein, carbs, fat in FOODS:
+        Food.objects.get_or_create(
+            key=normalize_food_name(name), serving=serving,
+            defaults={"name": name, "calories": calories, "protein": protein, "carbs": carbs, "fat": fat},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nutrition", "0003_food_catalog"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
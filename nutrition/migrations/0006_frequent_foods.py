@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0005_food_source'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FrequentFood',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200)),
+                ('food_name', models.CharField(max_length=200)),
+                ('meal_type', models.CharField(choices=[('Breakfast', 'Breakfast'), ('Lunch', 'Lunch'), ('Dinner', 'Dinner'), ('Snack', 'Snack')], max_length=20)),
+                ('calories', models.PositiveIntegerField()),
+                ('protein', models.FloatField(blank=True, null=True)),
+                ('carbs', models.FloatField(blank=True, null=True)),
+                ('fat', models.FloatField(blank=True, null=True)),
+                ('log_score', models.FloatField()),
+                ('uses', models.PositiveIntegerField(default=0)),
+                ('last_used', models.DateTimeField()),
+                ('food', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='nutrition.food')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='frequent_foods', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-log_score'], name='frequent_food_user_score_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='uniq_frequent_food_user_key')],
+            },
+        ),
+    ]
@@ -1,5 +1,45 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+from accounts.timezones import user_localdate
+
+
+class Food(models.Model):
+    """A catalog food with macros per serving; selecting one prefills a Meal."""
+
+    name = models.CharField(max_length=200)
+    # nutrition.foods.normalize_food_name(name); what the autocomplete index matches on
+    key = models.CharField(max_length=200, db_index=True, editable=False)
+    serving = models.CharField(max_length=50, default="100 g")
+    calories = models.PositiveIntegerField()
+    protein = models.FloatField(default=0)
+    carbs = models.FloatField(default=0)
+    fat = models.FloatField(default=0)
+    # Where an imported food came from (see nutrition.datasets); blank for hand-made ones
+    source = models.CharField(max_length=20, blank=True, default="")
+    source_id = models.CharField(max_length=40, blank=True, default="")
+    # Digest of the imported values, so a re-import only writes rows that changed
+    source_hash = models.CharField(max_length=32, blank=True, default="", editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source", "source_id"], condition=~models.Q(source=""), name="uniq_food_source_id",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.serving})"
+
+    def save(self, *args, **kwargs):
+        from .foods import normalize_food_name
+
+        self.key = normalize_food_name(self.name)
+        super().save(*args, **kwargs)
 
 
 class Meal(models.Model):
@@ -17,12 +57,54 @@ class Meal(models.Model):
     protein = models.FloatField(null=True, blank=True)
     carbs = models.FloatField(null=True, blank=True)
     fat = models.FloatField(null=True, blank=True)
+    # Catalog food the macros were copied from; the meal keeps its own copy
+    food = models.ForeignKey(Food, on_delete=models.SET_NULL, null=True, blank=True, related_name="meals")
     created_at = models.DateTimeField(auto_now_add=True)
+    # The user's calendar day at write time; stored so day lookups can use an index
+    local_date = models.DateField(editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "local_date"], name="meal_user_local_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.food_name} ({self.meal_type})"
-from django.db import models
 
+    def save(self, *args, **kwargs):
+        if self.local_date is None:
+            self.local_date = user_localdate(self.user, self.created_at or timezone.now())
+        super().save(*args, **kwargs)
+
+
+
+class FrequentFood(models.Model):
+    """A user's decayed use count for one food; see nutrition.frequent."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="frequent_foods")
+    # nutrition.foods.normalize_food_name(food_name)
+    key = models.CharField(max_length=200)
+    # Values from the latest meal with this food, used by quick-add
+    food_name = models.CharField(max_length=200)
+    meal_type = models.CharField(max_length=20, choices=Meal.MEAL_CHOICES)
+    food = models.ForeignKey(Food, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    calories = models.PositiveIntegerField()
+    protein = models.FloatField(null=True, blank=True)
+    carbs = models.FloatField(null=True, blank=True)
+    fat = models.FloatField(null=True, blank=True)
+    # log2 of the forward-decayed use count
+    log_score = models.FloatField()
+    uses = models.PositiveIntegerField(default=0)
+    last_used = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="uniq_frequent_food_user_key"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-log_score"], name="frequent_food_user_score_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.food_name} ({self.uses})"
@@ -0,0 +1,23 @@
+"""
+Keep derived nutrition data in step: rebuild the food autocomplete index
+(nutrition.foods) when the catalog changes, and count newly logged meals
+towards the user's frequent foods (nutrition.frequent) once they commit.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import foods, frequent
+from .models import Food, Meal
+
+
+@receiver(post_save, sender=Food)
+@receiver(post_delete, sender=Food)
+def food_changed(sender, instance, **kwargs):
+    transaction.on_commit(foods.invalidate)
+
+
+@receiver(post_save, sender=Meal)
+def meal_logged(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: frequent.record_meal(instance))
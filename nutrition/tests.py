@@ -1,3 +1,212 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from accounts.models import Profile, validate_timezone
+
+from . import foods, frequent
+from .datasets import load_dataset
+from .models import Food, FrequentFood, Meal
+
+
+class FrequentFoodTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+        self.now = timezone.now()
+
+    def meal(self, food_name, days_ago=0, **values):
+        return Meal(
+            user=self.user, meal_type="Lunch", food_name=food_name, created_at=self.now - timedelta(days=days_ago),
+            calories=values.get("calories", 500), protein=10, carbs=50, fat=10,
+        )
+
+    def names(self):
+        return [row["food_name"] for row in frequent.top_foods(self.user)]
+
+    def test_recent_use_outranks_old_habit(self):
+        # one use weighs 2 ** (-age / HALF_LIFE_DAYS): three uses 60 days ago
+        # come to about 0.15 of one use today, three uses yesterday to ~2.86
+        frequent.record_meals(self.user.pk, [self.meal("Oats", 60) for _ in range(3)] + [self.meal("Rice")])
+        self.assertEqual(self.names(), ["Rice", "Oats"])
+        frequent.record_meals(self.user.pk, [self.meal("Eggs", 1) for _ in range(3)])
+        self.assertEqual(self.names(), ["Eggs", "Rice", "Oats"])
+        self.assertEqual(FrequentFood.objects.get(user=self.user, key="oats").uses, 3)
+
+    def test_latest_use_supplies_values(self):
+        frequent.record_meals(self.user.pk, [self.meal("rice", 2, calories=300), self.meal("Rice", 0, calories=450)])
+        row = frequent.top_foods(self.user)[0]
+        self.assertEqual((row["food_name"], row["calories"], row["uses"]), ("Rice", 450, 2))
+
+    def test_concurrent_insert_is_retried_as_update(self):
+        frequent.record_meal(self.meal("Rice"))
+        real = FrequentFood.objects.select_for_update
+        calls = []
+
+        def first_misses():
+            calls.append(1)
+            return FrequentFood.objects.none() if len(calls) == 1 else real()
+
+        with mock.patch.object(FrequentFood.objects, "select_for_update", side_effect=first_misses):
+            frequent.record_meal(self.meal("Rice"))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(FrequentFood.objects.get(user=self.user).uses, 2)
+
+    def test_rebuild_matches_incremental(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name in ("Rice", "Oats", "Rice"):
+                Meal.objects.create(
+                    user=self.user, meal_type="Lunch", food_name=name, calories=500, protein=10, carbs=50, fat=10,
+                )
+        before = list(FrequentFood.objects.filter(user=self.user).order_by("key").values_list("key", "uses"))
+        frequent.rebuild_user(self.user.pk)
+        after = list(FrequentFood.objects.filter(user=self.user).order_by("key").values_list("key", "uses"))
+        self.assertEqual(before, after)
+        self.assertEqual(after, [("oats", 1), ("rice", 2)])
+
+
+class QuickAddTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Meal.objects.create(
+                user=self.user, meal_type="Breakfast", food_name="Greek Yogurt",
+                calories=150, protein=15, carbs=8, fat=4,
+            )
+        self.item = FrequentFood.objects.get(user=self.user)
+
+    def test_logs_the_food_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/nutrition/quick-add/{self.item.pk}/", {"meal_type": "Snack"})
+        self.assertRedirects(response, "/nutrition/", fetch_redirect_response=False)
+        meal = Meal.objects.filter(user=self.user).latest("id")
+        self.assertEqual((meal.food_name, meal.meal_type, meal.calories), ("Greek Yogurt", "Snack", 150))
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.uses, 2)
+
+    def test_other_users_items_are_404(self):
+        self.client.force_login(User.objects.create_user("other", password="pw"))
+        self.assertEqual(self.client.post(f"/nutrition/quick-add/{self.item.pk}/").status_code, 404)
+
+
+FOOD_CSV = """fdc_id,data_type,description
+101,foundation_food,"Oats, rolled"
+102,foundation_food,Chicken breast grilled
+103,foundation_food,Mystery powder
+101,foundation_food,"Oats, rolled"
+104,branded_food,Candy bar
+"""
+# 102 reports energy only via Atwater factors and has no carbs or fat rows;
+# 103 has no energy at all; 999 is not in food.csv
+NUTRIENT_CSV = """id,fdc_id,nutrient_id,amount
+1,101,1008,379
+2,101,1003,13.2
+3,101,1005,67.7
+4,101,1004,6.5
+5,102,2047,120
+6,102,1003,22.5
+7,103,1003,50
+8,104,1008,500
+9,999,1008,10
+10,101,1093,5
+"""
+
+
+class FoodDatasetTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.foods_path = Path(tmp.name) / "food.csv"
+        self.nutrients_path = Path(tmp.name) / "food_nutrient.csv"
+        self.foods_path.write_text(FOOD_CSV)
+        self.nutrients_path.write_text(NUTRIENT_CSV)
+
+    def load(self):
+        return load_dataset(self.foods_path, self.nutrients_path, data_types=["foundation_food"])
+
+    def test_load_and_reload(self):
+        foods.get_index()  # build the index before the import
+        version = foods._shared_version()
+        report = self.load()
+        self.assertEqual(
+            report.as_dict(),
+            {"foods_read": 4, "created": 2, "updated": 0, "unchanged": 0, "skipped": 2, "deleted": 0},
+        )
+        rows = Food.objects.filter(source="fdc").order_by("source_id").values_list(
+            "source_id", "name", "key", "calories", "protein", "carbs", "fat",
+        )
+        self.assertEqual(list(rows), [
+            ("101", "Oats, rolled", "oats rolled", 379, 13.2, 67.7, 6.5),
+            ("102", "Chicken breast grilled", "chicken breast grilled", 120, 22.5, 0, 0),
+        ])
+        self.assertNotEqual(foods._shared_version(), version)
+        self.assertIn("Chicken breast grilled", [f["name"] for f in foods.search("grilled")])
+
+        version = foods._shared_version()
+        report = self.load()
+        self.assertEqual((report.created, report.unchanged), (0, 2))
+        self.assertEqual(foods._shared_version(), version)
+
+
+class MealLocalDateTests(TestCase):
+    def meal_for(self, tz, when):
+        user = User.objects.create_user(f"user-{tz}", password="pw")
+        Profile.objects.create(
+            user=user, age=30, gender="Other", height_cm=170, weight_kg=70,
+            goal="Maintain Weight", activity_level="Sedentary (little exercise)", timezone=tz,
+        )
+        return Meal.objects.create(
+            user=user, meal_type="Dinner", food_name="Rice", calories=500, protein=10, carbs=100, fat=2,
+            created_at=when,
+        )
+
+    def test_local_date_follows_the_owners_zone(self):
+        # 23:30 UTC on 1 March is already 2 March in Tokyo and still 1 March in Los Angeles
+        when = datetime(2024, 3, 1, 23, 30, tzinfo=dt_timezone.utc)
+        self.assertEqual(self.meal_for("Asia/Tokyo", when).local_date, date(2024, 3, 2))
+        self.assertEqual(self.meal_for("America/Los_Angeles", when).local_date, date(2024, 3, 1))
+        self.assertEqual(self.meal_for("UTC", when).local_date, date(2024, 3, 1))
+
+    def test_unknown_zone_is_rejected(self):
+        validate_timezone("Europe/Paris")
+        with self.assertRaises(ValidationError):
+            validate_timezone("Mars/Olympus_Mons")
+
+
+class FoodIndexTests(SimpleTestCase):
+    def setUp(self):
+        names = ["Chicken breast", "Chicken thigh", "Grilled chicken wrap", "Crème fraîche", "Chickpeas"]
+        self.index = foods.FoodIndex(
+            (pk, foods.normalize_food_name(name), name, "100 g", 100, 1, 1, 1) for pk, name in enumerate(names, 1)
+        )
+
+    def names(self, query, limit=foods.DEFAULT_LIMIT):
+        return [f["name"] for f in self.index.search(query, limit)]
+
+    def test_name_prefix_ranks_ahead_of_later_words(self):
+        self.assertEqual(
+            self.names("chick"), ["Chicken breast", "Chicken thigh", "Chickpeas", "Grilled chicken wrap"],
+        )
+        self.assertEqual(self.names("CHICKEN  b"), ["Chicken breast"])
+        self.assertEqual(self.names("breast"), ["Chicken breast"])
+
+    def test_accents_limit_and_empty_query(self):
+        self.assertEqual(self.names("creme"), ["Crème fraîche"])
+        self.assertEqual(self.names("chick", limit=2), ["Chicken breast", "Chicken thigh"])
+        self.assertEqual(self.names("  "), [])
+
+
+class FoodSearchTests(TestCase):
+    def test_saved_food_is_searchable_after_commit(self):
+        foods.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            Food.objects.create(name="Zucchini fritters", calories=180)
+        self.client.force_login(User.objects.create_user("lifter", password="pw"))
+        results = self.client.get("/nutrition/foods/search/", {"q": "zucc"}).json()["results"]
+        self.assertEqual([r["name"] for r in results], ["Zucchini fritters"])
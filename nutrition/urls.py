@@ -5,4 +5,6 @@ app_name = "nutrition"
 
 urlpatterns = [
     path("", views.nutrition_home, name="home"),
+    path("foods/search/", views.food_search, name="food_search"),
+    path("quick-add/<int:pk>/", views.quick_add, name="quick_add"),
 ]
\ No newline at end of file
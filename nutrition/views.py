@@ -1,23 +1,32 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.urls import reverse
-from django.utils import timezone
 from django.db.models import Sum
 from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 import logging
 
-from .models import Meal
+from accounts.targets import get_targets, remaining
+from accounts.timezones import user_localdate
+from core.cache import cached_payload
+from core.etags import conditional_dashboard
+
+from . import foods, frequent
+from .models import FrequentFood, Meal
 from .forms import MealForm
 
 logger = logging.getLogger(__name__)
 
 
+@conditional_dashboard
 def nutrition_home(request):
     """Show nutrition dashboard. Anonymous users can view summaries but must log in to add meals.
 
     POST: only allowed for authenticated users; anonymous POSTs are redirected to login with next.
     GET: if authenticated, include a MealForm in context; otherwise show a login prompt.
     """
-    today = timezone.localdate()
+    today = user_localdate(request.user)
 
     form = None
     if request.method == "POST":
@@ -47,19 +56,62 @@ def nutrition_home(request):
 
     # meals for today (only query for authenticated users)
     if request.user.is_authenticated:
-        meals = Meal.objects.filter(user=request.user, created_at__date=today).order_by("-created_at")
+        day = cached_payload(
+            request.user.pk, f"nutrition_home:{today.isoformat()}",
+            lambda: _day_payload(request.user, today),
+        )
     else:
-        meals = Meal.objects.none()
+        day = {"meals": [], "totals": {"calories": 0, "protein": 0, "carbs": 0, "fat": 0}, "frequent": []}
+    meals, totals = day["meals"], day["totals"]
+
+    ctx = {
+        "today": today, "form": form, "meals": meals, "totals": totals, "frequent_foods": day["frequent"],
+        "targets": remaining(get_targets(request.user), totals),
+    }
+    return render(request, "nutrition.html", ctx)
+
 
+def _day_payload(user, day):
+    meals = Meal.objects.filter(user=user, local_date=day).order_by("-created_at")
     totals = meals.aggregate(
         calories=Sum("calories"),
         protein=Sum("protein"),
         carbs=Sum("carbs"),
         fat=Sum("fat"),
     )
+    return {
+        "meals": list(meals.values("id", "meal_type", "food_name", "calories", "protein", "carbs", "fat")),
+        # ensure numeric zeros instead of None
+        "totals": {k: (v or 0) for k, v in totals.items()},
+        "frequent": frequent.top_foods(user),
+    }
+
+
+@require_POST
+@login_required
+def quick_add(request, pk):
+    """Log one of the user's frequent foods again with its latest values."""
+    item = get_object_or_404(FrequentFood, pk=pk, user=request.user)
+    meal_type = request.POST.get("meal_type")
+    Meal.objects.create(
+        user=request.user,
+        meal_type=meal_type if meal_type in dict(Meal.MEAL_CHOICES) else item.meal_type,
+        food_name=item.food_name,
+        food_id=item.food_id,
+        calories=item.calories,
+        protein=item.protein,
+        carbs=item.carbs,
+        fat=item.fat,
+    )
+    messages.success(request, f"Added {item.food_name}.")
+    return redirect("nutrition:home")
 
-    # ensure numeric zeros instead of None
-    totals = {k: (v or 0) for k, v in totals.items()}
 
-    ctx = {"today": today, "form": form, "meals": meals, "totals": totals}
-    return render(request, "nutrition.html", ctx)
\ No newline at end of file
+@login_required
+def food_search(request):
+    """Autocomplete over the Food catalog: ``?q=<prefix>&limit=<n>``."""
+    try:
+        limit = min(max(int(request.GET.get("limit", foods.DEFAULT_LIMIT)), 1), foods.MAX_LIMIT)
+    except ValueError:
+        limit = foods.DEFAULT_LIMIT
+    return JsonResponse({"ok": True, "results": foods.search(request.GET.get("q", ""), limit)})
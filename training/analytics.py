@@ -0,0 +1,147 @@
+"""
+Per-exercise progression analytics computed on column arrays.
+
+A user's sets for one catalog exercise are read once as flat numeric
+columns (``values_list``) through the (definition, session) index, and
+everything else is vectorised NumPy: no model instances and no per-set
+Python loops. Sets carry their session id rather than a date (per-row date
+parsing and an SQL sort dominated the query), and dates are mapped back from
+a small sessions query.
+"""
+import numpy as np
+from django.db import connections
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from .models import TrainingSession
+from .records import BRZYCKI_MAX_REPS, exercise_sets
+
+DEFAULT_WINDOW_DAYS = 28
+MAX_WINDOW_DAYS = 365
+
+
+def load_columns(user, definition, start=None, end=None):
+    """Dates (datetime64[D]), weights, reps and warm-up flags, ordered by date."""
+    sessions = TrainingSession.objects.filter(user=user, exercises__definition=definition)
+    if start:
+        sessions = sessions.filter(date__gte=start)
+    if end:
+        sessions = sessions.filter(date__lte=end)
+    session_rows = list(sessions.order_by("pk").values_list("pk", "date").distinct())
+    if not session_rows:
+        empty = np.array([], dtype="datetime64[D]")
+        return empty, np.array([]), np.array([]), np.array([], dtype=bool)
+    session_ids = np.array([pk for pk, _ in session_rows])
+    session_dates = np.array([d for _, d in session_rows], dtype="datetime64[D]")
+
+    qs = exercise_sets(user, definition).order_by()
+    if start:
+        qs = qs.filter(exercise__session__date__gte=start)
+    if end:
+        qs = qs.filter(exercise__session__date__lte=end)
+    rows = qs.values_list("exercise__session_id", Cast("weight_kg", FloatField()), "reps", "is_warmup")
+    # Every column is numeric already, so run the compiled SQL directly and skip
+    # Django's per-row converters (they were most of the cost at 50k rows).
+    sql, params = rows.query.sql_with_params()
+    with connections[rows.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = np.array(cursor.fetchall(), dtype=float).reshape(-1, 4)  # NULL weights become nan
+
+    dates = session_dates[np.searchsorted(session_ids, columns[:, 0].astype(np.int64))]
+    order = np.argsort(dates, kind="stable")
+    return dates[order], columns[order, 1], columns[order, 2], columns[order, 3].astype(bool)
+
+
+def estimate_1rm(weights, reps):
+    """Vectorised training.records.estimate_1rm (Brzycki <= 10 reps, Epley above)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        brzycki = weights * 36 / (37 - reps)
+        epley = weights * (1 + reps / 30)
+    return np.where(reps == 1, weights, np.where(reps <= BRZYCKI_MAX_REPS, brzycki, epley))
+
+
+def _iso_week_start(days):
+    # 1970-01-01 was a Thursday, so (n + 3) % 7 is the ISO weekday with Monday=0
+    n = days.astype(np.int64)
+    return (n - (n + 3) % 7).astype("datetime64[D]")
+
+
+def _trend(x, y):
+    """Least-squares line through (x, y); slope is per day."""
+    if len(x) < 2 or np.all(x == x[0]):
+        return None
+    slope, intercept = np.polyfit(x, y, 1)
+    fitted = slope * x + intercept
+    ss_tot = np.sum((y - y.mean()) ** 2)
+    r2 = 1 - np.sum((y - fitted) ** 2) / ss_tot if ss_tot else 1.0
+    return {
+        "slope_per_day": round(float(slope), 4),
+        "slope_per_week": round(float(slope * 7), 3),
+        "intercept": round(float(intercept), 2),
+        "r2": round(float(r2), 4),
+    }
+
+
+def _round(values, digits=1):
+    return [None if np.isnan(v) else v for v in np.round(values, digits).tolist()]
+
+
+def progression(user, definition, start=None, end=None, window=DEFAULT_WINDOW_DAYS):
+    """
+    Columnar progression series for one exercise.
+
+    * ``days``/``volume``: training days and kg·reps logged on each;
+    * ``rolling_volume``: volume over the ``window`` calendar days ending on each day;
+    * ``best_e1rm``: best estimated 1RM per day (working sets only) and its
+      least-squares ``trend`` (slope in kg per day and per week);
+    * ``weeks``/``weekly_tonnage``: kg·reps per ISO week (Monday start).
+    """
+    dates, weights, reps, warmup = load_columns(user, definition, start, end)
+    result = {
+        "days": [], "volume": [], "rolling_volume": [], "best_e1rm": [],
+        "weeks": [], "weekly_tonnage": [], "trend": None,
+        "sets": int(len(dates)), "window": window,
+    }
+    if not len(dates):
+        return result
+
+    volume = np.nan_to_num(weights * reps)
+    days, first_index, day_of_set = np.unique(dates, return_index=True, return_inverse=True)
+    day_volume = np.bincount(day_of_set, weights=volume)
+
+    # rolling window over the calendar (not over training days): spread day
+    # volumes onto a dense day axis and difference the cumulative sum
+    offsets = (days - days[0]).astype(np.int64)
+    dense = np.zeros(offsets[-1] + 1)
+    dense[offsets] = day_volume
+    cumulative = np.concatenate(([0.0], np.cumsum(dense)))
+    rolling = cumulative[offsets + 1] - cumulative[np.maximum(offsets + 1 - window, 0)]
+
+    # rows are sorted by date, so each day is a contiguous run starting at first_index
+    e1rm = np.where(warmup | np.isnan(weights), np.nan, estimate_1rm(weights, reps))
+    with np.errstate(invalid="ignore"):
+        best = np.fmax.reduceat(e1rm, first_index)
+
+    weeks, week_of_day = np.unique(_iso_week_start(days), return_inverse=True)
+    tonnage = np.bincount(week_of_day, weights=day_volume)
+
+    has_e1rm = ~np.isnan(best)
+    result.update({
+        "days": [str(d) for d in days],
+        "volume": _round(day_volume),
+        "rolling_volume": _round(rolling),
+        "best_e1rm": _round(best, 2),
+        "weeks": [str(w) for w in weeks],
+        "weekly_tonnage": _round(tonnage),
+        "trend": _trend(offsets[has_e1rm].astype(float), best[has_e1rm]),
+    })
+    if result["trend"]:
+        result["trend"]["origin"] = str(days[0])
+    return result
+
+
+def clamp_window(value):
+    try:
+        return min(max(int(value), 1), MAX_WINDOW_DAYS)
+    except (TypeError, ValueError):
+        return DEFAULT_WINDOW_DAYS
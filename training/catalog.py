@@ -0,0 +1,53 @@
+"""
+Name normalisation for the ExerciseDefinition catalog.
+
+Free-text exercise names are reduced to a key so that "Bench press",
+"bench  Press" and "BENCH-PRESS" land on one definition. The rules:
+
+* Unicode NFKC + casefold, punctuation and underscores become spaces;
+* common gym abbreviations are expanded (``db`` -> ``dumbbell``, ...);
+* trailing plurals are dropped word by word (``squats`` -> ``squat``).
+
+Names that still differ after that (``flat bench`` vs ``bench press``) are
+tied together with ExerciseAlias rows.
+"""
+import re
+import unicodedata
+
+ABBREVIATIONS = {
+    "bb": "barbell",
+    "db": "dumbbell",
+    "kb": "kettlebell",
+    "bw": "bodyweight",
+    "ohp": "overhead press",
+    "rdl": "romanian deadlift",
+    "sldl": "stiff leg deadlift",
+}
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def _singular(word):
+    if len(word) <= 2:
+        return word
+    if word.endswith(("sses", "ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_exercise_name(name):
+    """Catalog key for a free-text exercise name."""
+    text = unicodedata.normalize("NFKC", name or "").casefold()
+    words = []
+    for word in _SEPARATORS.split(text):
+        if word:
+            words.extend(_singular(w) for w in ABBREVIATIONS.get(word, word).split())
+    # names made only of punctuation still need a stable, non-empty key
+    return " ".join(words) or text.strip()
+
+
+def display_name(name):
+    """Tidy a user-entered name for use as a new definition's label."""
+    return " ".join((name or "").split())
@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from training import records
+from training.catalog import normalize_exercise_name
+from training.models import Exercise, ExerciseAlias, ExerciseDefinition, TrainingSession
+
+NAME_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Link exercises to the ExerciseDefinition catalog and merge duplicate "
+        "definitions, then rebuild personal records for affected users."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Report what would change without writing anything.",
+        )
+        parser.add_argument(
+            "--skip-records", action="store_true",
+            help="Do not rebuild personal records afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        with transaction.atomic():
+            merged, merge_users = self._merge_duplicates()
+            linked, link_users = self._link_exercises()
+            if dry_run:
+                transaction.set_rollback(True)
+        self.stdout.write(f"Merged {merged} duplicate definition(s); linked {linked} exercise(s).")
+        users = merge_users | link_users
+        if dry_run:
+            self.stdout.write(f"Dry run: nothing written ({len(users)} user(s) would be rebuilt).")
+            return
+        if not options["skip_records"]:
+            for user_id in sorted(users):
+                records.rebuild_user(user_id)
+        self.stdout.write(self.style.SUCCESS(f"Done; {len(users)} user(s) affected."))
+
+    def _merge_duplicates(self):
+        """
+        Fold definitions into the one their key now resolves to: either an
+        alias added since they were created, or a changed normalisation rule.
+        """
+        aliases = dict(ExerciseAlias.objects.values_list("key", "definition_id"))
+        by_key = dict(ExerciseDefinition.objects.values_list("key", "pk"))
+        merged, users = 0, set()
+        for definition in ExerciseDefinition.objects.order_by("pk"):
+            key = normalize_exercise_name(definition.key)
+            target = aliases.get(key) or by_key.get(key)
+            if target is None or target == definition.pk:
+                continue
+            users.update(self._users_of(definition.pk))
+            Exercise.objects.filter(definition_id=definition.pk).update(definition_id=target)
+            ExerciseAlias.objects.filter(definition_id=definition.pk).update(definition_id=target)
+            ExerciseAlias.objects.get_or_create(key=definition.key, defaults={"definition_id": target})
+            aliases = {k: target if v == definition.pk else v for k, v in aliases.items()}
+            aliases[definition.key] = target
+            del by_key[definition.key]
+            definition.delete()
+            merged += 1
+        return merged, users
+
+    def _link_exercises(self):
+        # distinct names are few compared to rows, and the rows are updated as
+        # we go, so materialise the list rather than holding a cursor open
+        names = list(
+            Exercise.objects.filter(definition__isnull=True)
+            .order_by().values_list("name", flat=True).distinct()
+        )
+        linked, users = 0, set()
+        for i in range(0, len(names), NAME_BATCH_SIZE):
+            linked += self._link_batch(names[i:i + NAME_BATCH_SIZE], users)
+        return linked, users
+
+    def _link_batch(self, names, users):
+        by_definition = {}
+        for name, definition in ExerciseDefinition.objects.resolve_many(names).items():
+            by_definition.setdefault(definition.pk, []).append(name)
+        linked = 0
+        for definition_id, def_names in by_definition.items():
+            rows = Exercise.objects.filter(definition__isnull=True, name__in=def_names)
+            users.update(
+                TrainingSession.objects.filter(exercises__in=rows).values_list("user_id", flat=True).distinct()
+            )
+            linked += rows.update(definition_id=definition_id)
+        return linked
+
+    def _users_of(self, definition_id):
+        return set(
+            TrainingSession.objects.filter(exercises__definition_id=definition_id)
+            .values_list("user_id", flat=True).distinct()
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('training', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='trainingsession',
+            options={'ordering': ['-date', '-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='trainingsession',
+            index=models.Index(fields=['user', '-date', '-created_at', '-id'], name='session_user_history_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('training', '0002_session_history_ordering'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseDailyVolume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exercise_key', models.CharField(max_length=255)),
+                ('exercise_name', models.CharField(max_length=255)),
+                ('day', models.DateField()),
+                ('volume', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sets_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercise_daily_volume', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'exercise_key'), name='uniq_exercise_volume_user_day_exercise')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PersonalRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('exercise_key', models.CharField(max_length=255)),
+                ('exercise_name', models.CharField(max_length=255)),
+                ('e1rm', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('e1rm_weight_kg', models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True)),
+                ('e1rm_reps', models.PositiveIntegerField(blank=True, null=True)),
+                ('e1rm_date', models.DateField(blank=True, null=True)),
+                ('pr_weight_kg', models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True)),
+                ('pr_reps', models.PositiveIntegerField(blank=True, null=True)),
+                ('pr_date', models.DateField(blank=True, null=True)),
+                ('best_session_volume', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('best_session_volume_date', models.DateField(blank=True, null=True)),
+                ('achieved_at', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='personal_records', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-achieved_at', 'exercise_name'],
+                'indexes': [models.Index(fields=['user', '-achieved_at'], name='pr_user_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'exercise_key'), name='uniq_personal_record_user_exercise')],
+            },
+        ),
+    ]
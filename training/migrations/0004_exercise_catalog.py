@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('training', '0003_personal_records'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'exercise aliases',
+                'ordering': ['key'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExerciseDefinition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('muscle_group', models.CharField(blank=True, max_length=50)),
+                ('is_compound', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='exercisedailyvolume',
+            index=models.Index(fields=['user', 'exercise_key', 'day'], name='exvol_user_exercise_day_idx'),
+        ),
+        migrations.AddField(
+            model_name='exercisealias',
+            name='definition',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='training.exercisedefinition'),
+        ),
+        migrations.AddField(
+            model_name='exercise',
+            name='definition',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='exercises', to='training.exercisedefinition'),
+        ),
+        migrations.AddIndex(
+            model_name='exercise',
+            index=models.Index(fields=['definition', 'session'], name='exercise_definition_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+# (key, name, muscle_group, is_compound, alias keys). Keys are already in
+# training.catalog.normalize_exercise_name form.
+CATALOG = [
+    ("bench press", "Bench Press", "Chest", True, ["barbell bench press", "flat bench", "flat bench press", "bench"]),
+    ("incline bench press", "Incline Bench Press", "Chest", True, ["incline bench", "incline barbell bench press"]),
+    ("dumbbell bench press", "Dumbbell Bench Press", "Chest", True, ["dumbbell press", "flat dumbbell press"]),
+    ("dip", "Dip", "Chest", True, ["parallel bar dip", "chest dip"]),
+    ("push up", "Push-Up", "Chest", True, ["pushup", "press up"]),
+    ("squat", "Squat", "Legs", True, ["back squat", "barbell squat", "barbell back squat"]),
+    ("front squat", "Front Squat", "Legs", True, []),
+    ("leg press", "Leg Press", "Legs", True, []),
+    ("romanian deadlift", "Romanian Deadlift", "Legs", True, ["stiff leg deadlift"]),
+    ("hip thrust", "Hip Thrust", "Legs", True, ["barbell hip thrust"]),
+    ("lunge", "Lunge", "Legs", True, ["walking lunge"]),
+    ("deadlift", "Deadlift", "Back", True, ["conventional deadlift", "barbell deadlift"]),
+    ("barbell row", "Barbell Row", "Back", True, ["bent over row", "bent over barbell row"]),
+    ("pull up", "Pull-Up", "Back", True, ["pullup"]),
+    ("chin up", "Chin-Up", "Back", True, ["chinup"]),
+    ("lat pulldown", "Lat Pulldown", "Back", False, ["pulldown", "lat pull down"]),
+    ("overhead press", "Overhead Press", "Shoulders", True, ["military press", "barbell overhead press", "standing press"]),
+    ("lateral raise", "Lateral Raise", "Shoulders", False, ["side raise", "dumbbell lateral raise"]),
+    ("bicep curl", "Biceps Curl", "Arms", False, ["curl", "dumbbell curl"]),
+    ("tricep pushdown", "Triceps Pushdown", "Arms", False, ["tricep pressdown", "cable pushdown"]),
+    ("plank", "Plank", "Core", False, []),
+]
+
+
+def seed(apps, schema_editor):
+    ExerciseDefinition = apps.get_model("training", "ExerciseDefinition")
+    ExerciseAlias = apps.get_model("training", "ExerciseAlias")
+    for key, name, muscle_group, is_compound, aliases in CATALOG:
+        definition, _ = ExerciseDefinition.objects.get_or_create(
+            key=key, defaults={"name": name, "muscle_group": muscle_group, "is_compound": is_compound},
+        )
+        for alias in aliases:
+            ExerciseAlias.objects.get_or_create(key=alias, defaults={"definition": definition})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("training", "0004_exercise_catalog"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed, migrations.RunPython.noop),
+    ]
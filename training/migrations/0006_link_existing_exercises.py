@@ -0,0 +1,187 @@
+"""
+Link exercises logged before the catalog existed to their ExerciseDefinition
+and re-key the personal records that depended on the old names.
+
+Records are keyed by the definition key once an exercise is linked, and by
+the normalised name before that. The two agree except where an alias maps a
+name onto a different key ("flat bench" -> "bench press"), so only users with
+records under an alias key are rebuilt. The normaliser and the record tally
+are frozen copies of training.catalog and training.records as of this
+migration, so later changes there cannot alter what it does.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+
+ABBREVIATIONS = {
+    "bb": "barbell",
+    "db": "dumbbell",
+    "kb": "kettlebell",
+    "bw": "bodyweight",
+    "ohp": "overhead press",
+    "rdl": "romanian deadlift",
+    "sldl": "stiff leg deadlift",
+}
+_SEPARATORS = re.compile(r"[\W_]+")
+E1RM_PRECISION = Decimal("0.01")
+BRZYCKI_MAX_REPS = 10
+NAME_BATCH_SIZE = 500
+
+
+def _singular(word):
+    if len(word) <= 2:
+        return word
+    if word.endswith(("sses", "ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def normalize_exercise_name(name):
+    text = unicodedata.normalize("NFKC", name or "").casefold()
+    words = []
+    for word in _SEPARATORS.split(text):
+        if word:
+            words.extend(_singular(w) for w in ABBREVIATIONS.get(word, word).split())
+    return " ".join(words) or text.strip()
+
+
+def display_name(name):
+    return " ".join((name or "").split())
+
+
+def estimate_1rm(weight, reps):
+    if not weight or not reps:
+        return Decimal("0")
+    if reps == 1:
+        value = Decimal(weight)
+    elif reps <= BRZYCKI_MAX_REPS:
+        value = Decimal(weight) * 36 / (37 - reps)
+    else:
+        value = Decimal(weight) * (30 + reps) / 30
+    return value.quantize(E1RM_PRECISION)
+
+
+def _better(value, day, best_value, best_day):
+    if best_day is None:
+        return True
+    return value > best_value or (value == best_value and day < best_day)
+
+
+def link_exercises(Exercise, ExerciseDefinition, ExerciseAlias):
+    aliases = dict(ExerciseAlias.objects.values_list("key", "definition_id"))
+    names = list(
+        Exercise.objects.filter(definition__isnull=True).order_by().values_list("name", flat=True).distinct()
+    )
+    for i in range(0, len(names), NAME_BATCH_SIZE):
+        batch = {name: normalize_exercise_name(name) for name in names[i:i + NAME_BATCH_SIZE]}
+        by_key = dict(ExerciseDefinition.objects.filter(key__in=set(batch.values())).values_list("key", "pk"))
+        new = {}
+        for name, key in batch.items():
+            if key not in aliases and key not in by_key:
+                new.setdefault(key, display_name(name))
+        ExerciseDefinition.objects.bulk_create(
+            [ExerciseDefinition(key=key, name=label) for key, label in new.items()], ignore_conflicts=True,
+        )
+        by_key.update(ExerciseDefinition.objects.filter(key__in=new.keys()).values_list("key", "pk"))
+        by_definition = defaultdict(list)
+        for name, key in batch.items():
+            by_definition[aliases.get(key) or by_key[key]].append(name)
+        for definition_id, def_names in by_definition.items():
+            Exercise.objects.filter(definition__isnull=True, name__in=def_names).update(definition_id=definition_id)
+
+
+def rebuild_records(user_id, Set, PersonalRecord, ExerciseDailyVolume):
+    PersonalRecord.objects.filter(user_id=user_id).delete()
+    ExerciseDailyVolume.objects.filter(user_id=user_id).delete()
+    rows = (
+        Set.objects.filter(exercise__session__user_id=user_id)
+        .order_by()
+        .values_list(
+            "exercise__session_id", "exercise__session__date", "exercise__definition__key",
+            "exercise__definition__name", "exercise__name", "weight_kg", "reps", "is_warmup",
+        )
+    )
+    names, e1rm, heaviest, session_day = {}, {}, {}, {}
+    session_volume = defaultdict(lambda: defaultdict(Decimal))
+    day_volume = defaultdict(lambda: [Decimal("0"), 0])
+    for session_id, day, def_key, def_name, name, weight, reps, is_warmup in rows.iterator(chunk_size=2000):
+        key = def_key or normalize_exercise_name(name)
+        names.setdefault(key, def_name or display_name(name))
+        bucket = day_volume[(day, key)]
+        bucket[1] += 1
+        if not weight:
+            continue
+        bucket[0] += weight * reps
+        session_volume[key][session_id] += weight * reps
+        session_day[session_id] = day
+        if is_warmup:
+            continue
+        value = estimate_1rm(weight, reps)
+        best = e1rm.get(key)
+        if best is None or _better(value, day, best[0], best[3]):
+            e1rm[key] = (value, weight, reps, day)
+        best = heaviest.get(key)
+        if best is None or _better((weight, reps), day, best[:2], best[2]):
+            heaviest[key] = (weight, reps, day)
+
+    records = []
+    for key in e1rm.keys() | heaviest.keys() | session_volume.keys():
+        record = PersonalRecord(user_id=user_id, exercise_key=key, exercise_name=names[key])
+        if key in e1rm:
+            record.e1rm, record.e1rm_weight_kg, record.e1rm_reps, record.e1rm_date = e1rm[key]
+        if key in heaviest:
+            record.pr_weight_kg, record.pr_reps, record.pr_date = heaviest[key]
+        for session_id, volume in session_volume.get(key, {}).items():
+            day = session_day[session_id]
+            if _better(volume, day, record.best_session_volume, record.best_session_volume_date):
+                record.best_session_volume, record.best_session_volume_date = volume, day
+        record.achieved_at = max(
+            d for d in (record.e1rm_date, record.pr_date, record.best_session_volume_date) if d
+        )
+        records.append(record)
+    PersonalRecord.objects.bulk_create(records)
+    ExerciseDailyVolume.objects.bulk_create(
+        [
+            ExerciseDailyVolume(
+                user_id=user_id, exercise_key=key, exercise_name=names[key],
+                day=day, volume=volume, sets_count=count,
+            )
+            for (day, key), (volume, count) in day_volume.items()
+        ],
+        batch_size=500,
+    )
+
+
+def forwards(apps, schema_editor):
+    Exercise = apps.get_model("training", "Exercise")
+    ExerciseDefinition = apps.get_model("training", "ExerciseDefinition")
+    ExerciseAlias = apps.get_model("training", "ExerciseAlias")
+    Set = apps.get_model("training", "Set")
+    PersonalRecord = apps.get_model("training", "PersonalRecord")
+    ExerciseDailyVolume = apps.get_model("training", "ExerciseDailyVolume")
+
+    link_exercises(Exercise, ExerciseDefinition, ExerciseAlias)
+    alias_keys = set(ExerciseAlias.objects.values_list("key", flat=True))
+    users = set(
+        PersonalRecord.objects.filter(exercise_key__in=alias_keys).values_list("user_id", flat=True)
+    ) | set(
+        ExerciseDailyVolume.objects.filter(exercise_key__in=alias_keys).values_list("user_id", flat=True)
+    )
+    for user_id in sorted(users):
+        rebuild_records(user_id, Set, PersonalRecord, ExerciseDailyVolume)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("training", "0005_seed_exercise_catalog"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -3,8 +3,59 @@ from django.db import models
 
 from django.conf import settings
 from django.db import models
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
 from django.utils import timezone
 
+from .catalog import display_name, normalize_exercise_name
+
+VOLUME_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+
+class TrainingSessionQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate each session with its volume, set count and exercise count in SQL.
+
+        Correlated subqueries keep the three counts independent, so joining sets
+        does not multiply the exercise count (and vice versa).
+        """
+        sets = Set.objects.filter(exercise__session=OuterRef("pk")).order_by().values("exercise__session")
+        volume = sets.annotate(
+            v=Sum(
+                F("weight_kg") * Cast("reps", output_field=VOLUME_FIELD),
+                filter=Q(weight_kg__isnull=False),
+                output_field=VOLUME_FIELD,
+            )
+        ).values("v")
+        set_count = sets.annotate(n=Count("pk")).values("n")
+        exercise_count = (
+            Exercise.objects.filter(session=OuterRef("pk")).order_by()
+            .values("session").annotate(n=Count("pk")).values("n")
+        )
+        return self.annotate(
+            annotated_volume=Coalesce(
+                Subquery(volume, output_field=VOLUME_FIELD), Value(0, output_field=VOLUME_FIELD)
+            ),
+            annotated_sets=Coalesce(Subquery(set_count, output_field=IntegerField()), Value(0)),
+            annotated_exercises=Coalesce(Subquery(exercise_count, output_field=IntegerField()), Value(0)),
+        )
+
+    def totals(self):
+        """Volume, sets, exercises and duration summed over the queryset in one query."""
+        agg = self.with_totals().aggregate(
+            volume=Sum("annotated_volume"),
+            sets=Sum("annotated_sets"),
+            exercises=Sum("annotated_exercises"),
+            duration_min=Sum("duration_min"),
+        )
+        return {
+            "volume": float(agg["volume"] or 0),
+            "sets": agg["sets"] or 0,
+            "exercises": agg["exercises"] or 0,
+            "duration_min": agg["duration_min"] or 0,
+        }
+
 
 class TrainingSession(models.Model):
     user = models.ForeignKey(
@@ -17,20 +68,35 @@ class TrainingSession(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TrainingSessionQuerySet.as_manager()
+
     class Meta:
-        ordering = ["-date", "-created_at"]
+        ordering = ["-date", "-created_at", "-id"]
+        indexes = [
+            models.Index(fields=["user", "-date", "-created_at", "-id"], name="session_user_history_idx"),
+        ]
 
     def __str__(self):
         label = self.name or "Workout"
         return f"{label} — {self.date}"
 
+    # The three helpers below read the SQL annotations from
+    # TrainingSessionQuerySet.with_totals() when present and only fall back to
+    # walking the related objects for un-annotated instances.
+
     def exercises_count(self):
+        if hasattr(self, "annotated_exercises"):
+            return self.annotated_exercises
         return self.exercises.count()
 
     def sets_count(self):
+        if hasattr(self, "annotated_sets"):
+            return self.annotated_sets
         return sum(ex.sets.count() for ex in self.exercises.all())
 
     def total_volume(self):
+        if hasattr(self, "annotated_volume"):
+            return float(self.annotated_volume or 0)
         # kg·reps: sum(reps * weight_kg) across all sets (skip sets without weight)
         total = 0
         for ex in self.exercises.all():
@@ -43,6 +109,83 @@ class TrainingSession(models.Model):
         return self.duration_min or 0
 
 
+class ExerciseDefinitionManager(models.Manager):
+    def lookup_many(self, names):
+        """Map each name to its existing definition (or None) with two queries."""
+        keys = {name: normalize_exercise_name(name) for name in names}
+        found = {
+            alias.key: alias.definition
+            for alias in ExerciseAlias.objects.filter(key__in=set(keys.values())).select_related("definition")
+        }
+        missing = set(keys.values()) - found.keys()
+        if missing:
+            found.update((d.key, d) for d in self.filter(key__in=missing))
+        return {name: found.get(key) for name, key in keys.items()}
+
+    def resolve_many(self, names):
+        """Like lookup_many(), creating definitions for names not in the catalog yet."""
+        resolved = self.lookup_many(names)
+        new = {}
+        for name, definition in resolved.items():
+            if definition is None:
+                new.setdefault(normalize_exercise_name(name), display_name(name))
+        if new:
+            # ignore_conflicts: a concurrent request may have added the same key
+            self.bulk_create(
+                [ExerciseDefinition(key=key, name=label) for key, label in new.items()],
+                ignore_conflicts=True,
+            )
+            created = {d.key: d for d in self.filter(key__in=new.keys())}
+            for name, definition in resolved.items():
+                if definition is None:
+                    resolved[name] = created[normalize_exercise_name(name)]
+        return resolved
+
+    def resolve(self, name):
+        return self.resolve_many([name])[name]
+
+    def attach(self, exercises):
+        """Set ``definition`` on unsaved Exercise instances ahead of a bulk_create."""
+        resolved = self.resolve_many({ex.name for ex in exercises})
+        for ex in exercises:
+            ex.definition = resolved[ex.name]
+
+
+class ExerciseDefinition(models.Model):
+    """
+    Catalog entry shared by every Exercise row that names the same movement.
+
+    ``key`` is the normalised name (training.catalog); other spellings that
+    should map here are ExerciseAlias rows.
+    """
+
+    key = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255)
+    muscle_group = models.CharField(max_length=50, blank=True)
+    is_compound = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ExerciseDefinitionManager()
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class ExerciseAlias(models.Model):
+    key = models.CharField(max_length=255, unique=True)
+    definition = models.ForeignKey(ExerciseDefinition, on_delete=models.CASCADE, related_name="aliases")
+
+    class Meta:
+        ordering = ["key"]
+        verbose_name_plural = "exercise aliases"
+
+    def __str__(self):
+        return f"{self.key} -> {self.definition}"
+
+
 class Exercise(models.Model):
     MUSCLE_CHOICES = (
         ("", "Unspecified"),
@@ -59,6 +202,11 @@ class Exercise(models.Model):
         TrainingSession, on_delete=models.CASCADE, related_name="exercises"
     )
     name = models.CharField(max_length=255)
+    # Derived from ``name`` on save (bulk writers use ExerciseDefinition.objects.attach)
+    definition = models.ForeignKey(
+        ExerciseDefinition, on_delete=models.PROTECT, related_name="exercises",
+        null=True, blank=True, editable=False,
+    )
     muscle_group = models.CharField(max_length=50, choices=MUSCLE_CHOICES, blank=True)
     is_compound = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
@@ -66,10 +214,21 @@ class Exercise(models.Model):
 
     class Meta:
         ordering = ["order"]
+        indexes = [
+            models.Index(fields=["definition", "session"], name="exercise_definition_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "name" in update_fields:
+            self.definition = ExerciseDefinition.objects.resolve(self.name)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "definition"}
+        super().save(*args, **kwargs)
+
     def volume(self):
         total = 0
         for s in self.sets.all():
@@ -95,4 +254,74 @@ class Set(models.Model):
         return f"{self.reps} x {w}"
 
     def volume(self):
-        return (float(self.weight_kg) * self.reps) if self.weight_kg else 0
\ No newline at end of file
+        return (float(self.weight_kg) * self.reps) if self.weight_kg else 0
+
+
+class PersonalRecord(models.Model):
+    """
+    Best lifts per user and exercise, maintained incrementally by training.records.
+
+    One row per (user, exercise_key), so looking up an exercise's PRs is a
+    single unique-index hit however many sets have been logged. The key is the
+    exercise's ExerciseDefinition.key.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="personal_records"
+    )
+    exercise_key = models.CharField(max_length=255)
+    exercise_name = models.CharField(max_length=255)
+    # best estimated one-rep max and the set it came from
+    e1rm = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    e1rm_weight_kg = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)
+    e1rm_reps = models.PositiveIntegerField(null=True, blank=True)
+    e1rm_date = models.DateField(null=True, blank=True)
+    # heaviest working set (ties broken by reps)
+    pr_weight_kg = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)
+    pr_reps = models.PositiveIntegerField(null=True, blank=True)
+    pr_date = models.DateField(null=True, blank=True)
+    # most kg·reps for this exercise within one session
+    best_session_volume = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    best_session_volume_date = models.DateField(null=True, blank=True)
+    achieved_at = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-achieved_at", "exercise_name"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "exercise_key"], name="uniq_personal_record_user_exercise"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-achieved_at"], name="pr_user_recent_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.exercise_name}: {self.pr_weight_kg} kg x {self.pr_reps}"
+
+
+class ExerciseDailyVolume(models.Model):
+    """Per-user, per-exercise, per-day volume backing the "top volume" list."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="exercise_daily_volume"
+    )
+    exercise_key = models.CharField(max_length=255)
+    exercise_name = models.CharField(max_length=255)
+    day = models.DateField()
+    volume = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sets_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "day", "exercise_key"], name="uniq_exercise_volume_user_day_exercise"
+            ),
+        ]
+        indexes = [
+            # per-exercise history: which days was this lift trained on
+            models.Index(fields=["user", "exercise_key", "day"], name="exvol_user_exercise_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.exercise_name} {self.day}: {self.volume}"
@@ -0,0 +1,48 @@
+"""
+Keyset (cursor) pagination for a user's workout history.
+
+Pages are cut on the (date, created_at, id) tuple that matches
+TrainingSession.Meta.ordering, so fetching page N costs the same as page 1
+and rows inserted while a user scrolls never shift what they see.
+"""
+import base64
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(session):
+    raw = json.dumps([session.date.isoformat(), session.created_at.isoformat(), session.pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        d, created, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return date.fromisoformat(d), datetime.fromisoformat(created), int(pk)
+    except (ValueError, TypeError, json.JSONDecodeError) as exc:
+        raise InvalidCursor("Malformed history cursor.") from exc
+
+
+def keyset_page(queryset, cursor=None, size=PAGE_SIZE):
+    """Return (sessions, next_cursor) for the page that starts after ``cursor``."""
+    qs = queryset.order_by("-date", "-created_at", "-id")
+    if cursor:
+        d, created, pk = decode_cursor(cursor)
+        qs = qs.filter(
+            Q(date__lt=d)
+            | Q(date=d, created_at__lt=created)
+            | Q(date=d, created_at=created, id__lt=pk)
+        )
+    rows = list(qs[: size + 1])
+    next_cursor = encode_cursor(rows[size - 1]) if len(rows) > size else None
+    return rows[:size], next_cursor
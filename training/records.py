@@ -0,0 +1,250 @@
+"""
+Personal records (PRs) and per-exercise daily volume.
+
+Records only ever improve when sets are added, so new sets are folded into
+the stored PersonalRecord rows by re-reading just the days they were logged
+on (see refresh_days) rather than the user's whole history. Deleting or
+editing a set can lower a record, so those paths rebuild the affected
+exercises from scratch (rebuild_exercises).
+
+Estimated 1RM uses Brzycki up to 10 reps and Epley above that, where
+Brzycki's denominator makes it overshoot.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.dispatch import Signal
+
+from .catalog import display_name, normalize_exercise_name
+from .models import ExerciseDailyVolume, ExerciseDefinition, PersonalRecord, Set
+
+E1RM_PRECISION = Decimal("0.01")
+BRZYCKI_MAX_REPS = 10
+RECENT_LIMIT = 5
+TOP_VOLUME_DAYS = 7
+
+# Sent with ``user_ids`` after records/volumes have been rewritten on commit.
+records_refreshed = Signal()
+
+_SET_COLUMNS = (
+    "exercise__session_id", "exercise__session__date",
+    "exercise__definition__key", "exercise__definition__name", "exercise__name",
+    "weight_kg", "reps", "is_warmup",
+)
+_RECORD_FIELDS = [
+    "exercise_name", "e1rm", "e1rm_weight_kg", "e1rm_reps", "e1rm_date",
+    "pr_weight_kg", "pr_reps", "pr_date", "best_session_volume", "best_session_volume_date",
+    "achieved_at",
+]
+
+
+def exercise_key(definition_key, name):
+    """Record key for an exercise: its catalog key, or the normalised name if not linked yet."""
+    return definition_key or normalize_exercise_name(name)
+
+
+def epley(weight, reps):
+    return Decimal(weight) * (30 + reps) / 30
+
+
+def brzycki(weight, reps):
+    return Decimal(weight) * 36 / (37 - reps)
+
+
+def estimate_1rm(weight, reps):
+    if not weight or not reps:
+        return Decimal("0")
+    if reps == 1:
+        value = Decimal(weight)
+    elif reps <= BRZYCKI_MAX_REPS:
+        value = brzycki(weight, reps)
+    else:
+        value = epley(weight, reps)
+    return value.quantize(E1RM_PRECISION)
+
+
+def _better(value, day, best_value, best_day):
+    """True if (value, day) beats the current best; ties go to the earlier day."""
+    if best_day is None:
+        return True
+    return value > best_value or (value == best_value and day < best_day)
+
+
+class _Tally:
+    """Bests, session volumes and day volumes per exercise key for a batch of set rows."""
+
+    def __init__(self, rows):
+        self.names = {}
+        self.e1rm = {}
+        self.heaviest = {}
+        self.session_volume = defaultdict(lambda: defaultdict(Decimal))
+        self.session_day = {}
+        self.day_volume = defaultdict(lambda: [Decimal("0"), 0])
+        for session_id, day, def_key, def_name, name, weight, reps, is_warmup in rows:
+            key = exercise_key(def_key, name)
+            self.names.setdefault(key, def_name or display_name(name))
+            bucket = self.day_volume[(day, key)]
+            bucket[1] += 1
+            if not weight:
+                continue
+            volume = weight * reps
+            bucket[0] += volume
+            self.session_volume[key][session_id] += volume
+            self.session_day[session_id] = day
+            if is_warmup:
+                continue
+            e1rm = estimate_1rm(weight, reps)
+            best = self.e1rm.get(key)
+            if best is None or _better(e1rm, day, best[0], best[3]):
+                self.e1rm[key] = (e1rm, weight, reps, day)
+            best = self.heaviest.get(key)
+            if best is None or _better((weight, reps), day, best[:2], best[2]):
+                self.heaviest[key] = (weight, reps, day)
+
+    def merge_into(self, record):
+        """Raise ``record``'s bests to this tally's; returns True if anything changed."""
+        key = record.exercise_key
+        changed = False
+        if key in self.e1rm:
+            e1rm, weight, reps, day = self.e1rm[key]
+            if _better(e1rm, day, record.e1rm, record.e1rm_date):
+                record.e1rm, record.e1rm_weight_kg, record.e1rm_reps, record.e1rm_date = e1rm, weight, reps, day
+                changed = True
+        if key in self.heaviest:
+            weight, reps, day = self.heaviest[key]
+            if _better((weight, reps), day, (record.pr_weight_kg, record.pr_reps), record.pr_date):
+                record.pr_weight_kg, record.pr_reps, record.pr_date = weight, reps, day
+                changed = True
+        for session_id, volume in self.session_volume.get(key, {}).items():
+            day = self.session_day[session_id]
+            if _better(volume, day, record.best_session_volume, record.best_session_volume_date):
+                record.best_session_volume, record.best_session_volume_date = volume, day
+                changed = True
+        if changed:
+            record.exercise_name = self.names[key]
+            record.achieved_at = max(
+                d for d in (record.e1rm_date, record.pr_date, record.best_session_volume_date) if d
+            )
+        return changed
+
+
+def _set_rows(user_id, **filters):
+    return (
+        Set.objects.filter(exercise__session__user_id=user_id, **filters)
+        .order_by()
+        .values_list(*_SET_COLUMNS)
+    )
+
+
+def _save_records(user_id, tally, existing, only=None):
+    new, changed = [], []
+    keys = tally.e1rm.keys() | tally.heaviest.keys() | tally.session_volume.keys()
+    for key in keys if only is None else keys & only:
+        record = existing.get(key)
+        if record is None:
+            record = PersonalRecord(user_id=user_id, exercise_key=key)
+            if tally.merge_into(record):
+                new.append(record)
+        elif tally.merge_into(record):
+            changed.append(record)
+    PersonalRecord.objects.bulk_create(new)
+    PersonalRecord.objects.bulk_update(changed, _RECORD_FIELDS)
+
+
+def _write_day_volumes(user_id, tally):
+    ExerciseDailyVolume.objects.bulk_create(
+        [
+            ExerciseDailyVolume(
+                user_id=user_id, exercise_key=key, exercise_name=tally.names[key],
+                day=day, volume=volume, sets_count=count,
+            )
+            for (day, key), (volume, count) in tally.day_volume.items()
+        ],
+        batch_size=500,
+    )
+
+
+def refresh_days(user_id, days):
+    """
+    Fold every set logged on ``days`` into the user's records and rewrite
+    those days' per-exercise volumes. Cost scales with the sets on those days.
+    """
+    days = set(days)
+    if not days:
+        return
+    with transaction.atomic():
+        tally = _Tally(_set_rows(user_id, exercise__session__date__in=days))
+        keys = set(tally.names)
+        existing = {
+            r.exercise_key: r
+            for r in PersonalRecord.objects.filter(user_id=user_id, exercise_key__in=keys)
+        }
+        _save_records(user_id, tally, existing)
+        ExerciseDailyVolume.objects.filter(user_id=user_id, day__in=days).delete()
+        _write_day_volumes(user_id, tally)
+
+
+def rebuild_exercises(user_id, keys):
+    """Recompute the records for ``keys`` from scratch (after sets were deleted or edited)."""
+    keys = set(keys)
+    if not keys:
+        return
+    with transaction.atomic():
+        # The daily volume rows say which days each exercise was trained on
+        # (exvol_user_exercise_day_idx), so only the sets on those days are read.
+        days = set(
+            ExerciseDailyVolume.objects.filter(user_id=user_id, exercise_key__in=keys)
+            .values_list("day", flat=True)
+        )
+        PersonalRecord.objects.filter(user_id=user_id, exercise_key__in=keys).delete()
+        rows = _set_rows(user_id, exercise__session__date__in=days).iterator(chunk_size=2000)
+        _save_records(user_id, _Tally(rows), {}, only=keys)
+
+
+def rebuild_user(user_id):
+    """Drop and recompute every record and daily volume row for one user."""
+    with transaction.atomic():
+        PersonalRecord.objects.filter(user_id=user_id).delete()
+        ExerciseDailyVolume.objects.filter(user_id=user_id).delete()
+        tally = _Tally(_set_rows(user_id).iterator(chunk_size=2000))
+        _save_records(user_id, tally, {})
+        _write_day_volumes(user_id, tally)
+    transaction.on_commit(lambda: records_refreshed.send(sender=None, user_ids={user_id}))
+
+
+def get_record(user, exercise_name):
+    """The user's PersonalRecord for an exercise name or alias, or None."""
+    definition = ExerciseDefinition.objects.lookup_many([exercise_name])[exercise_name]
+    key = definition.key if definition else normalize_exercise_name(exercise_name)
+    return PersonalRecord.objects.filter(user=user, exercise_key=key).first()
+
+
+def exercise_sets(user, definition):
+    """All of a user's sets for one catalog exercise, oldest first."""
+    return (
+        Set.objects.filter(exercise__definition=definition, exercise__session__user=user)
+        .order_by("exercise__session__date", "exercise__session_id", "exercise__order", "order")
+    )
+
+
+def recent_records(user, limit=RECENT_LIMIT):
+    return list(
+        PersonalRecord.objects.filter(user=user)
+        .order_by("-achieved_at", "-updated_at")
+        .values("exercise_name", "pr_weight_kg", "pr_reps", "e1rm", "achieved_at")[:limit]
+    )
+
+
+def top_volume(user, end, days=TOP_VOLUME_DAYS, limit=RECENT_LIMIT):
+    """Exercises with the most volume over the ``days`` days ending on ``end``."""
+    return list(
+        ExerciseDailyVolume.objects.filter(
+            user=user, day__range=(end - timedelta(days=days - 1), end), volume__gt=0
+        )
+        .values("exercise_key")
+        .annotate(exercise_name=Max("exercise_name"), volume=Sum("volume"))
+        .order_by("-volume")[:limit]
+    )
@@ -0,0 +1,142 @@
+"""
+Keep PersonalRecord / ExerciseDailyVolume in step with training writes.
+
+New sets only mark their (user, day) for refresh_days; edits and deletes also
+mark the exercise for a rebuild, since they can lower a record. Everything is
+applied once per transaction on commit. Sessions saved ahead of a bulk insert
+of their sets (training.workouts.save_workout) are covered by the session's
+own post_save, which marks its day.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import records
+from .models import Exercise, Set, TrainingSession
+
+_local = threading.local()
+
+
+def _state():
+    if not hasattr(_local, "days"):
+        _local.days = set()
+        _local.exercises = set()
+        _local.exercise_keys = {}
+    return _local
+
+
+def _flush():
+    state = _state()
+    days, state.days = state.days, set()
+    exercises, state.exercises = state.exercises, set()
+    state.exercise_keys = {}
+    if not days and not exercises:
+        return
+    by_user = {}
+    for user_id, key in exercises:
+        by_user.setdefault(user_id, (set(), set()))[0].add(key)
+    for user_id, day in days:
+        by_user.setdefault(user_id, (set(), set()))[1].add(day)
+    for user_id, (keys, user_days) in by_user.items():
+        records.rebuild_exercises(user_id, keys)
+        records.refresh_days(user_id, user_days)
+    records.records_refreshed.send(sender=None, user_ids=set(by_user))
+
+
+def mark_dirty(user_id, day, key=None):
+    if user_id is None or day is None:
+        return
+    state = _state()
+    state.days.add((user_id, day))
+    if key is not None:
+        state.exercises.add((user_id, key))
+    transaction.on_commit(_flush)
+
+
+_EXERCISE_COLUMNS = ("session__user_id", "session__date", "definition__key", "name")
+
+
+def _exercise_row(exercise_id):
+    """(user_id, day, record key) for an exercise id, cached for the transaction."""
+    keys = _state().exercise_keys
+    if exercise_id not in keys:
+        row = Exercise.objects.filter(pk=exercise_id).values_list(*_EXERCISE_COLUMNS).first()
+        keys[exercise_id] = (row[0], row[1], records.exercise_key(row[2], row[3])) if row else None
+    return keys[exercise_id]
+
+
+def _set_key(instance):
+    exercise = _cached_related(instance, "exercise")
+    session = _cached_related(exercise, "session") if exercise else None
+    definition = _cached_related(exercise, "definition") if exercise else None
+    if session and (definition or exercise.definition_id is None):
+        key = records.exercise_key(definition.key if definition else None, exercise.name)
+        return session.user_id, session.date, key
+    return _exercise_row(instance.exercise_id)
+
+
+def _cached_related(instance, field_name):
+    """Return a related object only if it is already loaded, without a query."""
+    field = instance._meta.get_field(field_name)
+    return field.get_cached_value(instance) if field.is_cached(instance) else None
+
+
+@receiver(post_save, sender=Set)
+def set_saved(sender, instance, created, **kwargs):
+    key = _set_key(instance)
+    if key:
+        user_id, day, exercise = key
+        mark_dirty(user_id, day, None if created else exercise)
+
+
+@receiver(pre_delete, sender=Set)
+def set_deleting(sender, instance, **kwargs):
+    key = _set_key(instance)
+    if key:
+        mark_dirty(*key)
+
+
+# The pre_save handlers only collect what to mark: outside a transaction
+# on_commit runs immediately, and the rows must be refreshed after the UPDATE.
+
+@receiver(pre_save, sender=Exercise)
+def exercise_renaming(sender, instance, **kwargs):
+    instance._records_dirty = []
+    if instance.pk is None:
+        return
+    row = Exercise.objects.filter(pk=instance.pk).values_list(*_EXERCISE_COLUMNS).first()
+    if not row:
+        return
+    old_key = records.exercise_key(row[2], row[3])
+    new_key = records.exercise_key(instance.definition.key if instance.definition_id else None, instance.name)
+    if old_key != new_key:
+        instance._records_dirty = [(row[0], row[1], old_key), (row[0], row[1], new_key)]
+
+
+@receiver(post_save, sender=Exercise)
+def exercise_saved(sender, instance, **kwargs):
+    for key in getattr(instance, "_records_dirty", ()):
+        mark_dirty(*key)
+
+
+@receiver(pre_save, sender=TrainingSession)
+def session_date_changing(sender, instance, **kwargs):
+    instance._records_dirty = []
+    if instance.pk is None:
+        return
+    previous = (
+        TrainingSession.objects.filter(pk=instance.pk).values_list("user_id", "date").first()
+    )
+    if previous and previous[1] != instance.date:
+        rows = Exercise.objects.filter(session_id=instance.pk).values_list("definition__key", "name")
+        instance._records_dirty = [(*previous, key) for key in {records.exercise_key(*r) for r in rows}]
+
+
+@receiver(post_save, sender=TrainingSession)
+def session_saved(sender, instance, created, **kwargs):
+    for key in getattr(instance, "_records_dirty", ()):
+        mark_dirty(*key)
+    if created or instance._records_dirty:
+        mark_dirty(instance.user_id, instance.date)
@@ -1,3 +1,251 @@
+import json
+from datetime import date
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-# Create your tests here.
+from . import catalog, records
+from .models import Exercise, ExerciseDailyVolume, ExerciseDefinition, PersonalRecord, Set, TrainingSession
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .workouts import save_workout
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+        # several sessions share a date so the created_at/id tie-breaks matter
+        for i in range(7):
+            TrainingSession.objects.create(user=self.user, name=f"S{i}", date=date(2024, 1, 1 + i // 3))
+
+    def test_cursor_round_trip(self):
+        session = TrainingSession.objects.first()
+        self.assertEqual(
+            decode_cursor(encode_cursor(session)), (session.date, session.created_at, session.pk)
+        )
+
+    def test_pages_cover_history_once_in_order(self):
+        qs = TrainingSession.objects.filter(user=self.user)
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(qs, cursor, size=3)
+            seen.extend(s.pk for s in page)
+            if cursor is None:
+                break
+        expected = list(qs.order_by("-date", "-created_at", "-id").values_list("pk", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_malformed_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor("not-a-cursor")
+
+    def test_history_endpoint_rejects_bad_cursor(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/training/history/", {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 400)
+
+
+class PersonalRecordTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+
+    def log(self, day, name, sets):
+        with self.captureOnCommitCallbacks(execute=True):
+            session = TrainingSession.objects.create(user=self.user, name="Push", date=day)
+            exercise = Exercise.objects.create(session=session, name=name, order=0)
+            return [
+                Set.objects.create(exercise=exercise, order=i, reps=reps, weight_kg=Decimal(weight))
+                for i, (reps, weight) in enumerate(sets)
+            ]
+
+    def record(self, name="Bench Press"):
+        return records.get_record(self.user, name)
+
+    def test_new_sets_raise_the_record(self):
+        self.log(date(2024, 1, 1), "Bench Press", [(5, "100")])
+        self.log(date(2024, 1, 8), "bench press", [(5, "105"), (3, "110")])
+        record = self.record()
+        self.assertEqual((record.pr_weight_kg, record.pr_reps, record.pr_date), (Decimal("110"), 3, date(2024, 1, 8)))
+        self.assertEqual(record.e1rm, records.estimate_1rm(Decimal("105"), 5))
+        self.assertEqual(PersonalRecord.objects.filter(user=self.user).count(), 1)
+
+    def test_editing_a_set_can_lower_the_record(self):
+        self.log(date(2024, 1, 1), "Bench Press", [(5, "100")])
+        best, = self.log(date(2024, 1, 8), "Bench Press", [(5, "120")])
+        best.weight_kg = Decimal("90")
+        with self.captureOnCommitCallbacks(execute=True):
+            best.save()
+        record = self.record()
+        self.assertEqual((record.pr_weight_kg, record.pr_date), (Decimal("100"), date(2024, 1, 1)))
+
+    def test_deleting_sets_rebuilds_or_drops_the_record(self):
+        first, = self.log(date(2024, 1, 1), "Bench Press", [(5, "100")])
+        best, = self.log(date(2024, 1, 8), "Bench Press", [(5, "120")])
+        with self.captureOnCommitCallbacks(execute=True):
+            best.delete()
+        self.assertEqual(self.record().pr_weight_kg, Decimal("100"))
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertIsNone(self.record())
+
+    def test_aliases_share_one_record(self):
+        self.log(date(2024, 1, 1), "Flat Bench", [(5, "100")])
+        self.log(date(2024, 1, 2), "Bench Press", [(5, "90")])
+        self.assertEqual(PersonalRecord.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(self.record("flat bench").pr_weight_kg, Decimal("100"))
+
+
+class ExerciseProgressionAccessTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="pw")
+        self.other = User.objects.create_user("other", password="pw")
+        session = TrainingSession.objects.create(user=self.owner, name="Pull", date=date(2024, 1, 1))
+        self.exercise = Exercise.objects.create(session=session, name="Zercher Good Morning", order=0)
+        Set.objects.create(exercise=self.exercise, order=0, reps=5, weight_kg=Decimal("60"))
+        self.exercise.refresh_from_db()
+        self.url = f"/training/exercises/{self.exercise.definition_id}/progression/"
+
+    def test_owner_can_read_the_definition(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["exercise"]["name"], "Zercher Good Morning")
+
+    def test_other_users_get_404(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertTrue(ExerciseDefinition.objects.filter(pk=self.exercise.definition_id).exists())
+
+
+def workout(sets_per_exercise=3, **overrides):
+    return {
+        "date": "2024-01-01",
+        "name": "Push",
+        "duration_min": 60,
+        "exercises": [
+            {"name": name, "sets": [{"reps": 5, "weight_kg": 100 + j} for j in range(sets_per_exercise)]}
+            for name in ("Bench Press", "Overhead Press")
+        ],
+        **overrides,
+    }
+
+
+class WorkoutSubmitTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+        self.client.force_login(self.user)
+
+    def post(self, payload):
+        return self.client.post("/training/workouts/", json.dumps(payload), content_type="application/json")
+
+    def test_created(self):
+        response = self.post(workout())
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertTrue(data["ok"])
+        self.assertEqual(data["session"]["date"], "2024-01-01")
+        self.assertEqual(Set.objects.filter(exercise__session__user=self.user).count(), 6)
+
+    def test_bad_set_in_the_middle_saves_nothing(self):
+        payload = workout()
+        payload["exercises"][1]["sets"][1]["reps"] = -1
+        response = self.post(payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()["errors"]), ["exercises.1.sets.1.reps"])
+        self.assertFalse(TrainingSession.objects.filter(user=self.user).exists())
+
+    def test_failed_write_rolls_back_the_session(self):
+        with mock.patch.object(Set.objects, "bulk_create", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                save_workout(self.user, workout())
+        self.assertFalse(TrainingSession.objects.filter(user=self.user).exists())
+        self.assertFalse(Exercise.objects.filter(session__user=self.user).exists())
+
+    def test_invalid_json(self):
+        response = self.client.post("/training/workouts/", "{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"ok": False, "errors": {"__all__": ["Invalid JSON."]}})
+
+    def test_sets_are_bulk_inserted(self):
+        save_workout(self.user, workout(sets_per_exercise=1))  # creates any catalog rows
+        # savepoint, session, alias + definition lookups, exercises, sets, release
+        with self.assertNumQueries(7):
+            save_workout(self.user, workout(sets_per_exercise=40))
+        self.assertEqual(Set.objects.filter(exercise__session__user=self.user).count(), 82)
+
+
+class SessionTotalsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+        for day, duration, exercises in (
+            (1, 60, {"Bench Press": [(5, "100"), (5, "102.5")], "Dips": [(12, None), (10, "10")]}),
+            (2, None, {"Squat": [(3, "140")]}),
+            (3, 20, {}),
+        ):
+            session = TrainingSession.objects.create(
+                user=self.user, name=f"S{day}", date=date(2024, 1, day), duration_min=duration,
+            )
+            for order, (name, sets) in enumerate(exercises.items()):
+                exercise = Exercise.objects.create(session=session, name=name, order=order)
+                for i, (reps, weight) in enumerate(sets):
+                    Set.objects.create(
+                        exercise=exercise, order=i, reps=reps, weight_kg=Decimal(weight) if weight else None,
+                    )
+
+    def test_annotations_match_python_fallback(self):
+        annotated = {s.pk: s for s in TrainingSession.objects.filter(user=self.user).with_totals()}
+        for session in TrainingSession.objects.filter(user=self.user):
+            with self.subTest(session=session.name):
+                fast = annotated[session.pk]
+                self.assertEqual(fast.total_volume(), session.total_volume())
+                self.assertEqual(fast.sets_count(), session.sets_count())
+                self.assertEqual(fast.exercises_count(), session.exercises_count())
+
+    def test_page_totals(self):
+        expected = {"volume": 1532.5, "sets": 5, "exercises": 3, "duration_min": 80}
+        self.assertEqual(TrainingSession.objects.filter(user=self.user).totals(), expected)
+        self.client.force_login(self.user)
+        response = self.client.get("/training/")
+        self.assertEqual(response.context["totals"], expected)
+
+
+class LinkExistingExercisesMigrationTests(TestCase):
+    migration = import_module("training.migrations.0006_link_existing_exercises")
+
+    def record_rows(self):
+        return sorted(PersonalRecord.objects.filter(user=self.user).values_list(
+            "exercise_key", "exercise_name", "pr_weight_kg", "e1rm", "best_session_volume",
+        ))
+
+    def test_links_exercises_and_rekeys_alias_records(self):
+        self.user = User.objects.create_user("lifter", password="pw")
+        with self.captureOnCommitCallbacks(execute=True):
+            session = TrainingSession.objects.create(user=self.user, name="Push", date=date(2024, 1, 1))
+            for order, name in enumerate(("Flat Bench", "Zottman Curls")):
+                exercise = Exercise.objects.create(session=session, name=name, order=order)
+                Set.objects.create(exercise=exercise, order=0, reps=5, weight_kg=Decimal("100") - 70 * order)
+        expected = self.record_rows()
+
+        # the state before the catalog: no links, records keyed by normalised name
+        curl = ExerciseDefinition.objects.get(key="zottman curl")
+        Exercise.objects.update(definition=None)
+        curl.delete()
+        PersonalRecord.objects.filter(exercise_key="bench press").update(exercise_key="flat bench")
+        ExerciseDailyVolume.objects.filter(exercise_key="bench press").update(exercise_key="flat bench")
+
+        self.migration.forwards(apps, None)
+
+        linked = dict(Exercise.objects.values_list("name", "definition__key"))
+        self.assertEqual(linked, {"Flat Bench": "bench press", "Zottman Curls": "zottman curl"})
+        self.assertEqual(ExerciseDefinition.objects.get(key="zottman curl").name, "Zottman Curls")
+        self.assertEqual(self.record_rows(), expected)
+        self.assertEqual(
+            set(ExerciseDailyVolume.objects.values_list("exercise_key", flat=True)), {"bench press", "zottman curl"},
+        )
+
+    def test_frozen_normaliser_matches_catalog(self):
+        for name in ("Flat Bench", "DB Rows", "ohp", "Barbell  Back-Squats", "Glute_Bridges", "Crunches", "Préss"):
+            self.assertEqual(self.migration.normalize_exercise_name(name), catalog.normalize_exercise_name(name))
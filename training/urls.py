@@ -5,4 +5,7 @@ app_name = "training"
 
 urlpatterns = [
     path("", views.training_home, name="home"),
+    path("history/", views.training_history, name="history"),
+    path("workouts/", views.workout_submit, name="workout_submit"),
+    path("exercises/<int:pk>/progression/", views.exercise_progression, name="exercise_progression"),
 ]
\ No newline at end of file
@@ -1,28 +1,35 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.utils import timezone
 from django.urls import reverse
 from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+import json
 import logging
 from datetime import date
 from decimal import Decimal, InvalidOperation
 
-from .models import TrainingSession
+from core.cache import cached_payload
+from core.etags import conditional_dashboard
+
+from . import records
+from .analytics import DEFAULT_WINDOW_DAYS, clamp_window, progression
+from .models import ExerciseDefinition, TrainingSession
 from .forms import TrainingSessionForm
+from .pagination import MAX_PAGE_SIZE, PAGE_SIZE, InvalidCursor, keyset_page
+from .workouts import WorkoutValidationError, save_workout
 
 logger = logging.getLogger(__name__)
 
 
+@conditional_dashboard
 def training_home(request):
     today = timezone.localdate()
 
     # list sessions for the current user (empty for anonymous)
     if request.user.is_authenticated:
-        sessions = (
-            TrainingSession.objects.filter(user=request.user)
-            .order_by("-date", "-created_at")
-            .prefetch_related("exercises__sets")
-            .all()
-        )
+        sessions = _history_queryset(request.user)
     else:
         sessions = TrainingSession.objects.none()
 
@@ -56,30 +63,13 @@ def training_home(request):
             form = TrainingSessionForm() if request.user.is_authenticated else None
         else:
             try:
-                # create TrainingSession
                 # Coerce date string to a date object if provided
                 try:
                     parsed_date = date.fromisoformat(workout_date) if workout_date else timezone.localdate()
                 except Exception:
                     parsed_date = timezone.localdate()
 
-                session = TrainingSession.objects.create(
-                    user=request.user,
-                    name=exercise_name,
-                    date=parsed_date,
-                    duration_min=(int(duration_min) if duration_min else None),
-                    notes=notes,
-                )
-
-                # create Exercise
-                ex = session.exercises.create(
-                    name=exercise_name,
-                    muscle_group=muscle_group,
-                    is_compound=is_compound,
-                    order=0,
-                )
-
-                # create Sets
+                sets = []
                 for idx, reps_raw in enumerate(reps_list):
                     try:
                         reps = int(reps_raw)
@@ -108,16 +98,36 @@ def training_home(request):
                         is_warmup = (is_warmup_list[idx] == "1")
 
                     if reps:
-                        ex.sets.create(
-                            order=idx,
-                            reps=reps,
-                            weight_kg=weight,
-                            rir=rir,
-                            is_warmup=is_warmup,
-                        )
+                        sets.append({
+                            "order": idx,
+                            "reps": reps,
+                            "weight_kg": weight,
+                            "rir": rir,
+                            "is_warmup": is_warmup,
+                        })
+
+                # session, exercise and all sets are written in one transaction
+                save_workout(request.user, {
+                    "name": exercise_name,
+                    "date": parsed_date.isoformat(),
+                    "duration_min": int(duration_min) if duration_min else None,
+                    "notes": notes,
+                    "exercises": [{
+                        "name": exercise_name,
+                        "muscle_group": muscle_group,
+                        "is_compound": is_compound,
+                        "order": 0,
+                        "sets": sets,
+                    }],
+                })
 
                 messages.success(request, "Training session and sets saved.")
                 return redirect("training:home")
+            except WorkoutValidationError as exc:
+                logger.warning("Training POST invalid: %s", exc.errors)
+                messages.error(request, "Please fix the workout: %s" % "; ".join(
+                    f"{k}: {' '.join(v)}" for k, v in exc.errors.items()
+                ))
             except Exception:
                 logger.exception("Failed to save training POST")
                 messages.error(request, "Failed to save training. Check server logs.")
@@ -125,15 +135,147 @@ def training_home(request):
     else:
         form = TrainingSessionForm() if request.user.is_authenticated else None
 
+    if request.user.is_authenticated:
+        dashboard = cached_payload(
+            request.user.pk, f"training_home:{today}",
+            lambda: _dashboard_payload(request.user, sessions, today),
+        )
+    else:
+        dashboard = {
+            "totals": {"volume": 0, "sets": 0, "exercises": 0, "duration_min": 0},
+            "workouts": [],
+            "next_cursor": None,
+            "recent_prs": [],
+            "top_volume": [],
+        }
     ctx = {
         "today": today,
-        "totals": {
-            "volume": sum(s.total_volume() for s in sessions) if request.user.is_authenticated else 0,
-            "sets": sum(s.sets_count() for s in sessions) if request.user.is_authenticated else 0,
-            "exercises": sum(s.exercises_count() for s in sessions) if request.user.is_authenticated else 0,
-            "duration_min": sum((s.duration_min or 0) for s in sessions) if request.user.is_authenticated else 0,
-        },
-        "workouts": sessions,
+        **dashboard,
         "form": form,
     }
-    return render(request, "training/training.html", ctx)
\ No newline at end of file
+    return render(request, "training/training.html", ctx)
+
+
+def _dashboard_payload(user, sessions, today):
+    workouts, next_cursor = keyset_page(sessions)
+    return {
+        "totals": TrainingSession.objects.filter(user=user).totals(),
+        "workouts": workouts,
+        "next_cursor": next_cursor,
+        # both read precomputed rows (training.records), not set history
+        "recent_prs": records.recent_records(user),
+        "top_volume": records.top_volume(user, today),
+    }
+
+
+def _history_queryset(user):
+    return (
+        TrainingSession.objects.filter(user=user)
+        .with_totals()
+        .prefetch_related("exercises__sets")
+    )
+
+
+def _serialize_session(session):
+    return {
+        "id": session.pk,
+        "name": session.name,
+        "date": session.date.isoformat(),
+        "duration_min": session.duration_min,
+        "notes": session.notes,
+        "total_volume": session.total_volume(),
+        "exercises": [
+            {
+                "id": ex.pk,
+                "name": ex.name,
+                "definition_id": ex.definition_id,
+                "muscle_group": ex.muscle_group,
+                "is_compound": ex.is_compound,
+                "sets": [
+                    {
+                        "order": st.order,
+                        "reps": st.reps,
+                        "weight_kg": float(st.weight_kg) if st.weight_kg is not None else None,
+                        "rir": float(st.rir) if st.rir is not None else None,
+                        "is_warmup": st.is_warmup,
+                    }
+                    for st in ex.sets.all()
+                ],
+            }
+            for ex in session.exercises.all()
+        ],
+    }
+
+
+@login_required
+def training_history(request):
+    """
+    Next page of workout history as JSON.
+
+    Always three queries (sessions with SQL totals, exercises, sets) regardless
+    of how far back the cursor points.
+    """
+    try:
+        size = min(max(int(request.GET.get("limit", PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        size = PAGE_SIZE
+    try:
+        workouts, next_cursor = keyset_page(
+            _history_queryset(request.user), request.GET.get("cursor") or None, size
+        )
+    except InvalidCursor as exc:
+        return JsonResponse({"ok": False, "error": str(exc)}, status=400)
+    return JsonResponse({
+        "ok": True,
+        "sessions": [_serialize_session(w) for w in workouts],
+        "next_cursor": next_cursor,
+    })
+
+
+@login_required
+@require_POST
+def workout_submit(request):
+    """
+    Create a full workout from one JSON body (see training.workouts.validate_workout).
+
+    The whole payload is validated before anything is written, then saved in a
+    single transaction with bulk inserts for exercises and sets.
+    """
+    try:
+        payload = json.loads(request.body or b"{}")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({"ok": False, "errors": {"__all__": ["Invalid JSON."]}}, status=400)
+    try:
+        session = save_workout(request.user, payload)
+    except WorkoutValidationError as exc:
+        return JsonResponse({"ok": False, "errors": exc.errors}, status=400)
+    saved = _history_queryset(request.user).get(pk=session.pk)
+    return JsonResponse({"ok": True, "session": _serialize_session(saved)}, status=201)
+
+
+@login_required
+def exercise_progression(request, pk):
+    """
+    Progression series for one catalog exercise as JSON columns.
+
+    Query params: ``start``/``end`` (ISO dates, default all history) and
+    ``window`` (rolling-volume window in days, default 28). Only exercises
+    the user has logged are visible; catalog rows can hold other users'
+    free-text names.
+    """
+    definition = get_object_or_404(
+        ExerciseDefinition.objects.filter(exercises__session__user=request.user).distinct(), pk=pk
+    )
+    try:
+        start = date.fromisoformat(request.GET["start"]) if request.GET.get("start") else None
+        end = date.fromisoformat(request.GET["end"]) if request.GET.get("end") else None
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "start and end must be YYYY-MM-DD dates."}, status=400)
+    if start and end and start > end:
+        return JsonResponse({"ok": False, "error": "start must be on or before end."}, status=400)
+    window = clamp_window(request.GET.get("window", DEFAULT_WINDOW_DAYS))
+    data = cached_payload(
+        request.user.pk, f"exercise_progression:{definition.pk}:{start}:{end}:{window}",
+        lambda: progression(request.user, definition, start, end, window),
+    )
+    return JsonResponse({"ok": True, "exercise": {"id": definition.pk, "name": definition.name}, **data})
@@ -0,0 +1,123 @@
+"""
+Validate and save a whole workout (session, exercises, sets) in one go.
+
+Validation reuses TrainingSessionForm / ExerciseForm / SetForm so the rules
+match the rest of the app; the write is a single transaction with one INSERT
+for the session and one bulk INSERT each for exercises and sets (plus the
+catalog lookups that link exercises to their ExerciseDefinition).
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .forms import ExerciseForm, SetForm, TrainingSessionForm
+from .models import Exercise, ExerciseDefinition, Set
+
+SET_BATCH_SIZE = 500
+
+
+class WorkoutValidationError(Exception):
+    def __init__(self, errors):
+        super().__init__("Invalid workout payload.")
+        self.errors = errors
+
+
+def _form_errors(form, prefix):
+    return {f"{prefix}{field}": [str(e) for e in errs] for field, errs in form.errors.items()}
+
+
+def validate_workout(payload):
+    """
+    Validate a workout payload and return unsaved model instances.
+
+    ``payload`` looks like::
+
+        {"date": "2025-11-03", "name": "", "duration_min": 60, "notes": "",
+         "exercises": [{"name": "Bench Press", "muscle_group": "Chest",
+                        "is_compound": true, "sets": [{"reps": 5, "weight_kg": 100}]}]}
+
+    Raises WorkoutValidationError with a flat ``{"exercises.0.sets.1.reps": [...]}``
+    style error map covering every problem, not just the first one.
+    """
+    if not isinstance(payload, dict):
+        raise WorkoutValidationError({"__all__": ["Expected a JSON object."]})
+
+    errors = {}
+    session_form = TrainingSessionForm(data={
+        "name": payload.get("name") or "",
+        "date": payload.get("date") or timezone.localdate().isoformat(),
+        "duration_min": payload.get("duration_min"),
+        "notes": payload.get("notes") or "",
+    })
+    if not session_form.is_valid():
+        errors.update(_form_errors(session_form, ""))
+
+    exercises = payload.get("exercises")
+    if not isinstance(exercises, list) or not exercises:
+        errors["exercises"] = ["Provide at least one exercise."]
+        exercises = []
+
+    cleaned = []
+    for i, ex_data in enumerate(exercises):
+        prefix = f"exercises.{i}."
+        if not isinstance(ex_data, dict):
+            errors[prefix.rstrip(".")] = ["Expected an object."]
+            continue
+        ex_form = ExerciseForm(data={
+            "name": ex_data.get("name"),
+            "muscle_group": ex_data.get("muscle_group") or "",
+            "is_compound": ex_data.get("is_compound", False),
+            "order": ex_data.get("order", i),
+            "notes": ex_data.get("notes") or "",
+        })
+        if not ex_form.is_valid():
+            errors.update(_form_errors(ex_form, prefix))
+
+        sets = ex_data.get("sets")
+        if not isinstance(sets, list) or not sets:
+            errors[f"{prefix}sets"] = ["Provide at least one set."]
+            sets = []
+        set_forms = []
+        for j, set_data in enumerate(sets):
+            set_prefix = f"{prefix}sets.{j}."
+            if not isinstance(set_data, dict):
+                errors[set_prefix.rstrip(".")] = ["Expected an object."]
+                continue
+            set_form = SetForm(data={
+                "order": set_data.get("order", j),
+                "reps": set_data.get("reps"),
+                "weight_kg": set_data.get("weight_kg"),
+                "rir": set_data.get("rir"),
+                "is_warmup": set_data.get("is_warmup", False),
+            })
+            if not set_form.is_valid():
+                errors.update(_form_errors(set_form, set_prefix))
+            set_forms.append(set_form)
+        cleaned.append((ex_form, set_forms))
+
+    if errors:
+        raise WorkoutValidationError(errors)
+
+    session = session_form.save(commit=False)
+    return session, [
+        (ex_form.save(commit=False), [f.save(commit=False) for f in set_forms])
+        for ex_form, set_forms in cleaned
+    ]
+
+
+def save_workout(user, payload):
+    """Validate ``payload`` and write it atomically; returns the saved session."""
+    session, exercises = validate_workout(payload)
+    with transaction.atomic():
+        session.user = user
+        session.save()
+        for ex, _ in exercises:
+            ex.session = session
+        ExerciseDefinition.objects.attach([ex for ex, _ in exercises])
+        Exercise.objects.bulk_create([ex for ex, _ in exercises])
+        sets = []
+        for ex, ex_sets in exercises:
+            for s in ex_sets:
+                s.exercise = ex
+                sets.append(s)
+        Set.objects.bulk_create(sets, batch_size=SET_BATCH_SIZE)
+    return session